@@ -0,0 +1,232 @@
+"""
+Headless batch scoring for MatchiFi.
+Streams raw company financials from a CSV or Parquet file in fixed-size chunks, computes the
+financial ratios and the loan classifier's outcome for each chunk, and appends the results to
+the output file as it goes, so memory use stays flat regardless of the input size.
+
+Performance is assessed against the file's 'benchmark' column or, with --db, against each row's
+sector net profit margin from the sectors table (the file then needs a 'sector_id' column).
+
+With --metrics-prom / --metrics-json the run is instrumented (see instrumentation.py): the time
+spent reading input, computing ratios, predicting, building result frames and writing output is
+exported per stage, with row and undefined-ratio counters. --profile samples the run's stacks.
+
+Usage: python batch_score.py applicants.csv scored.csv [--chunksize 100000] [--model logistic_model.joblib]
+"""
+
+import argparse
+import contextlib
+import os
+import sqlite3
+import sys
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+
+import instrumentation
+from financial_ratios_calc import BACKENDS, DEFAULT_BACKEND, DEFAULT_TAX_RATE, REASON_OK, FinancialRatios
+from linear_scorer import LinearScorer
+from model_artifact import DEFAULT_MODEL_PATH, load_artifact
+from sector_benchmarks import SectorBenchmarkCache
+
+# Raw financial columns every input file must provide
+INPUT_COLUMNS = ['revenue', 'ebit', 'interest', 'liabilities', 'equity', 'assets', 'benchmark']
+
+# Status reported for rows whose ratios are undefined (see the Reason_Code column)
+NOT_SCORED = "Not Scored"
+
+DEFAULT_CHUNKSIZE = 100_000
+
+
+def input_columns(benchmarks: SectorBenchmarkCache = None) -> list:
+    """Columns read from the input: sector benchmarks replace the 'benchmark' column with 'sector_id'."""
+    if benchmarks is None:
+        return INPUT_COLUMNS
+    return [name for name in INPUT_COLUMNS if name != 'benchmark'] + ['sector_id']
+
+
+def chunk_performance(chunk: pd.DataFrame, profit_margin, benchmarks: SectorBenchmarkCache = None) -> np.ndarray:
+    """Classifies a chunk's profit margins against its benchmark column or its sector benchmarks."""
+    if benchmarks is None:
+        return FinancialRatios.get_company_performance_batch(profit_margin, chunk['benchmark'])
+    return benchmarks.company_performance(profit_margin, chunk['sector_id'])
+
+
+def _file_format(path: str) -> str:
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.csv':
+        return 'csv'
+    if ext in ('.parquet', '.pq'):
+        return 'parquet'
+    raise ValueError(f"Unsupported file type '{ext}' for {path}; expected .csv or .parquet.")
+
+
+def iter_input_chunks(path: str, chunksize: int = DEFAULT_CHUNKSIZE, columns=None):
+    """
+    Yields DataFrames of at most chunksize rows from a CSV or Parquet file.
+    Only the requested columns are read (default: INPUT_COLUMNS).
+    """
+    columns = list(columns or INPUT_COLUMNS)
+    if _file_format(path) == 'csv':
+        # Type inference runs per chunk: a blank cell would turn an int64 column float64 midway
+        dtype = {name: np.float64 for name in columns if name in INPUT_COLUMNS}
+        with pd.read_csv(path, usecols=columns, chunksize=chunksize, dtype=dtype) as reader:
+            for chunk in reader:
+                yield chunk[columns]
+    else:
+        import pyarrow.parquet as pq
+
+        parquet_file = pq.ParquetFile(path)
+        for batch in parquet_file.iter_batches(batch_size=chunksize, columns=columns):
+            yield batch.to_pandas()
+
+
+class ChunkWriter:
+    """
+    Appends DataFrame chunks to a CSV or Parquet file.
+    The CSV header and the Parquet schema are taken from the first chunk written, and later
+    chunks are cast to that schema (e.g. a pass-through column read as int64 in one chunk and
+    float64 in the next). Decimal
+    columns (the decimal backend) go to Parquet as their exact text, as they do to CSV: their
+    scale varies from row to row, so no fixed Parquet decimal type holds every chunk.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.format = _file_format(path)
+        self.rows_written = 0
+        self._parquet_writer = None
+
+    def write(self, chunk: pd.DataFrame):
+        if self.format == 'csv':
+            chunk.to_csv(self.path, mode='w' if self.rows_written == 0 else 'a',
+                         header=self.rows_written == 0, index=False)
+        else:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            # A chunk where every value is undefined still needs the string type of the others
+            decimal_columns = [name for name, values in chunk.items() if values.dtype == object
+                               and all(v is None or isinstance(v, Decimal) for v in values)]
+            if decimal_columns:
+                chunk = chunk.assign(**{name: chunk[name].map(str, na_action='ignore').astype('string')
+                                        for name in decimal_columns})
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if self._parquet_writer is None:
+                self._parquet_writer = pq.ParquetWriter(self.path, table.schema)
+            elif not table.schema.equals(self._parquet_writer.schema, check_metadata=False):
+                table = table.cast(self._parquet_writer.schema)
+            self._parquet_writer.write_table(table)
+        self.rows_written += len(chunk)
+
+    def close(self):
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+            self._parquet_writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def score_chunk(chunk: pd.DataFrame, scorer: LinearScorer, tax_rate=DEFAULT_TAX_RATE,
+                benchmarks: SectorBenchmarkCache = None, backend: str = DEFAULT_BACKEND) -> pd.DataFrame:
+    """
+    Computes ratios, company performance and the loan outcome for one chunk of raw financials.
+    Rows with an undefined ratio are reported as NOT_SCORED with a NaN probability.
+    backend is the FinancialRatios numeric backend used for the ratios.
+    """
+    with instrumentation.stage('batch.ratios'):
+        ratios = FinancialRatios.calculate_ratio_arrays(
+            chunk['liabilities'], chunk['equity'], chunk['assets'],
+            chunk['ebit'], chunk['interest'], chunk['revenue'], tax_rate=tax_rate, backend=backend,
+        )
+    with instrumentation.stage('batch.predict'):
+        # The decimal backend returns Decimal objects; the model scores in float64
+        features = np.column_stack([np.asarray(ratios[name], dtype=np.float64) for name in scorer.feature_names])
+        # A NaN decision would silently take classes_[0], so only fully finite rows are scored
+        scoreable = (ratios['Reason_Code'] == REASON_OK) & np.isfinite(features).all(axis=1)
+        probability = np.full(len(chunk), np.nan)
+        status = np.full(len(chunk), NOT_SCORED, dtype=object)
+        if scoreable.any():
+            probability[scoreable], status[scoreable] = scorer.score_batch(features[scoreable])
+    if instrumentation.enabled():
+        n_scored = int(np.count_nonzero(scoreable))
+        instrumentation.count('batch_rows', n_scored, outcome='scored')
+        instrumentation.count('batch_rows', len(chunk) - n_scored, outcome='not_scored')
+
+    with instrumentation.stage('batch.frame'):
+        result = chunk.reset_index(drop=True).copy()
+        for name, values in ratios.items():
+            result[name] = values
+        result['Performance'] = chunk_performance(chunk, ratios['Profit_Margin'], benchmarks)
+        result['Approval_Probability'] = probability
+        result['Loan_Status'] = status
+    return result
+
+
+def score_file(input_path: str, output_path: str, scorer: LinearScorer,
+               chunksize: int = DEFAULT_CHUNKSIZE, tax_rate=DEFAULT_TAX_RATE,
+               extra_columns=(), benchmarks: SectorBenchmarkCache = None,
+               backend: str = DEFAULT_BACKEND) -> int:
+    """
+    Streams input_path through score_chunk into output_path, one chunk at a time.
+    extra_columns (e.g. a company id) are passed through unchanged. Returns the number of rows scored.
+    """
+    columns = list(dict.fromkeys(list(extra_columns) + input_columns(benchmarks)))
+    with ChunkWriter(output_path) as writer:
+        for chunk in instrumentation.timed_iter('batch.read', iter_input_chunks(input_path, chunksize, columns)):
+            result = score_chunk(chunk, scorer, tax_rate, benchmarks, backend)
+            with instrumentation.stage('batch.write'):
+                writer.write(result)
+        return writer.rows_written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score a file of company financials in batch.")
+    parser.add_argument('input', help="CSV or Parquet file with columns: " + ", ".join(INPUT_COLUMNS))
+    parser.add_argument('output', help="CSV or Parquet file to write the results to.")
+    parser.add_argument('--model', default=DEFAULT_MODEL_PATH, help="Model artifact path.")
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE, help="Rows per chunk.")
+    parser.add_argument('--tax-rate', default=str(DEFAULT_TAX_RATE), help="Tax rate applied to EBT.")
+    parser.add_argument('--keep', nargs='*', default=[], help="Extra input columns to copy to the output.")
+    parser.add_argument('--db', default=None, help="SQLite database whose sectors table supplies the benchmarks.")
+    parser.add_argument('--backend', choices=BACKENDS, default=DEFAULT_BACKEND,
+                        help="Numeric backend for the ratios: exact decimal, fixed-point currency or float64.")
+    parser.add_argument('--metrics-prom', default=None, help="Prometheus text file for the per-stage metrics.")
+    parser.add_argument('--metrics-json', default=None, help="JSON file for the per-stage metrics.")
+    parser.add_argument('--profile', default=None,
+                        help="Sample the run's stacks and write them here in collapsed (flame graph) format.")
+    args = parser.parse_args(argv)
+
+    if args.metrics_prom or args.metrics_json:
+        instrumentation.enable()
+    profiler = instrumentation.SamplingProfiler() if args.profile else None
+    try:
+        scorer = LinearScorer.from_artifact(load_artifact(args.model))
+        benchmarks = SectorBenchmarkCache(sqlite3.connect(args.db)) if args.db else None
+        with profiler or contextlib.nullcontext():
+            rows = score_file(args.input, args.output, scorer, args.chunksize,
+                              float(args.tax_rate), args.keep, benchmarks, args.backend)
+        if args.metrics_prom:
+            instrumentation.write_prometheus(args.metrics_prom)
+        if args.metrics_json:
+            instrumentation.write_json(args.metrics_json)
+        if profiler is not None:
+            profiler.write_collapsed(args.profile)
+    except (OSError, KeyError, ValueError, sqlite3.Error) as e:
+        print(f"Batch scoring failed: {e}", file=sys.stderr)
+        return 1
+    print(f"Scored {rows} rows into {args.output}")
+    if profiler is not None:
+        print(f"Wrote {sum(profiler.samples.values())} stack samples to {args.profile}; hottest functions:")
+        for function, share in profiler.top_functions(5):
+            print(f"  {share:6.1%}  {function}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,357 @@
+"""
+Performance benchmarks for the MatchiFi pipeline.
+Runs on synthetic data shaped like the Loan.xlsx / client_detail features and measures:
+
+    - ratios:  scalar Decimal FinancialRatios methods vs calculate_ratio_arrays per backend
+    - ingest:  Loan.xlsx parse into the columnar training cache (cold) and cached loads (warm)
+    - train:   classifier fit time against the number of training rows
+    - predict: single-row latency (sklearn predict_proba vs LinearScorer.score_one) and
+               batch throughput (sklearn vs LinearScorer.score_batch)
+    - parallel: raw-financials scoring throughput of batch_score.score_chunk and of
+                parallel_score.ParallelScorer at each worker count
+
+Every measurement is a named metric with a unit and a direction, written to a JSON file along
+with the commit and library versions. Comparing against a baseline file flags every metric
+that got worse by more than the threshold, and the command then exits with status 1:
+
+Usage:
+    python benchmark_suite.py --out bench.json [--quick]
+    python benchmark_suite.py --out new.json --compare bench.json [--threshold 0.25]
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+import sklearn
+from sklearn.exceptions import ConvergenceWarning
+
+from batch_score import score_chunk
+from financial_ratios_calc import BACKENDS, DEFAULT_TAX_RATE, FinancialRatios
+from linear_scorer import LinearScorer
+from model_artifact import FEATURE_COLUMNS, TARGET_COLUMN, ModelArtifact
+from parallel_score import ParallelScorer
+from ratio_backend_check import AMOUNT_COLUMNS, generate_amounts, reference_values
+from ratio_preprocessing import build_pipeline
+from training_data_cache import build_cache, load_columns
+
+RESULTS_FORMAT_VERSION = 1
+
+DEFAULT_THRESHOLD = 0.25
+
+# (full, --quick) sizes of each benchmark
+SIZES = {
+    'scalar_rows': (20_000, 2_000),
+    'batch_rows': (500_000, 50_000),
+    'excel_rows': (20_000, 2_000),
+    'train_rows': ((1_000, 10_000, 100_000), (1_000, 5_000)),
+    'predict_calls': (2_000, 200),
+    'predict_rows': (1_000_000, 100_000),
+    'parallel_rows': (2_000_000, 200_000),
+    'parallel_workers': ((1, 2, 4, 8), (1, 2)),
+}
+
+
+def synthetic_loan_frame(n_rows: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Ratio features with the client_detail distributions of matchifi_db.populate_synthetic, in
+    model units (ROA and ROE as fractions, as matchifi_db.FEATURE_QUERY reads them), and an
+    'Approved'/'Rejected' Loan_Status that depends on them through a noisy logistic rule.
+    """
+    rng = np.random.default_rng(seed)
+    frame = pd.DataFrame({
+        'Debt_to_Equity': rng.gamma(2.0, 0.6, n_rows).round(2),
+        'Profit_Margin': rng.normal(10, 8, n_rows).round(2),
+        'Return_on_Assets': rng.normal(0.06, 0.05, n_rows).round(4),
+        'Return_on_Equity': rng.normal(0.12, 0.09, n_rows).round(4),
+        'Interest_Coverage_Ratio': rng.lognormal(1.5, 1.0, n_rows).round(2),
+    })
+    logit = (0.15 * frame['Profit_Margin'] + 10 * frame['Return_on_Assets'] - 0.8 * frame['Debt_to_Equity']
+             + 0.3 * np.log1p(frame['Interest_Coverage_Ratio']) - 0.5 + rng.logistic(size=n_rows))
+    frame[TARGET_COLUMN] = np.where(logit > 0, 'Approved', 'Rejected')
+    return frame[FEATURE_COLUMNS + [TARGET_COLUMN]]
+
+
+def write_loan_workbook(frame: pd.DataFrame, path: str, header: int = 2):
+    """Writes frame as a workbook laid out like Loan.xlsx (column titles on row `header`)."""
+    with pd.ExcelWriter(path) as writer:
+        frame.to_excel(writer, index=False, startrow=header)
+
+
+def _best_of(function, repeat: int = 3) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def _metric(name: str, value: float, unit: str, higher_is_better: bool, **params) -> dict:
+    return {'name': name, 'value': float(value), 'unit': unit,
+            'higher_is_better': higher_is_better, 'params': params}
+
+
+def _latencies(function, rows, calls: int) -> np.ndarray:
+    """Per-call wall-clock latencies in microseconds, cycling through rows."""
+    latencies = np.empty(calls)
+    function(rows[0])
+    for i in range(calls):
+        row = rows[i % len(rows)]
+        started = time.perf_counter()
+        function(row)
+        latencies[i] = time.perf_counter() - started
+    return latencies * 1e6
+
+
+def bench_ratios(scalar_rows: int, batch_rows: int, seed: int = 0) -> list:
+    """Rows per second of the scalar Decimal methods and of each batch backend."""
+    amounts = generate_amounts(scalar_rows, seed)
+    seconds = _best_of(lambda: reference_values(amounts, DEFAULT_TAX_RATE), repeat=1)
+    results = [_metric('ratios.scalar_decimal', scalar_rows / seconds, 'rows/s', True, rows=scalar_rows)]
+
+    amounts = generate_amounts(batch_rows, seed + 1)
+    inputs = [amounts[name] / 100.0 for name in AMOUNT_COLUMNS]
+    for backend in BACKENDS:
+        rows = batch_rows if backend != 'decimal' else min(batch_rows, scalar_rows * 5)
+        part = [values[:rows] for values in inputs]
+        seconds = _best_of(lambda: FinancialRatios.calculate_ratio_arrays(
+            *part, tax_rate=DEFAULT_TAX_RATE, backend=backend))
+        results.append(_metric(f'ratios.batch_{backend}', rows / seconds, 'rows/s', True, rows=rows))
+    return results
+
+
+def bench_ingest(excel_rows: int, seed: int = 0) -> list:
+    """Workbook parse into the training cache (cold) and memory-mapped cache loads (warm)."""
+    workdir = tempfile.mkdtemp(prefix='matchifi-bench-')
+    try:
+        source = os.path.join(workdir, 'Loan.xlsx')
+        write_loan_workbook(synthetic_loan_frame(excel_rows, seed), source)
+        cold = _best_of(lambda: build_cache(source, os.path.join(workdir, f"cold-{time.perf_counter_ns()}")),
+                        repeat=1)
+        cache_dir = os.path.join(workdir, 'cache')
+        load_columns(source, cache_dir=cache_dir)
+
+        def warm():
+            columns = load_columns(source, FEATURE_COLUMNS + [TARGET_COLUMN], cache_dir)
+            np.column_stack([columns[name] for name in FEATURE_COLUMNS])
+
+        warm_seconds = _best_of(warm)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return [
+        _metric('ingest.excel_cold', excel_rows / cold, 'rows/s', True, rows=excel_rows),
+        _metric('ingest.cache_warm', warm_seconds * 1e3, 'ms', False, rows=excel_rows),
+    ]
+
+
+def bench_train(train_rows, seed: int = 0) -> list:
+    """Seconds to fit the preprocessing + logistic regression pipeline at each row count."""
+    results = []
+    for rows in train_rows:
+        frame = synthetic_loan_frame(rows, seed)
+        x, y = frame[FEATURE_COLUMNS].to_numpy(), frame[TARGET_COLUMN].to_numpy()
+        model = build_pipeline()
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', ConvergenceWarning)
+            seconds = _best_of(lambda: model.fit(x, y), repeat=1)
+        results.append(_metric(f'train.rows_{rows}', seconds, 's', False, rows=rows))
+    return results
+
+
+def bench_predict(calls: int, batch_rows: int, seed: int = 0) -> list:
+    """Single-row latency percentiles and batch throughput of sklearn and LinearScorer."""
+    frame = synthetic_loan_frame(max(batch_rows, 10_000), seed)
+    x = frame[FEATURE_COLUMNS].to_numpy()
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', ConvergenceWarning)
+        model = build_pipeline().fit(x[:10_000], frame[TARGET_COLUMN].to_numpy()[:10_000])
+    scorer = LinearScorer.from_model(model, FEATURE_COLUMNS)
+
+    results = []
+    single = {
+        'sklearn': (lambda row: model.predict_proba(row.reshape(1, -1)), x[:calls]),
+        'linear_scorer': (scorer.score_one, x[:calls].tolist()),
+    }
+    for name, (function, rows) in single.items():
+        latencies = _latencies(function, rows, calls)
+        for q in (50, 99):
+            results.append(_metric(f'predict.single_{name}.p{q}', np.percentile(latencies, q), 'us', False,
+                                   calls=calls))
+
+    rows = x[:batch_rows]
+    batch = {
+        'sklearn': lambda: model.predict_proba(rows),
+        'linear_scorer': lambda: scorer.score_batch(rows),
+    }
+    for name, function in batch.items():
+        seconds = _best_of(function)
+        results.append(_metric(f'predict.batch_{name}', batch_rows / seconds, 'rows/s', True, rows=batch_rows))
+    return results
+
+
+def bench_parallel(rows: int, worker_counts, seed: int = 0) -> list:
+    """Rows per second of serial chunk scoring and of the process pool at each worker count."""
+    frame = synthetic_loan_frame(10_000, seed)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', ConvergenceWarning)
+        model = build_pipeline().fit(frame[FEATURE_COLUMNS].to_numpy(), frame[TARGET_COLUMN].to_numpy())
+    artifact = ModelArtifact(model, FEATURE_COLUMNS, {})
+    amounts = generate_amounts(rows, seed)
+    chunk = pd.DataFrame({name: amounts[name] / 100.0 for name in AMOUNT_COLUMNS})
+    chunk['benchmark'] = np.random.default_rng(seed).normal(10, 5, rows)
+
+    scorer = LinearScorer.from_artifact(artifact)
+    seconds = _best_of(lambda: score_chunk(chunk, scorer), repeat=1)
+    results = [_metric('parallel.serial', rows / seconds, 'rows/s', True, rows=rows)]
+    for workers in worker_counts:
+        with ParallelScorer(artifact, workers) as pool:
+            # Start the worker processes outside the timed runs
+            pool.score_chunk(chunk.iloc[:workers])
+            seconds = _best_of(lambda: pool.score_chunk(chunk))
+        results.append(_metric(f'parallel.workers_{workers}', rows / seconds, 'rows/s', True,
+                               rows=rows, workers=workers))
+    return results
+
+
+BENCHMARKS = ('ratios', 'ingest', 'train', 'predict', 'parallel')
+
+
+def run_benchmarks(names=BENCHMARKS, quick: bool = False, seed: int = 0) -> list:
+    """Runs the named benchmarks and returns their metrics."""
+    size = {key: values[1 if quick else 0] for key, values in SIZES.items()}
+    runners = {
+        'ratios': lambda: bench_ratios(size['scalar_rows'], size['batch_rows'], seed),
+        'ingest': lambda: bench_ingest(size['excel_rows'], seed),
+        'train': lambda: bench_train(size['train_rows'], seed),
+        'predict': lambda: bench_predict(size['predict_calls'], size['predict_rows'], seed),
+        'parallel': lambda: bench_parallel(size['parallel_rows'], size['parallel_workers'], seed),
+    }
+    unknown = [name for name in names if name not in runners]
+    if unknown:
+        raise ValueError(f"Unknown benchmarks {unknown}; expected {list(BENCHMARKS)}.")
+    metrics = []
+    for name in names:
+        metrics.extend(runners[name]())
+    return metrics
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def results_document(metrics: list, quick: bool = False) -> dict:
+    return {
+        'format_version': RESULTS_FORMAT_VERSION,
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'commit': _git_commit(),
+        'quick': quick,
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'sklearn': sklearn.__version__,
+        },
+        'metrics': {metric['name']: metric for metric in metrics},
+    }
+
+
+def _run_kind(quick) -> str:
+    return 'a --quick run' if quick else 'a full run'
+
+
+def _check_same_sizes(baseline: dict, quick: bool):
+    if bool(baseline.get('quick')) != bool(quick):
+        raise ValueError(f"The baseline is {_run_kind(baseline.get('quick'))} but this is {_run_kind(quick)}; "
+                         f"their sizes differ.")
+
+
+def compare(baseline: dict, current: dict, threshold: float = DEFAULT_THRESHOLD) -> list:
+    """
+    One record per metric present in both documents, with the relative change in the
+    metric's good direction (negative = worse) and whether it regressed beyond threshold.
+    Raises ValueError if the runs differ in --quick or a shared metric in its params.
+    """
+    _check_same_sizes(baseline, current.get('quick'))
+    differing = [name for name, metric in current['metrics'].items()
+                 if name in baseline['metrics'] and baseline['metrics'][name].get('params') != metric.get('params')]
+    if differing:
+        raise ValueError(f"Metrics {differing} were measured with other parameters than the baseline.")
+    records = []
+    for name, metric in current['metrics'].items():
+        before = baseline['metrics'].get(name)
+        if before is None or before['value'] == 0:
+            continue
+        change = (metric['value'] - before['value']) / before['value']
+        if not metric['higher_is_better']:
+            change = -change
+        records.append({'name': name, 'unit': metric['unit'], 'baseline': before['value'],
+                        'current': metric['value'], 'change': change, 'regressed': change < -threshold})
+    return records
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Benchmark ratios, ingestion, training, prediction and parallel scoring.")
+    parser.add_argument('--out', default=None, help="JSON file to write the results to.")
+    parser.add_argument('--only', nargs='+', choices=BENCHMARKS, default=list(BENCHMARKS),
+                        help="Benchmarks to run (default: all).")
+    parser.add_argument('--quick', action='store_true', help="Smaller sizes, for a fast smoke run.")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--compare', default=None, help="Baseline results JSON to check for regressions.")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="Relative slowdown that counts as a regression.")
+    args = parser.parse_args(argv)
+
+    try:
+        baseline = None
+        if args.compare:
+            with open(args.compare) as f:
+                baseline = json.load(f)
+            # Fail before the run rather than after it
+            _check_same_sizes(baseline, args.quick)
+        document = results_document(run_benchmarks(args.only, args.quick, args.seed), args.quick)
+        if args.out:
+            with open(args.out, 'w') as f:
+                json.dump(document, f, indent=2)
+        records = compare(baseline, document, args.threshold) if baseline is not None else None
+    except (OSError, ValueError) as e:
+        print(f"Benchmark failed: {e}", file=sys.stderr)
+        return 1
+
+    print(f"{'metric':<36} {'value':>16} {'unit':<6}")
+    for metric in document['metrics'].values():
+        print(f"{metric['name']:<36} {metric['value']:>16,.2f} {metric['unit']:<6}")
+    if args.out:
+        print(f"Wrote {len(document['metrics'])} metrics to {args.out}")
+    if baseline is None:
+        return 0
+
+    regressions = [r for r in records if r['regressed']]
+    print(f"\nAgainst {args.compare} (commit {baseline.get('commit') or 'unknown'}), threshold {args.threshold:.0%}")
+    for r in records:
+        flag = 'REGRESSION' if r['regressed'] else ''
+        print(f"{r['name']:<36} {r['baseline']:>14,.2f} -> {r['current']:>14,.2f} {r['change']:>+8.1%} {flag}")
+    if regressions:
+        print(f"{len(regressions)} metric(s) regressed by more than {args.threshold:.0%}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
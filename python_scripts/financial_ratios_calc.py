@@ -1,14 +1,226 @@
 import sys
-from decimal import Decimal, getcontext, InvalidOperation
+from decimal import Context, Decimal, InvalidOperation
+
+import numpy as np
+import pandas as pd
+
+import instrumentation
+
+# Decimal context used by every ratio calculation. It is local to this module, so importing
+# it no longer changes the process-wide context (28 digits is a common recommendation for
+# financial applications).
+RATIO_CONTEXT = Context(prec=28)
+
+# Numeric backends of the batch API:
+#   'decimal' - exact 28-digit Decimal arithmetic per row (the reference, slow in bulk); its
+#               results are object arrays of Decimal, so nothing is rounded to float64
+#   'fixed'   - currency inputs scaled to int64 minor units (cents); EBT is exact, net profit
+#               is rounded half-even to cents and each ratio is rounded once, by the final
+#               division of exact integers
+#   'float'   - plain float64 arithmetic, for fast screening
+BACKENDS = ('decimal', 'fixed', 'float')
+DEFAULT_BACKEND = 'float'
+
+# Minor units per currency unit for the fixed-point backend (inputs are rounded to cents).
+CURRENCY_SCALE = 100
+
+# Tax rate applied to EBT when deriving net profit in the batch API.
+DEFAULT_TAX_RATE = Decimal('0.25')
+
+# Per-row reason codes returned by the batch API. Each code is a bit flag, so a row
+# with several zero denominators carries all of the matching flags.
+REASON_OK = 0
+REASON_ZERO_EQUITY = 1      # Debt-to-Equity and Return on Equity undefined
+REASON_ZERO_ASSETS = 2      # Return on Assets undefined
+REASON_ZERO_INTEREST = 4    # Interest Coverage Ratio undefined
+REASON_ZERO_REVENUE = 8     # Profit Margin undefined
+REASON_MISSING_INPUT = 16   # An input is missing or not finite (NaN, None, inf)
+
+# Label of each reason flag in the instrumentation counters
+REASON_NAMES = {
+    REASON_ZERO_EQUITY: 'zero_equity',
+    REASON_ZERO_ASSETS: 'zero_assets',
+    REASON_ZERO_INTEREST: 'zero_interest',
+    REASON_ZERO_REVENUE: 'zero_revenue',
+    REASON_MISSING_INPUT: 'missing_input',
+}
+
+# Column order used by the loan classifier; the batch API returns ratios under these names.
+RATIO_COLUMNS = [
+    'Debt_to_Equity',
+    'Profit_Margin',
+    'Return_on_Assets',
+    'Return_on_Equity',
+    'Interest_Coverage_Ratio',
+]
+
+PERFORMANCE_UNDEFINED = "Cannot assess performance due to undefined or infinite profit margin."
+
+
+def _as_float_array(values) -> np.ndarray:
+    """Converts a scalar, list, NumPy array or pandas Series to a float64 array."""
+    if isinstance(values, pd.Series):
+        values = values.to_numpy()
+    return np.asarray(values, dtype=np.float64)
+
+
+def _masked_divide(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    """Element-wise division that yields NaN wherever the denominator is zero."""
+    out = np.full(numerator.shape, np.nan, dtype=np.float64)
+    np.divide(numerator, denominator, out=out, where=denominator != 0)
+    return out
+
+
+def _as_decimal(value) -> Decimal:
+    """
+    Converts a number to Decimal through its shortest repr, so a float read from a CSV
+    becomes the decimal literal that was written (0.1 -> Decimal('0.1')).
+    """
+    return value if isinstance(value, Decimal) else Decimal(str(value))
+
+
+_DECIMAL_NAN = Decimal('NaN')
+
+
+def _decimal_input(value) -> Decimal:
+    """
+    _as_decimal for the batch inputs of the decimal backend: None and infinite amounts become a
+    quiet NaN, like a float NaN, so they propagate instead of raising InvalidOperation
+    (inf - inf, inf / inf) and the row is flagged REASON_MISSING_INPUT.
+    """
+    if value is None:
+        return _DECIMAL_NAN
+    value = _as_decimal(value)
+    return _DECIMAL_NAN if value.is_infinite() else value
+
+
+def _reason_codes(equity_zero, assets_zero, interest_zero, revenue_zero) -> np.ndarray:
+    reason = np.zeros(equity_zero.shape, dtype=np.uint8)
+    reason[equity_zero] |= REASON_ZERO_EQUITY
+    reason[assets_zero] |= REASON_ZERO_ASSETS
+    reason[interest_zero] |= REASON_ZERO_INTEREST
+    reason[revenue_zero] |= REASON_ZERO_REVENUE
+    return reason
+
+
+def _float_ratio_arrays(liabilities, equity, assets, ebit, interest, revenue, tax_rate) -> dict:
+    liabilities, equity, assets, ebit, interest, revenue = (
+        _as_float_array(v) for v in (liabilities, equity, assets, ebit, interest, revenue))
+    ebt = ebit - interest
+    # tax_rate may be an array broadcastable against the inputs (see what_if.py)
+    net_profit = ebt * (1.0 - _as_float_array(tax_rate))
+    return {
+        'Debt_to_Equity': _masked_divide(liabilities, equity),
+        'Profit_Margin': _masked_divide(net_profit, revenue) * 100.0,
+        'Return_on_Assets': _masked_divide(net_profit, assets),
+        'Return_on_Equity': _masked_divide(net_profit, equity),
+        'Interest_Coverage_Ratio': _masked_divide(ebit, interest),
+        'EBT': ebt,
+        'Net_Profit': net_profit,
+        'Reason_Code': _reason_codes(equity == 0, assets == 0, interest == 0, revenue == 0),
+    }
+
+
+def _round_half_even_divide(numerator: np.ndarray, denominator: int) -> np.ndarray:
+    """Integer division of an int64 array rounded half to even (banker's rounding, like Decimal)."""
+    quotient, remainder = np.divmod(numerator, denominator)
+    round_up = (2 * remainder > denominator) | ((2 * remainder == denominator) & (quotient % 2 == 1))
+    return quotient + round_up
+
+
+def _fixed_ratio_arrays(liabilities, equity, assets, ebit, interest, revenue, tax_rate) -> dict:
+    # Amounts become int64 cents and the tax rate an exact fraction num/den, so
+    # net profit = (ebit - interest) * (den - num) / den is kept as an exact integer numerator.
+    num, den = _as_decimal(tax_rate).as_integer_ratio()
+    amounts = np.stack([_as_float_array(v) for v in (liabilities, equity, assets, ebit, interest, revenue)])
+    # Missing and infinite amounts are both treated as missing (see REASON_MISSING_INPUT)
+    missing = ~np.isfinite(amounts)
+    scaled = np.rint(np.where(missing, 0.0, amounts) * CURRENCY_SCALE)
+    # Leaves headroom for ebit - interest times the tax fraction within int64
+    limit = 2.0 ** 62 / (2 * max(den, abs(den - num), 1))
+    if not np.isfinite(scaled).all() or (np.abs(scaled) > limit).any():
+        raise ValueError("Amounts are too large for the fixed-point backend; use 'decimal' instead.")
+    liabilities, equity, assets, ebit, interest, revenue = scaled.astype(np.int64)
+    (liabilities_missing, equity_missing, assets_missing,
+     ebit_missing, interest_missing, revenue_missing) = missing
+
+    ebt = ebit - interest
+    net_numerator = ebt * (den - num)
+    net_float = net_numerator.astype(np.float64)
+    arrays = {
+        'Debt_to_Equity': _masked_divide(liabilities.astype(np.float64), equity.astype(np.float64)),
+        'Profit_Margin': _masked_divide(net_float, (revenue * den).astype(np.float64)) * 100.0,
+        'Return_on_Assets': _masked_divide(net_float, (assets * den).astype(np.float64)),
+        'Return_on_Equity': _masked_divide(net_float, (equity * den).astype(np.float64)),
+        'Interest_Coverage_Ratio': _masked_divide(ebit.astype(np.float64), interest.astype(np.float64)),
+        'EBT': ebt / CURRENCY_SCALE,
+        'Net_Profit': _round_half_even_divide(net_numerator, den) / CURRENCY_SCALE,
+    }
+    # Missing inputs were zero-filled above; put NaN back into every result that depends on them
+    profit_missing = ebit_missing | interest_missing
+    for name, mask in (('Debt_to_Equity', liabilities_missing | equity_missing),
+                       ('Profit_Margin', profit_missing | revenue_missing),
+                       ('Return_on_Assets', profit_missing | assets_missing),
+                       ('Return_on_Equity', profit_missing | equity_missing),
+                       ('Interest_Coverage_Ratio', profit_missing),
+                       ('EBT', profit_missing),
+                       ('Net_Profit', profit_missing)):
+        arrays[name][mask] = np.nan
+    arrays['Reason_Code'] = _reason_codes((equity == 0) & ~equity_missing, (assets == 0) & ~assets_missing,
+                                          (interest == 0) & ~interest_missing, (revenue == 0) & ~revenue_missing)
+    return arrays
+
+
+def _decimal_ratio_arrays(liabilities, equity, assets, ebit, interest, revenue, tax_rate) -> dict:
+    ctx = RATIO_CONTEXT
+    keep = ctx.subtract(Decimal(1), _as_decimal(tax_rate))
+    hundred = Decimal(100)
+    n = len(ebit)
+    # None where a value is undefined (pandas reads it as missing, float64 conversion as NaN)
+    arrays = {name: np.full(n, None, dtype=object) for name in RATIO_COLUMNS + ['EBT', 'Net_Profit']}
+    zero = {name: np.zeros(n, dtype=bool) for name in ('equity', 'assets', 'interest', 'revenue')}
+    rows = zip(*([_decimal_input(x) for x in v] for v in (liabilities, equity, assets, ebit, interest, revenue)))
+    for i, (l, e, a, b, t, r) in enumerate(rows):
+        ebt = ctx.subtract(b, t)
+        net_profit = ctx.multiply(ebt, keep)
+        arrays['EBT'][i] = ebt
+        arrays['Net_Profit'][i] = net_profit
+        # A Decimal is falsy only when it is zero (a quiet NaN is truthy and propagates through divide)
+        if e:
+            arrays['Debt_to_Equity'][i] = ctx.divide(l, e)
+            arrays['Return_on_Equity'][i] = ctx.divide(net_profit, e)
+        else:
+            zero['equity'][i] = True
+        if a:
+            arrays['Return_on_Assets'][i] = ctx.divide(net_profit, a)
+        else:
+            zero['assets'][i] = True
+        if t:
+            arrays['Interest_Coverage_Ratio'][i] = ctx.divide(b, t)
+        else:
+            zero['interest'][i] = True
+        if r:
+            arrays['Profit_Margin'][i] = ctx.multiply(ctx.divide(net_profit, r), hundred)
+        else:
+            zero['revenue'][i] = True
+    for values in arrays.values():
+        values[[value is not None and value.is_nan() for value in values]] = None
+    arrays['Reason_Code'] = _reason_codes(zero['equity'], zero['assets'], zero['interest'], zero['revenue'])
+    return arrays
+
+
+_BACKEND_FUNCTIONS = {
+    'decimal': _decimal_ratio_arrays,
+    'fixed': _fixed_ratio_arrays,
+    'float': _float_ratio_arrays,
+}
 
-# Set the global precision for Decimal operations.
-# 28 digits is a common recommendation for financial applications.
-getcontext().prec = 28
 
 class FinancialRatios:
     """
     A class containing static methods for calculating various financial ratios.
-    All calculations use decimal.Decimal for arbitrary-precision arithmetic.
+    The scalar methods use decimal.Decimal arithmetic in RATIO_CONTEXT; the batch methods
+    take a backend argument (see BACKENDS).
     Methods raise ValueError for invalid or undefined calculations (e.g., division by zero).
     """
 
@@ -21,7 +233,7 @@ class FinancialRatios:
         """
         if shareholders_equity.compare(Decimal('0')) == 0:
             raise ValueError("Shareholders' Equity cannot be zero for Debt-to-Equity Ratio.")
-        return total_liabilities / shareholders_equity
+        return RATIO_CONTEXT.divide(total_liabilities, shareholders_equity)
 
     @staticmethod
     def calculate_return_on_assets(net_income: Decimal, average_total_assets: Decimal) -> Decimal:
@@ -32,7 +244,7 @@ class FinancialRatios:
         """
         if average_total_assets.compare(Decimal('0')) == 0:
             raise ValueError("Average Total Assets cannot be zero for Return on Assets.")
-        return net_income / average_total_assets
+        return RATIO_CONTEXT.divide(net_income, average_total_assets)
 
     @staticmethod
     def calculate_return_on_equity(net_income: Decimal, average_shareholders_equity: Decimal) -> Decimal:
@@ -43,7 +255,7 @@ class FinancialRatios:
         """
         if average_shareholders_equity.compare(Decimal('0')) == 0:
             raise ValueError("Average Shareholders' Equity cannot be zero for Return on Equity.")
-        return net_income / average_shareholders_equity
+        return RATIO_CONTEXT.divide(net_income, average_shareholders_equity)
 
     @staticmethod
     def calculate_interest_coverage_ratio(ebit: Decimal, interest_expense: Decimal) -> Decimal:
@@ -57,7 +269,7 @@ class FinancialRatios:
             # If EBIT is positive, it's effectively infinite.
             # Raising ValueError for clarity that it's an undefined/problematic scenario.
             raise ValueError("Interest Expense cannot be zero for Interest Coverage Ratio.")
-        return ebit / interest_expense
+        return RATIO_CONTEXT.divide(ebit, interest_expense)
 
     @staticmethod
     def calculate_profit_margin(net_profit: Decimal, revenue: Decimal) -> Decimal:
@@ -69,7 +281,7 @@ class FinancialRatios:
         if revenue.compare(Decimal('0')) == 0:
             raise ValueError("Revenue cannot be zero for Profit Margin.")
         # Multiply by 100 here to return a percentage value (e.g., 15.25 for 15.25%)
-        return (net_profit / revenue) * Decimal('100')
+        return RATIO_CONTEXT.multiply(RATIO_CONTEXT.divide(net_profit, revenue), Decimal('100'))
 
     @staticmethod
     def get_company_performance(profit_margin: Decimal, industry_benchmark: Decimal) -> str:
@@ -79,8 +291,85 @@ class FinancialRatios:
         """
         # Check if profit_margin is a valid number before comparison
         if profit_margin.is_nan() or profit_margin.is_infinite():
-            return "Cannot assess performance due to undefined or infinite profit margin."
+            return PERFORMANCE_UNDEFINED
         elif profit_margin < industry_benchmark:
             return "Poor"
         else:
             return "Exceptional"
+
+    @staticmethod
+    def calculate_ratio_arrays(total_liabilities, shareholders_equity, average_total_assets,
+                               ebit, interest_expense, revenue,
+                               tax_rate=DEFAULT_TAX_RATE, backend: str = DEFAULT_BACKEND) -> dict:
+        """
+        Vectorized counterpart of the scalar ratio methods.
+        Accepts scalars, lists, NumPy arrays or pandas Series (broadcast to a common length)
+        and returns a dict of float64 arrays keyed by RATIO_COLUMNS plus 'EBT' and 'Net_Profit'
+        (object arrays of Decimal for the decimal backend, with None for NaN).
+        Ratios with a zero denominator are NaN instead of raising ValueError, and the
+        'Reason_Code' entry holds the REASON_* flags explaining which ratios were masked.
+        Rows with a missing or non-finite input carry REASON_MISSING_INPUT.
+        backend selects the arithmetic ('decimal', 'fixed' or 'float'; see BACKENDS).
+        """
+        if backend not in _BACKEND_FUNCTIONS:
+            raise ValueError(f"Unknown ratio backend {backend!r}; expected one of {BACKENDS}.")
+        inputs = [v.to_numpy() if isinstance(v, pd.Series) else v
+                  for v in (total_liabilities, shareholders_equity, average_total_assets,
+                            ebit, interest_expense, revenue)]
+        # Decimal inputs stay as objects for the decimal backend; everything else is float64
+        dtype = object if backend == 'decimal' else np.float64
+        inputs = np.broadcast_arrays(*(np.atleast_1d(np.asarray(v, dtype=dtype)) for v in inputs))
+        # inf - inf and inf / inf give NaN quietly; those rows are flagged REASON_MISSING_INPUT below
+        with instrumentation.stage(f'ratios.{backend}'), np.errstate(invalid='ignore'):
+            results = _BACKEND_FUNCTIONS[backend](*inputs, tax_rate)
+        missing = np.zeros(results['Reason_Code'].shape, dtype=bool)
+        for values in inputs:
+            missing |= ~np.isfinite(np.asarray(values, dtype=np.float64))
+        results['Reason_Code'][missing] |= REASON_MISSING_INPUT
+        if instrumentation.enabled():
+            instrumentation.count('ratio_rows', results['Reason_Code'].size, backend=backend)
+            for flag, name in REASON_NAMES.items():
+                undefined = np.count_nonzero(results['Reason_Code'] & flag)
+                if undefined:
+                    instrumentation.count('ratio_undefined', undefined, reason=name)
+        return results
+
+    @staticmethod
+    def calculate_ratios_batch(total_liabilities, shareholders_equity, average_total_assets,
+                               ebit, interest_expense, revenue,
+                               tax_rate=DEFAULT_TAX_RATE, backend: str = DEFAULT_BACKEND) -> pd.DataFrame:
+        """
+        Computes every ratio for a batch of companies in one vectorized pass.
+        Takes the same inputs as calculate_ratio_arrays (typically DataFrame columns) and
+        returns a DataFrame with one column per ratio plus 'EBT', 'Net_Profit' and 'Reason_Code'.
+        If any input is a pandas Series its index is carried over to the result.
+        """
+        arrays = FinancialRatios.calculate_ratio_arrays(
+            total_liabilities, shareholders_equity, average_total_assets,
+            ebit, interest_expense, revenue, tax_rate=tax_rate, backend=backend,
+        )
+        index = next(
+            (v.index for v in (total_liabilities, shareholders_equity, average_total_assets,
+                               ebit, interest_expense, revenue)
+             if isinstance(v, pd.Series) and len(v) == len(arrays['EBT'])),
+            None,
+        )
+        return pd.DataFrame(arrays, index=index)
+
+    @staticmethod
+    def get_company_performance_batch(profit_margin, industry_benchmark) -> np.ndarray:
+        """
+        Vectorized counterpart of get_company_performance.
+        Both arguments are percentages and may be arrays, Series or scalars (a single benchmark
+        is broadcast across all rows). Returns an object array of the same labels as the scalar method.
+        """
+        profit_margin, industry_benchmark = np.broadcast_arrays(
+            np.atleast_1d(_as_float_array(profit_margin)),
+            np.atleast_1d(_as_float_array(industry_benchmark)),
+        )
+        undefined = ~np.isfinite(profit_margin) | np.isnan(industry_benchmark)
+        return np.where(
+            undefined,
+            PERFORMANCE_UNDEFINED,
+            np.where(profit_margin < industry_benchmark, "Poor", "Exceptional"),
+        ).astype(object)
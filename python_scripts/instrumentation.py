@@ -0,0 +1,283 @@
+"""
+Lightweight instrumentation for the MatchiFi pipeline.
+Code marks its stages and events, and the collected metrics are exported as a Prometheus
+text file (for the node_exporter textfile collector) or as a JSON snapshot:
+
+    with instrumentation.stage('batch.ratios'):
+        ratios = FinancialRatios.calculate_ratio_arrays(...)
+    instrumentation.count('ratio_undefined', 12, reason='zero_equity')
+
+Each stage records its number of calls, total and maximum wall-clock seconds, and an error
+count (by exception type) for calls that raised. Counters carry optional labels.
+
+Instrumentation is off by default. While disabled, stage() hands back one shared no-op
+context manager and count() returns after a flag check, so instrumented code pays about a
+function call per stage. enable() switches it on; setting MATCHIFI_METRICS_DIR does so at
+import and writes matchifi.prom and matchifi.json to that directory when the process exits.
+
+SamplingProfiler samples a thread's Python stack at a fixed interval, for switching on during
+a single batch run; it writes collapsed stacks that flame graph tools read.
+"""
+
+import atexit
+import contextlib
+import functools
+import json
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+
+METRIC_PREFIX = 'matchifi'
+
+# Enables instrumentation at import and receives the exports at exit
+METRICS_DIR_ENV = 'MATCHIFI_METRICS_DIR'
+
+DEFAULT_SAMPLE_INTERVAL = 0.005
+
+_enabled = False
+_lock = threading.Lock()
+_stages = {}    # name -> [calls, total seconds, max seconds]
+_counters = {}  # (name, sorted label items) -> value
+_NOOP = contextlib.nullcontext()
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def enable():
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def reset():
+    """Drops every recorded stage and counter."""
+    with _lock:
+        _stages.clear()
+        _counters.clear()
+
+
+def _count(name: str, value, labels: dict):
+    if hasattr(value, 'item'):
+        value = value.item()  # NumPy scalars, e.g. from np.count_nonzero
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def count(name: str, value=1, **labels):
+    """Adds value to the counter name with the given labels (no-op while disabled)."""
+    if _enabled:
+        _count(name, value, labels)
+
+
+class _StageTimer:
+    __slots__ = ('name', 'started')
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self.started
+        with _lock:
+            record = _stages.get(self.name)
+            if record is None:
+                record = _stages[self.name] = [0, 0.0, 0.0]
+            record[0] += 1
+            record[1] += seconds
+            if seconds > record[2]:
+                record[2] = seconds
+        if exc_type is not None:
+            _count('stage_errors', 1, {'stage': self.name, 'type': exc_type.__name__})
+        return False
+
+
+def stage(name: str):
+    """Context manager timing one call of the named stage."""
+    if not _enabled:
+        return _NOOP
+    return _StageTimer(name)
+
+
+def timed(name: str):
+    """Decorator timing every call of the function as the named stage."""
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return function(*args, **kwargs)
+            with _StageTimer(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def timed_iter(name: str, iterable):
+    """Yields from iterable, timing each step (producing one item) as the named stage."""
+    if not _enabled:
+        yield from iterable
+        return
+    iterator = iter(iterable)
+    while True:
+        with _StageTimer(name):
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+        yield item
+
+
+def snapshot() -> dict:
+    """The recorded metrics as a JSON-serialisable dict."""
+    with _lock:
+        stages = {name: {'calls': calls, 'seconds': total, 'max_seconds': longest,
+                         'mean_seconds': total / calls if calls else 0.0}
+                  for name, (calls, total, longest) in sorted(_stages.items())}
+        counters = [{'name': name, 'labels': dict(labels), 'value': value}
+                    for (name, labels), value in sorted(_counters.items())]
+    return {
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'enabled': _enabled,
+        'stages': stages,
+        'counters': counters,
+    }
+
+
+def _metric_name(name: str) -> str:
+    return f"{METRIC_PREFIX}_" + re.sub(r'[^a-zA-Z0-9_]', '_', name)
+
+
+def _labels(labels: dict) -> str:
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+               for value in labels.values())
+    return '{' + ','.join(f'{re.sub(r"[^a-zA-Z0-9_]", "_", key)}="{value}"'
+                          for key, value in zip(labels, escaped)) + '}'
+
+
+def prometheus_text(state: dict = None) -> str:
+    """Renders a snapshot in the Prometheus text exposition format."""
+    state = state or snapshot()
+    seconds = _metric_name('stage_seconds')
+    lines = [f"# HELP {seconds} Wall-clock time spent in each pipeline stage.",
+             f"# TYPE {seconds} summary"]
+    for name, record in state['stages'].items():
+        label = _labels({'stage': name})
+        lines.append(f"{seconds}_count{label} {record['calls']}")
+        lines.append(f"{seconds}_sum{label} {record['seconds']!r}")
+    lines += [f"# HELP {seconds}_max Longest single call of each pipeline stage.",
+              f"# TYPE {seconds}_max gauge"]
+    for name, record in state['stages'].items():
+        lines.append(f"{seconds}_max{_labels({'stage': name})} {record['max_seconds']!r}")
+
+    by_name = {}
+    for counter in state['counters']:
+        by_name.setdefault(counter['name'], []).append(counter)
+    for name, counters in by_name.items():
+        metric = _metric_name(name) + '_total'
+        lines.append(f"# TYPE {metric} counter")
+        lines.extend(f"{metric}{_labels(counter['labels'])} {counter['value']}" for counter in counters)
+    return '\n'.join(lines) + '\n'
+
+
+def _write_atomic(path: str, text: str):
+    # Scrapers must never read a half-written file
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, 'w') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def write_prometheus(path: str, state: dict = None):
+    _write_atomic(path, prometheus_text(state))
+
+
+def write_json(path: str, state: dict = None):
+    _write_atomic(path, json.dumps(state or snapshot(), indent=2))
+
+
+def write_metrics_dir(directory: str):
+    """Writes matchifi.prom and matchifi.json into directory."""
+    os.makedirs(directory, exist_ok=True)
+    state = snapshot()
+    write_prometheus(os.path.join(directory, f"{METRIC_PREFIX}.prom"), state)
+    write_json(os.path.join(directory, f"{METRIC_PREFIX}.json"), state)
+
+
+class SamplingProfiler:
+    """
+    Samples the Python stack of one thread (default: the creating thread) every interval
+    seconds from a background thread. samples counts collapsed stacks
+    ('module:function;module:function', outermost first).
+    """
+
+    def __init__(self, interval: float = DEFAULT_SAMPLE_INTERVAL, thread_id: int = None):
+        self.interval = interval
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.splitext(os.path.basename(code.co_filename))[0]}:{code.co_name}")
+                frame = frame.f_back
+            if stack:
+                self.samples[';'.join(reversed(stack))] += 1
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._sample, name='matchifi-profiler', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+    def top_functions(self, n: int = 10) -> list:
+        """[(function, share of samples)] for the n functions most often on top of the stack."""
+        total = sum(self.samples.values())
+        leaves = Counter()
+        for stack, samples in self.samples.items():
+            leaves[stack.rsplit(';', 1)[-1]] += samples
+        return [(function, samples / total) for function, samples in leaves.most_common(n)]
+
+    def write_collapsed(self, path: str):
+        """Writes one 'stack count' line per distinct stack (flamegraph.pl / speedscope input)."""
+        with open(path, 'w') as f:
+            for stack, samples in self.samples.most_common():
+                f.write(f"{stack} {samples}\n")
+
+
+if os.environ.get(METRICS_DIR_ENV):
+    enable()
+    atexit.register(write_metrics_dir, os.environ[METRICS_DIR_ENV])
@@ -0,0 +1,222 @@
+"""
+Compact scorer for the MatchiFi loan classifier.
+A fitted binary linear model (e.g. LogisticRegression) reduces to a coefficient vector and an
+intercept, so one applicant can be scored with a plain dot product plus a sigmoid instead of
+building a DataFrame and going through sklearn's input validation on every request.
+For pipelines built by ratio_preprocessing.build_pipeline the StandardScaler is folded into the
+coefficients, and only the clip/log step of the RatioTransformer is applied to the inputs.
+Importing this module loads NumPy only: the GUI imports it at startup, so SciPy and the
+sklearn-based ratio_preprocessing are imported by the batch methods on first use.
+"""
+
+import math
+
+import numpy as np
+
+from model_artifact import get_artifact
+
+
+def approval_index(classes) -> int:
+    """
+    Index of the class that means "approved" in a binary classes_ array.
+    String labels starting with 'approv' (e.g. 'Approved', 'Approve') and the numeric label 1
+    are recognised; otherwise the positive class (index 1) is assumed.
+    """
+    for i, label in enumerate(classes):
+        if isinstance(label, str):
+            if label.strip().lower().startswith('approv'):
+                return i
+        elif label == 1:
+            return i
+    return 1
+
+
+def _is_ratio_transformer(step) -> bool:
+    return all(hasattr(step, name) for name in ('lower_', 'upper_', 'log_mask_'))
+
+
+def _is_standard_scaler(step) -> bool:
+    # The other sklearn scalers also have scale_, but not mean_ and var_
+    return all(hasattr(step, name) for name in ('mean_', 'var_', 'scale_'))
+
+
+class LinearScorer:
+    """
+    Scores applicants with the coefficients extracted from a fitted binary linear classifier.
+    Inputs must follow feature_names order. Probabilities are always approval probabilities
+    (see approval_index), while labels follow sklearn's rule of decision > 0 -> classes_[1].
+    """
+
+    def __init__(self, coef, intercept: float, classes, feature_names,
+                 lower=None, upper=None, log_mask=None):
+        if len(classes) != 2:
+            raise ValueError("LinearScorer only supports binary classifiers.")
+        # Kept 2-D, shape (1, n_features), so batch scoring performs the same product as sklearn.
+        self.coef = np.ascontiguousarray(coef, dtype=np.float64).reshape(1, -1)
+        self.intercept = float(intercept)
+        self.classes = np.asarray(classes)
+        self.negative_label = classes[0]
+        self.positive_label = classes[1]
+        self.approve_index = approval_index(list(classes))
+        self.approve_label = classes[self.approve_index]
+        # expit(sign * z) is the approval probability
+        self._sign = 1.0 if self.approve_index == 1 else -1.0
+        self.feature_names = list(feature_names)
+        if len(self.feature_names) != self.coef.shape[1]:
+            raise ValueError("Number of feature names does not match the number of coefficients.")
+        # Optional RatioTransformer parameters, applied to inputs before the dot product
+        self.has_transform = lower is not None
+        if self.has_transform:
+            self.lower = np.asarray(lower, dtype=np.float64)
+            self.upper = np.asarray(upper, dtype=np.float64)
+            self.log_mask = np.asarray(log_mask, dtype=bool)
+        # Plain Python values for the single-applicant path
+        self._coef_list = self.coef.ravel().tolist()
+        if self.has_transform:
+            self._transform_list = list(zip(self.lower.tolist(), self.upper.tolist(), self.log_mask.tolist()))
+
+    @classmethod
+    def from_model(cls, model, feature_names) -> "LinearScorer":
+        """
+        Extracts coef_, intercept_ and classes_ from a fitted sklearn linear classifier, or from
+        a Pipeline of an optional RatioTransformer, an optional StandardScaler and the classifier.
+        Pipeline steps are recognised by their fitted attributes (lower_/upper_/log_mask_ and
+        mean_/var_/scale_), so sklearn is not imported here.
+        """
+        transform = {}
+        mean = scale = None
+        classifier = model
+        if hasattr(model, 'steps'):
+            *preprocessors, (_, classifier) = model.steps
+            for _, step in preprocessors:
+                if _is_ratio_transformer(step) and mean is None:
+                    transform = dict(lower=step.lower_, upper=step.upper_, log_mask=step.log_mask_)
+                elif _is_standard_scaler(step) and mean is None:
+                    mean = step.mean_ if step.mean_ is not None else 0.0
+                    scale = step.scale_ if step.scale_ is not None else 1.0
+                else:
+                    raise ValueError(f"Cannot fold pipeline step {step!r} into a LinearScorer.")
+
+        coef = np.asarray(classifier.coef_[0], dtype=np.float64)
+        intercept = float(classifier.intercept_[0])
+        if mean is not None:
+            # w . (x - mean) / scale + b  ==  (w / scale) . x + (b - (w / scale) . mean)
+            coef = coef / scale
+            intercept -= float(np.dot(coef, np.broadcast_to(mean, coef.shape)))
+        return cls(coef, intercept, list(classifier.classes_), feature_names, **transform)
+
+    @classmethod
+    def from_artifact(cls, artifact) -> "LinearScorer":
+        return cls.from_model(artifact.model, artifact.feature_names)
+
+    @property
+    def n_features(self) -> int:
+        return self.coef.shape[1]
+
+    def decision_one(self, values) -> float:
+        """Linear decision value for one applicant given as a sequence in feature order."""
+        z = self.intercept
+        if self.has_transform:
+            for w, x, (lo, hi, log) in zip(self._coef_list, values, self._transform_list):
+                x = lo if x < lo else hi if x > hi else x
+                if log:
+                    x = math.copysign(math.log1p(abs(x)), x)
+                z += w * x
+            return z
+        for w, x in zip(self._coef_list, values):
+            z += w * x
+        return z
+
+    def score_one(self, values):
+        """
+        Scores a single applicant given as a sequence of floats in feature order.
+        Returns (approval probability, label).
+        """
+        z = self.decision_one(values)
+        a = self._sign * z
+        if a >= 0:
+            probability = 1.0 / (1.0 + math.exp(-a))
+        else:
+            e = math.exp(a)
+            probability = e / (1.0 + e)
+        return probability, (self.positive_label if z > 0 else self.negative_label)
+
+    def score_mapping(self, features: dict):
+        """Scores a single applicant given as a {feature name: value} mapping."""
+        return self.score_one([float(features[name]) for name in self.feature_names])
+
+    def decision_batch(self, X: np.ndarray, out: np.ndarray = None) -> np.ndarray:
+        """
+        Decision values for a 2-D array of applicants, shape (n, n_features).
+        If out is given (a float64 buffer of length n) it is filled in place and returned.
+        """
+        X = np.asarray(X, dtype=np.float64)
+        if self.has_transform:
+            from ratio_preprocessing import apply_ratio_transform
+            X = apply_ratio_transform(X, self.lower, self.upper, self.log_mask)
+        if out is None:
+            out = np.empty(X.shape[0], dtype=np.float64)
+        np.matmul(X, self.coef.T, out=out.reshape(-1, 1))
+        out += self.intercept
+        return out
+
+    def score_batch(self, X: np.ndarray, out: np.ndarray = None):
+        """
+        Scores a 2-D array of applicants, optionally into a preallocated probability buffer.
+        Returns (approval probabilities, labels) where labels is an array drawn from classes.
+        """
+        from scipy.special import expit
+
+        decision = self.decision_batch(X, out=out)
+        positive = decision > 0
+        if self._sign < 0:
+            np.negative(decision, out=decision)
+        expit(decision, out=decision)
+        return decision, self.classes[positive.astype(np.intp)]
+
+    def labels_from_probability(self, probability: np.ndarray) -> np.ndarray:
+        """Recovers the labels score_batch would return from its approval probabilities."""
+        if self.approve_index == 1:
+            positive = probability > 0.5
+        else:
+            positive = ~(probability >= 0.5)
+        return self.classes[positive.astype(np.intp)]
+
+    def check_agreement(self, model, X, atol: float = 1e-12) -> float:
+        """
+        Compares this scorer with model.predict_proba / model.predict on X (array or DataFrame).
+        Labels must match exactly and probabilities to within atol (floating-point rounding).
+        Returns the largest absolute probability difference; raises ValueError on disagreement.
+        """
+        expected_probabilities = model.predict_proba(X)[:, self.approve_index]
+        expected_labels = model.predict(X)
+        X = np.asarray(X, dtype=np.float64)
+        probabilities, labels = self.score_batch(X)
+
+        mismatches = int(np.count_nonzero(labels != expected_labels))
+        max_diff = float(np.max(np.abs(probabilities - expected_probabilities), initial=0.0))
+        # The single-applicant path must agree too
+        for row, expected in zip(X[:64], expected_probabilities[:64]):
+            max_diff = max(max_diff, abs(self.score_one(row.tolist())[0] - expected))
+
+        if mismatches or max_diff > atol:
+            raise ValueError(
+                f"LinearScorer disagrees with the model: {mismatches} label mismatches, "
+                f"max probability difference {max_diff:.3e}."
+            )
+        return max_diff
+
+
+_cached_scorer = (None, None)
+
+
+def get_scorer(artifact=None) -> LinearScorer:
+    """Returns a LinearScorer for artifact (default: the process-wide artifact), built once per artifact."""
+    global _cached_scorer
+    if artifact is None:
+        artifact = get_artifact()
+    cached_artifact, scorer = _cached_scorer
+    if cached_artifact is not artifact:
+        scorer = LinearScorer.from_artifact(artifact)
+        _cached_scorer = (artifact, scorer)
+    return scorer
@@ -0,0 +1,256 @@
+"""
+Loan-product matching for MatchiFi.
+Loads the loan_products table once into in-memory indexes and returns, for any applicant,
+the ranked set of products they are eligible for:
+
+    - sector:       products targeting the applicant's sector, plus products with no target sector
+    - amount:       min_amount <= loan amount <= max_amount
+    - term:         min_term_months <= term <= max_term_months
+    - credit score: required_min_credit_score <= applicant score (or no requirement)
+
+Every product owns one bit of a Python int, assigned in ranking order (lowest typical interest
+rate first). Each range condition is answered by a binary search over the sorted interval
+endpoints, which selects a precomputed prefix/suffix bitmask, so a query is a handful of
+bisects and integer ANDs rather than a scan over all products.
+
+Usage: python loan_matching.py matchifi.db applicants.csv matches.csv
+"""
+
+import argparse
+import math
+import sqlite3
+import sys
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+LoanProduct = namedtuple('LoanProduct', [
+    'product_id', 'product_name', 'min_amount', 'max_amount', 'min_term_months',
+    'max_term_months', 'typical_interest_rate', 'target_sector_id', 'required_min_credit_score',
+])
+
+PRODUCT_QUERY = "SELECT " + ", ".join(LoanProduct._fields) + " FROM loan_products"
+
+# Applicant columns expected by match_file
+APPLICANT_COLUMNS = ['sector_id', 'loan_amount', 'loan_term_months', 'credit_score']
+
+
+def _missing(value) -> bool:
+    """None or NaN, which match_batch reads as "none given" for sector ids and credit scores."""
+    return value is None or value != value
+
+
+def _rank_key(product: LoanProduct):
+    rate = product.typical_interest_rate
+    return (rate is None, rate if rate is not None else 0.0, product.product_id)
+
+
+class _EndpointIndex:
+    """
+    Sorted interval endpoints with cumulative bitmasks.
+    lower_mask(x) is the set of products whose lower bound is <= x and upper_mask(x) the set
+    whose upper bound is >= x; their intersection is the set of intervals containing x.
+    """
+
+    def __init__(self, lows, highs):
+        n = len(lows)
+        low_order = sorted(range(n), key=lambda i: lows[i])
+        high_order = sorted(range(n), key=lambda i: highs[i])
+        self.lows = np.array([lows[i] for i in low_order], dtype=np.float64)
+        self.highs = np.array([highs[i] for i in high_order], dtype=np.float64)
+
+        # low_prefix[k]: products among the k smallest lower bounds
+        self.low_prefix = np.empty(n + 1, dtype=object)
+        self.low_prefix[0] = mask = 0
+        for k, i in enumerate(low_order, 1):
+            mask |= 1 << i
+            self.low_prefix[k] = mask
+        # high_suffix[k]: products from the k-th smallest upper bound upwards
+        self.high_suffix = np.empty(n + 1, dtype=object)
+        self.high_suffix[n] = mask = 0
+        for k in range(n - 1, -1, -1):
+            mask |= 1 << high_order[k]
+            self.high_suffix[k] = mask
+        self._lows = self.lows.tolist()
+        self._highs = self.highs.tolist()
+
+    def containing(self, x) -> int:
+        # As in containing_batch, a missing or non-finite value lies in no interval
+        if x is None or not math.isfinite(x):
+            return 0
+        x = float(x)
+        return (self.low_prefix[bisect_right(self._lows, x)]
+                & self.high_suffix[bisect_left(self._highs, x)])
+
+    def containing_batch(self, x: np.ndarray) -> np.ndarray:
+        return (self.low_prefix[np.searchsorted(self.lows, x, side='right')]
+                & self.high_suffix[np.searchsorted(self.highs, x, side='left')])
+
+
+class LoanProductIndex:
+    """
+    In-memory eligibility indexes over a list of LoanProduct rows; see the module docstring.
+    """
+
+    def __init__(self, products):
+        self.products = sorted(products, key=_rank_key)
+        n = len(self.products)
+        self.all_mask = (1 << n) - 1
+
+        # Sector index: products for a given sector plus the sector-agnostic ones
+        self.any_sector_mask = 0
+        self.sector_masks = {}
+        for bit, product in enumerate(self.products):
+            if product.target_sector_id is None:
+                self.any_sector_mask |= 1 << bit
+            else:
+                sector = int(product.target_sector_id)
+                self.sector_masks[sector] = self.sector_masks.get(sector, 0) | (1 << bit)
+
+        self.amounts = _EndpointIndex([float(p.min_amount) for p in self.products],
+                                      [float(p.max_amount) for p in self.products])
+        self.terms = _EndpointIndex([p.min_term_months for p in self.products],
+                                    [p.max_term_months for p in self.products])
+
+        # Credit-score index: products without a requirement, and sorted requirements with prefix masks
+        self.no_score_mask = 0
+        scored = []
+        for bit, product in enumerate(self.products):
+            if product.required_min_credit_score is None:
+                self.no_score_mask |= 1 << bit
+            else:
+                scored.append((product.required_min_credit_score, bit))
+        scored.sort()
+        self.required_scores = np.array([score for score, _ in scored], dtype=np.float64)
+        self._required_scores = self.required_scores.tolist()
+        self.score_prefix = np.empty(len(scored) + 1, dtype=object)
+        self.score_prefix[0] = mask = self.no_score_mask
+        for k, (_, bit) in enumerate(scored, 1):
+            mask |= 1 << bit
+            self.score_prefix[k] = mask
+
+    @classmethod
+    def from_connection(cls, conn: sqlite3.Connection) -> "LoanProductIndex":
+        """Loads every row of loan_products (see matchifi_db) into a new index."""
+        return cls([LoanProduct(*row) for row in conn.execute(PRODUCT_QUERY)])
+
+    def __len__(self) -> int:
+        return len(self.products)
+
+    def _sector_mask(self, sector_id) -> int:
+        if _missing(sector_id):
+            return self.any_sector_mask
+        return self.sector_masks.get(int(sector_id), 0) | self.any_sector_mask
+
+    def _score_mask(self, credit_score) -> int:
+        if _missing(credit_score):
+            return self.no_score_mask
+        return self.score_prefix[bisect_right(self._required_scores, credit_score)]
+
+    def eligible_mask(self, sector_id, amount, term_months, credit_score=None) -> int:
+        """
+        Bitmask of eligible products; bit i refers to self.products[i]. A missing or
+        non-finite amount or term matches no product, as in match_batch.
+        """
+        return (self._sector_mask(sector_id)
+                & self.amounts.containing(amount)
+                & self.terms.containing(term_months)
+                & self._score_mask(credit_score))
+
+    def products_from_mask(self, mask: int, limit: int = None) -> list:
+        """Decodes a bitmask into products, best ranked first."""
+        matches = []
+        while mask and (limit is None or len(matches) < limit):
+            low_bit = mask & -mask
+            matches.append(self.products[low_bit.bit_length() - 1])
+            mask ^= low_bit
+        return matches
+
+    def match(self, sector_id, amount, term_months, credit_score=None, limit: int = None) -> list:
+        """
+        Returns the products the applicant is eligible for, ranked by typical interest rate
+        (lowest first, products without a rate last, ties broken by product_id).
+        """
+        return self.products_from_mask(
+            self.eligible_mask(sector_id, amount, term_months, credit_score), limit)
+
+    def match_batch(self, sector_ids, amounts, terms, credit_scores=None) -> np.ndarray:
+        """
+        Eligibility bitmasks for a whole batch of applicants (object array of Python ints).
+        Range lookups for all applicants are done with one np.searchsorted per index;
+        NaN sector ids or credit scores mean "none given".
+        """
+        sector_ids = np.asarray(sector_ids, dtype=np.float64)
+        n = len(sector_ids)
+        sector = np.fromiter(
+            (self._sector_mask(s) for s in sector_ids), dtype=object, count=n)
+
+        if credit_scores is None:
+            score = np.full(n, self.no_score_mask, dtype=object)
+        else:
+            credit_scores = np.asarray(credit_scores, dtype=np.float64)
+            score = self.score_prefix[np.searchsorted(self.required_scores, credit_scores, side='right')]
+            score[np.isnan(credit_scores)] = self.no_score_mask
+
+        return (sector
+                & self.amounts.containing_batch(np.asarray(amounts, dtype=np.float64))
+                & self.terms.containing_batch(np.asarray(terms, dtype=np.float64))
+                & score)
+
+    def match_frame(self, applicants: pd.DataFrame, limit: int = None) -> pd.DataFrame:
+        """
+        Matches a DataFrame with APPLICANT_COLUMNS (credit_score optional) and returns one row
+        per (applicant, eligible product) with the applicant's row position and the product's rank.
+        """
+        masks = self.match_batch(
+            applicants['sector_id'], applicants['loan_amount'], applicants['loan_term_months'],
+            applicants['credit_score'] if 'credit_score' in applicants else None,
+        )
+        records = []
+        for position, mask in enumerate(masks):
+            for rank, product in enumerate(self.products_from_mask(mask, limit), 1):
+                records.append((position, rank, product.product_id, product.product_name,
+                                product.typical_interest_rate))
+        return pd.DataFrame.from_records(
+            records, columns=['applicant_row', 'rank', 'product_id', 'product_name', 'typical_interest_rate'])
+
+
+def match_file(index: LoanProductIndex, input_path: str, output_path: str,
+               chunksize: int = 100_000, limit: int = None) -> int:
+    """Matches a CSV of applicants chunk by chunk and writes the matches to a CSV; returns the match count."""
+    written = 0
+    offset = 0
+    with pd.read_csv(input_path, chunksize=chunksize) as reader:
+        for chunk in reader:
+            matches = index.match_frame(chunk, limit)
+            matches['applicant_row'] += offset
+            matches.to_csv(output_path, mode='w' if offset == 0 else 'a', header=offset == 0, index=False)
+            written += len(matches)
+            offset += len(chunk)
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Match applicants to eligible loan products.")
+    parser.add_argument('database', help="SQLite database with the loan_products table.")
+    parser.add_argument('input', help="CSV with columns: " + ", ".join(APPLICANT_COLUMNS))
+    parser.add_argument('output', help="CSV to write one row per eligible product to.")
+    parser.add_argument('--limit', type=int, default=None, help="Keep only the top N products per applicant.")
+    args = parser.parse_args(argv)
+
+    try:
+        conn = sqlite3.connect(args.database)
+        index = LoanProductIndex.from_connection(conn)
+        conn.close()
+        written = match_file(index, args.input, args.output, limit=args.limit)
+    except (OSError, KeyError, sqlite3.Error) as e:
+        print(f"Matching failed: {e}", file=sys.stderr)
+        return 1
+    print(f"Wrote {written} matches to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,43 +1,17 @@
-
-import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-from sklearn.linear_model import LogisticRegression
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import accuracy_score, classification_report, confusion_matrix
-from joblib import dump, load
-
 import sys
-from decimal import Decimal, InvalidOperation, getcontext
+from decimal import Decimal, InvalidOperation
 from PyQt5.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QLabel, QLineEdit, QPushButton, QMessageBox, QTextEdit
 )
 
-"""trains the classification model"""
-
-data_df=pd.read_excel(r'C:\Users\ifb21-044\OneDrive - Botswana Accountancy College\Documents\FNBB hackathon\MatchiFi\Loan.xlsx',header=2)
-print(data_df.head())
-
-#defines the predictor and target variables for the model
-x=data_df.drop(['Unnamed: 0','Company Name','Loan_Status'],axis=1)
-y=data_df['Loan_Status']
-
-# splits train data
-x_train,x_test,y_train,y_test=train_test_split(x,y,test_size=0.3, shuffle=True, random_state=50)
-
-# fits ml model
-model=LogisticRegression(C=10,penalty='l2',solver='saga',max_iter=10000)
+import instrumentation
+from linear_scorer import get_scorer
+from model_artifact import get_artifact, reload_artifact_if_changed
+from ratio_graph import RatioGraph
+from result_cache import cached_prediction, get_result_cache
 
-pred_model=model.fit(x_train,y_train)
-y_pred=pred_model.predict(x_test)
-y_pred
-
-#saves the trained model for reuse
-dump(pred_model,'logistic_model.joblib')
-
-accuracy=accuracy_score(y_test,y_pred)
-print(accuracy)
+"""GUI for the trained classification model.
+The model is trained separately (see train_classifier.py) and loaded lazily on the first prediction."""
 
 
 class MatchiFiApp(QWidget):
@@ -81,27 +55,44 @@ class MatchiFiApp(QWidget):
 
         self.setLayout(self.layout)
        
+    @instrumentation.timed('classifier_app.request')
     def make_prediction(self):
-        # Parse inputs safely as Decimals
-       
-        results_dict={
-            'Debt_to_Equity':float(Decimal(self.debt_to_equity_input.text())),
-            'Profit_Margin':float(Decimal(self.profit_margin_input.text())),
-            'Return_on_Assets':float(Decimal(self.return_on_assets_input.text())),
-            'Return_on_Equity':float(Decimal(self.return_on_equity_input.text())),
-            'Interest_Coverage_Ratio':float(Decimal(self.interest_coverage_ratio_input.text()))
-            }
-            
-        df=pd.DataFrame(results_dict,index=['0'])
-        
-        """out of sample data is fit to the trained model"""
-        
-        prediction=pred_model.predict(df)
+        # Parse inputs safely as Decimals; the ratios are entered directly into the ratio graph
+        try:
+            with instrumentation.stage('classifier_app.parse'):
+                values = RatioGraph().evaluate(
+                    debt_to_equity=Decimal(self.debt_to_equity_input.text()),
+                    profit_margin=Decimal(self.profit_margin_input.text()),
+                    roa=Decimal(self.return_on_assets_input.text()),
+                    roe=Decimal(self.return_on_equity_input.text()),
+                    icr=Decimal(self.interest_coverage_ratio_input.text()),
+                )
+        except InvalidOperation:
+            QMessageBox.warning(self, "Input Error", "Please enter valid numeric values for all fields.")
+            return
+
+        try:
+            # picks up a model refreshed on disk (e.g. by online_update.py) since the last click
+            reload_artifact_if_changed()
+            artifact = get_artifact()
+            scorer = get_scorer(artifact)
+        except (OSError, ValueError) as e:
+            QMessageBox.critical(self, "Model Error", f"Could not load the trained model: {e}")
+            return
+
+        """out of sample data is scored with the trained model's coefficients"""
+
+        # repeated submissions are served from the result cache until a new model is deployed
+        with instrumentation.stage('classifier_app.predict'):
+            probability, prediction = cached_prediction(
+                get_result_cache(), scorer, artifact.version, values.features(scorer.feature_names))
+        instrumentation.count('predictions', status=str(prediction))
             
         output_text = (
                 "---Probable outcome of the loan application---\n"
                     )
-        output_text += f"Application status: {prediction}"
+        output_text += f"Application status: {prediction}\n"
+        output_text += f"Approval probability: {probability:.2%}"
         
         self.result_display.setPlainText(output_text)
        
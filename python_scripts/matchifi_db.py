@@ -0,0 +1,292 @@
+"""
+Data-access layer over the MatchiFi schema (schema/Matchifi_database.sql).
+SQLite stands in locally for the production MySQL database: the tables mirror the MySQL DDL
+and carry the indexes the feature join needs. Training and scoring features are streamed from
+the client_detail ⋈ sectors ⋈ loan_applications join with a chunked cursor (fetchmany) straight
+into NumPy arrays, so the full result set is never held in memory at once.
+
+Usage:
+    python matchifi_db.py init matchifi.db
+    python matchifi_db.py bench [--sizes 10000 100000 1000000]
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from model_artifact import FEATURE_COLUMNS
+
+# SQLite translation of schema/Matchifi_database.sql. ENUMs become CHECK constraints and
+# AUTO_INCREMENT keys become INTEGER PRIMARY KEY (rowid) columns.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS clients (
+    company_id INTEGER PRIMARY KEY,
+    company_name VARCHAR(20),
+    company_type TEXT CHECK (company_type IN ('sole', 'part'))
+);
+
+CREATE TABLE IF NOT EXISTS sectors (
+    sector_id INTEGER PRIMARY KEY,
+    sector_name VARCHAR(20),
+    asset_turnover REAL,
+    net_pm REAL,
+    debt_to_eq REAL
+);
+
+CREATE TABLE IF NOT EXISTS client_detail (
+    company_id INTEGER PRIMARY KEY REFERENCES clients(company_id),
+    sector_id INTEGER REFERENCES sectors(sector_id),
+    debt_to_eq REAL,
+    gross_pm REAL,
+    net_pm REAL,
+    return_on_assets REAL,
+    return_on_equity REAL,
+    interest_coverage INTEGER
+);
+
+CREATE TABLE IF NOT EXISTS loan_products (
+    product_id INTEGER PRIMARY KEY,
+    product_name VARCHAR(50) NOT NULL,
+    min_amount NUMERIC NOT NULL,
+    max_amount NUMERIC NOT NULL,
+    min_term_months INTEGER NOT NULL,
+    max_term_months INTEGER NOT NULL,
+    typical_interest_rate REAL,
+    target_sector_id INTEGER REFERENCES sectors(sector_id),
+    required_min_credit_score INTEGER
+);
+
+CREATE TABLE IF NOT EXISTS loan_applications (
+    application_id INTEGER PRIMARY KEY,
+    company_id INTEGER NOT NULL REFERENCES clients(company_id),
+    product_id INTEGER NOT NULL REFERENCES loan_products(product_id),
+    loan_amount NUMERIC NOT NULL,
+    loan_term_months INTEGER NOT NULL,
+    loan_status TEXT NOT NULL CHECK (loan_status IN ('Approved', 'Rejected')),
+    application_date DATE
+);
+"""
+
+# Indexes for the feature join (kept in step with schema/Matchifi_database.sql).
+# client_detail is clustered on company_id (its primary key), so each application's lookup
+# reads the feature row directly; the sector index serves per-sector scans and the FK.
+INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_client_detail_sector ON client_detail (sector_id, company_id);
+CREATE INDEX IF NOT EXISTS idx_loan_applications_company ON loan_applications (company_id, application_id);
+CREATE INDEX IF NOT EXISTS idx_loan_applications_product ON loan_applications (product_id);
+CREATE INDEX IF NOT EXISTS idx_loan_applications_date ON loan_applications (application_date, application_id);
+"""
+
+# client_detail column for each model feature, in FEATURE_COLUMNS order
+FEATURE_SOURCE_COLUMNS = {
+    'Debt_to_Equity': 'debt_to_eq',
+    'Profit_Margin': 'net_pm',
+    'Return_on_Assets': 'return_on_assets',
+    'Return_on_Equity': 'return_on_equity',
+    'Interest_Coverage_Ratio': 'interest_coverage',
+}
+
+# client_detail stores ROA and ROE in percent (6.5 for 6.5%), but the model features are
+# fractions as FinancialRatios computes them; Profit_Margin is a percentage on both sides
+FEATURE_SOURCE_SCALE = {
+    'Return_on_Assets': 100.0,
+    'Return_on_Equity': 100.0,
+}
+
+
+def _feature_expression(name: str) -> str:
+    column = f"cd.{FEATURE_SOURCE_COLUMNS[name]}"
+    scale = FEATURE_SOURCE_SCALE.get(name)
+    return f"{column} / {scale!r}" if scale else column
+
+
+FEATURE_QUERY = """
+SELECT la.application_id, la.company_id, cd.sector_id, la.product_id,
+       {features},
+       la.loan_status, la.application_date
+FROM loan_applications AS la
+JOIN client_detail AS cd ON cd.company_id = la.company_id
+JOIN sectors AS s ON s.sector_id = cd.sector_id
+WHERE la.application_id > ? AND la.application_id <= ?
+ORDER BY la.application_id
+""".format(features=", ".join(_feature_expression(name) for name in FEATURE_COLUMNS))
+
+DEFAULT_CHUNKSIZE = 50_000
+
+# Largest SQLite INTEGER, the open upper bound of iter_feature_chunks
+MAX_APPLICATION_ID = 2 ** 63 - 1
+
+
+def connect(path: str) -> sqlite3.Connection:
+    """Opens (creating if needed) a SQLite database with the MatchiFi schema and indexes."""
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA foreign_keys = ON")
+    conn.execute("PRAGMA journal_mode = WAL")
+    create_schema(conn)
+    return conn
+
+
+def create_schema(conn: sqlite3.Connection, indexes: bool = True):
+    conn.executescript(SCHEMA)
+    if indexes:
+        conn.executescript(INDEXES)
+    conn.commit()
+
+
+class FeatureChunk:
+    """
+    One chunk of the feature join as NumPy arrays.
+    features has shape (n, 5) in FEATURE_COLUMNS order and model units (see
+    FEATURE_SOURCE_SCALE); loan_status holds the label strings
+    and application_date the ISO date strings (None where unknown).
+    """
+
+    __slots__ = ('application_id', 'company_id', 'sector_id', 'product_id', 'features',
+                 'loan_status', 'application_date')
+
+    def __init__(self, rows: list):
+        table = np.array(rows, dtype=object).reshape(len(rows), -1)
+        ids = table[:, :4].astype(np.int64)
+        self.application_id, self.company_id, self.sector_id, self.product_id = ids.T
+        # NULL feature values become NaN
+        self.features = table[:, 4:-2].astype(np.float64)
+        self.loan_status = table[:, -2]
+        self.application_date = table[:, -1]
+
+    def __len__(self) -> int:
+        return len(self.features)
+
+
+def iter_feature_chunks(conn: sqlite3.Connection, chunksize: int = DEFAULT_CHUNKSIZE,
+                        after_application_id: int = 0, up_to_application_id: int = None):
+    """
+    Streams the client_detail ⋈ sectors ⋈ loan_applications join in application_id order,
+    yielding FeatureChunk objects of at most chunksize rows. Only applications with an id
+    greater than after_application_id are read, which lets callers resume from a watermark,
+    and up to up_to_application_id if given, which lets callers split the join into shards.
+    """
+    cursor = conn.cursor()
+    cursor.arraysize = chunksize
+    try:
+        upper = MAX_APPLICATION_ID if up_to_application_id is None else up_to_application_id
+        cursor.execute(FEATURE_QUERY, (after_application_id, upper))
+        while True:
+            rows = cursor.fetchmany(chunksize)
+            if not rows:
+                break
+            yield FeatureChunk(rows)
+    finally:
+        cursor.close()
+
+
+def load_training_arrays(conn: sqlite3.Connection, chunksize: int = DEFAULT_CHUNKSIZE):
+    """Returns (X, y) for every decided application, assembled chunk by chunk."""
+    features, labels = [], []
+    for chunk in iter_feature_chunks(conn, chunksize):
+        features.append(chunk.features)
+        labels.append(chunk.loan_status)
+    if not features:
+        return np.empty((0, len(FEATURE_COLUMNS))), np.empty(0, dtype=object)
+    return np.concatenate(features), np.concatenate(labels)
+
+
+def populate_synthetic(conn: sqlite3.Connection, n_applications: int, n_clients: int = None,
+                       n_sectors: int = 20, n_products: int = 50, seed: int = 0):
+    """
+    Fills an empty database with random but plausibly shaped rows, for benchmarks and demos.
+    """
+    rng = np.random.default_rng(seed)
+    n_clients = n_clients or max(n_applications // 3, 1)
+    batch = 100_000
+
+    conn.executemany(
+        "INSERT INTO sectors VALUES (?, ?, ?, ?, ?)",
+        ((i, f"sector {i}", float(rng.uniform(0.3, 3.0)), float(rng.uniform(2, 25)),
+          float(rng.uniform(0.2, 3.0))) for i in range(1, n_sectors + 1)),
+    )
+    conn.executemany(
+        "INSERT INTO loan_products VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        ((i, f"product {i}", lo, lo * float(rng.uniform(2, 20)), t, t + int(rng.integers(6, 120)),
+          float(rng.uniform(5, 25)), int(rng.integers(1, n_sectors + 1)) if rng.random() < 0.6 else None,
+          int(rng.integers(300, 750)) if rng.random() < 0.7 else None)
+         for i, lo, t in ((i, float(rng.uniform(1e3, 1e6)), int(rng.integers(3, 60)))
+                          for i in range(1, n_products + 1))),
+    )
+    for start in range(1, n_clients + 1, batch):
+        ids = np.arange(start, min(start + batch, n_clients + 1))
+        n = len(ids)
+        conn.executemany("INSERT INTO clients VALUES (?, ?, ?)",
+                         ((int(i), f"company {i}", 'sole' if i % 2 else 'part') for i in ids))
+        conn.executemany(
+            "INSERT INTO client_detail VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            zip(ids.tolist(), rng.integers(1, n_sectors + 1, n).tolist(),
+                rng.gamma(2.0, 0.6, n).round(1).tolist(), rng.normal(30, 10, n).round(1).tolist(),
+                rng.normal(10, 8, n).round(1).tolist(), rng.normal(6, 5, n).round(1).tolist(),
+                rng.normal(12, 9, n).round(1).tolist(), rng.lognormal(1.5, 1.0, n).astype(int).tolist()),
+        )
+    for start in range(1, n_applications + 1, batch):
+        ids = np.arange(start, min(start + batch, n_applications + 1))
+        n = len(ids)
+        days = rng.integers(0, 3650, n)
+        conn.executemany(
+            "INSERT INTO loan_applications VALUES (?, ?, ?, ?, ?, ?, date('2015-01-01', '+' || ? || ' days'))",
+            zip(ids.tolist(), rng.integers(1, n_clients + 1, n).tolist(),
+                rng.integers(1, n_products + 1, n).tolist(), rng.uniform(1e3, 1e6, n).round(2).tolist(),
+                rng.integers(3, 120, n).tolist(),
+                np.where(rng.random(n) < 0.6, 'Approved', 'Rejected').tolist(), days.tolist()),
+        )
+    conn.commit()
+
+
+def benchmark(sizes, chunksize: int = DEFAULT_CHUNKSIZE) -> list:
+    """
+    Streams the feature join over synthetic databases of the given sizes (number of
+    loan_applications rows) and returns [{'rows': n, 'seconds': t, 'rows_per_second': r}].
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in sizes:
+            path = os.path.join(tmp, f"bench_{n}.db")
+            conn = connect(path)
+            populate_synthetic(conn, n)
+            conn.execute("ANALYZE")
+
+            started = time.perf_counter()
+            rows = sum(len(chunk) for chunk in iter_feature_chunks(conn, chunksize))
+            seconds = time.perf_counter() - started
+            conn.close()
+            results.append({'rows': rows, 'seconds': seconds, 'rows_per_second': rows / seconds})
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="MatchiFi SQLite data-access utilities.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    init_parser = subparsers.add_parser('init', help="Create the schema and indexes in a database.")
+    init_parser.add_argument('database')
+    bench_parser = subparsers.add_parser('bench', help="Benchmark the chunked feature join.")
+    bench_parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    bench_parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE)
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == 'init':
+            connect(args.database).close()
+            print(f"Initialised {args.database}")
+        else:
+            print(f"{'rows':>12} {'seconds':>10} {'rows/s':>14}")
+            for result in benchmark(args.sizes, args.chunksize):
+                print(f"{result['rows']:>12,} {result['seconds']:>10.3f} {result['rows_per_second']:>14,.0f}")
+    except sqlite3.Error as e:
+        print(f"Database error: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,154 @@
+"""
+Versioned model artifact for the MatchiFi loan classifier.
+Training (train_classifier.py) writes the fitted model, its feature order and training
+metadata into a single joblib file; inference loads it lazily on first use, so importing
+the GUI or a scoring service does not train a model or read any Excel data.
+"""
+
+import os
+import threading
+import uuid
+from datetime import datetime, timezone
+
+# Bump whenever the on-disk layout of the artifact dict changes.
+ARTIFACT_FORMAT_VERSION = 1
+
+# Default artifact location; override with the MATCHIFI_MODEL_PATH environment variable.
+DEFAULT_MODEL_PATH = os.environ.get('MATCHIFI_MODEL_PATH', 'logistic_model.joblib')
+
+# Feature order the classifier was originally trained on (matches FinancialRatios.RATIO_COLUMNS).
+FEATURE_COLUMNS = [
+    'Debt_to_Equity',
+    'Profit_Margin',
+    'Return_on_Assets',
+    'Return_on_Equity',
+    'Interest_Coverage_Ratio',
+]
+TARGET_COLUMN = 'Loan_Status'
+
+
+class ModelArtifact:
+    """
+    A fitted model together with the feature order it expects and its training metadata.
+    """
+
+    def __init__(self, model, feature_names, metadata: dict):
+        self.model = model
+        self.feature_names = list(feature_names)
+        self.metadata = dict(metadata)
+
+    @property
+    def version(self) -> str:
+        return self.metadata.get('model_version', 'unknown')
+
+    def __repr__(self) -> str:
+        return f"ModelArtifact(version={self.version!r}, features={self.feature_names!r})"
+
+
+def new_model_version() -> str:
+    """Returns a sortable, unique model version string (UTC timestamp plus a random suffix)."""
+    stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S')
+    return f"{stamp}-{uuid.uuid4().hex[:8]}"
+
+
+def save_artifact(model, feature_names, path: str = DEFAULT_MODEL_PATH, **metadata) -> ModelArtifact:
+    """
+    Writes a versioned artifact to path and returns it.
+    The file is written to a temporary name first and then moved into place, so a
+    concurrently running scorer never observes a half-written artifact.
+    """
+    from joblib import dump
+
+    metadata.setdefault('model_version', new_model_version())
+    metadata.setdefault('trained_at', datetime.now(timezone.utc).isoformat())
+    artifact = ModelArtifact(model, feature_names, metadata)
+
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    dump({
+        'format_version': ARTIFACT_FORMAT_VERSION,
+        'model': artifact.model,
+        'feature_names': artifact.feature_names,
+        'metadata': artifact.metadata,
+    }, tmp_path)
+    os.replace(tmp_path, path)
+    return artifact
+
+
+def load_artifact(path: str = DEFAULT_MODEL_PATH) -> ModelArtifact:
+    """
+    Reads an artifact written by save_artifact.
+    A bare model dumped by older versions of the training script is wrapped with the
+    default feature order and a 'legacy' version.
+    Raises ValueError if the artifact was written by a newer, unknown format.
+    """
+    from joblib import load
+
+    payload = load(path)
+    if not isinstance(payload, dict):
+        return ModelArtifact(payload, FEATURE_COLUMNS, {'model_version': 'legacy'})
+
+    format_version = payload.get('format_version')
+    if format_version != ARTIFACT_FORMAT_VERSION:
+        raise ValueError(f"Unsupported model artifact format {format_version!r} in {path}.")
+    return ModelArtifact(payload['model'], payload['feature_names'], payload['metadata'])
+
+
+class ArtifactLoader:
+    """
+    Thread-safe lazy holder for a ModelArtifact.
+    Nothing is read from disk until get() is first called. A newer artifact can be swapped in
+    atomically, either directly (swap) or by noticing that the file on disk was replaced
+    (reload_if_changed); callers that already hold the old artifact keep using it unchanged.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or DEFAULT_MODEL_PATH
+        self._artifact = None
+        self._file_key = None
+        self._lock = threading.Lock()
+
+    def _stat_key(self):
+        stat = os.stat(self.path)
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def get(self) -> ModelArtifact:
+        artifact = self._artifact
+        if artifact is None:
+            with self._lock:
+                if self._artifact is None:
+                    self._file_key = self._stat_key()
+                    self._artifact = load_artifact(self.path)
+                artifact = self._artifact
+        return artifact
+
+    def swap(self, artifact: ModelArtifact):
+        """Replaces the held artifact; subsequent get() calls return the new one."""
+        with self._lock:
+            self._artifact = artifact
+
+    def reload_if_changed(self) -> bool:
+        """
+        Reloads the artifact if the file at path was replaced since it was last read.
+        Returns True if a new artifact was swapped in.
+        """
+        key = self._stat_key()
+        if key == self._file_key:
+            return False
+        artifact = load_artifact(self.path)
+        with self._lock:
+            self._artifact = artifact
+            self._file_key = key
+        return True
+
+
+_default_loader = ArtifactLoader()
+
+
+def get_artifact() -> ModelArtifact:
+    """Returns the process-wide artifact, loading it from DEFAULT_MODEL_PATH on first use."""
+    return _default_loader.get()
+
+
+def reload_artifact_if_changed() -> bool:
+    """Swaps in a newer process-wide artifact if DEFAULT_MODEL_PATH was replaced on disk."""
+    return _default_loader.reload_if_changed()
@@ -0,0 +1,182 @@
+"""
+Incremental (online) updates of the MatchiFi loan classifier from new loan applications.
+Instead of retraining on the full history, the nightly refresh reads only the decided
+applications whose application_id is above the watermark stored in the current model artifact,
+and takes stochastic gradient steps on them with SGDClassifier.partial_fit. The cost is
+proportional to the number of new rows.
+
+A LogisticRegression produced by train_classifier.py is converted on the first update into an
+SGDClassifier with the log loss, starting from the same coefficients. Fitted preprocessing steps
+(clipping, log transform, scaling) are kept frozen, so the features stay on the scale the model
+was trained on. The updated model and its new watermark are written together with
+save_artifact, so a reader sees either the old artifact or the new one in full. Running
+scorers pick it up with ArtifactLoader.reload_if_changed (the GUI before each prediction and
+the scoring service every --reload-interval seconds).
+
+Usage: python online_update.py matchifi.db [--model logistic_model.joblib] [--chunksize 10000]
+"""
+
+import argparse
+import sqlite3
+import sys
+from datetime import datetime, timezone
+
+import numpy as np
+import sklearn
+from sklearn.linear_model import SGDClassifier
+from sklearn.pipeline import Pipeline
+
+from linear_scorer import LinearScorer, approval_index
+from matchifi_db import iter_feature_chunks
+from model_artifact import DEFAULT_MODEL_PATH, FEATURE_COLUMNS, load_artifact, save_artifact
+from ratio_preprocessing import final_estimator
+
+DEFAULT_CHUNKSIZE = 10_000
+
+# Constant, small steps: each nightly batch nudges the model rather than overwriting it
+DEFAULT_ETA0 = 0.001
+DEFAULT_ALPHA = 1e-4
+
+
+def artifact_watermark(artifact) -> dict:
+    """The {'application_id', 'application_date'} of the last application the model has seen."""
+    return dict(artifact.metadata.get('watermark') or {'application_id': 0, 'application_date': None})
+
+
+def online_classifier(classifier, alpha: float = DEFAULT_ALPHA, eta0: float = DEFAULT_ETA0) -> SGDClassifier:
+    """
+    Returns an SGDClassifier that continues from classifier's coefficients.
+    An SGDClassifier is returned unchanged; any other fitted linear classifier is copied.
+    """
+    if isinstance(classifier, SGDClassifier):
+        return classifier
+    online = SGDClassifier(loss='log_loss', alpha=alpha, learning_rate='constant', eta0=eta0)
+    online.coef_ = np.array(classifier.coef_, dtype=np.float64)
+    online.intercept_ = np.array(classifier.intercept_, dtype=np.float64)
+    online.classes_ = np.asarray(classifier.classes_)
+    return online
+
+
+def label_targets(loan_status, classes):
+    """
+    Maps loan_status values from the database ('Approved'/'Rejected') onto the classifier's own
+    classes, using approval_index to find which class means approved. Returns (targets, known):
+    known is False for statuses that are neither an approval nor a rejection.
+    """
+    classes = np.asarray(classes)
+    approve = approval_index(list(classes))
+    status = np.char.lower(np.char.strip(np.asarray(loan_status).astype(str)))
+    approved = np.char.startswith(status, 'approv')
+    known = approved | np.char.startswith(status, 'reject')
+    return np.where(approved, classes[approve], classes[1 - approve]), known
+
+
+def split_model(model):
+    """Splits a model into (frozen preprocessing pipeline or None, final classifier)."""
+    if hasattr(model, 'steps'):
+        preprocess = Pipeline(model.steps[:-1]) if len(model.steps) > 1 else None
+        return preprocess, final_estimator(model)
+    return None, model
+
+
+def update_model(conn: sqlite3.Connection, artifact, chunksize: int = DEFAULT_CHUNKSIZE,
+                 alpha: float = DEFAULT_ALPHA, eta0: float = DEFAULT_ETA0, after_application_id: int = None):
+    """
+    Runs partial_fit over every decided application newer than the artifact's watermark (or
+    after_application_id, if given). Returns (model, watermark, rows used, rows skipped for an
+    unknown loan_status); model is None when there were no usable new rows.
+    """
+    if list(artifact.feature_names) != FEATURE_COLUMNS:
+        raise ValueError(f"Artifact features {artifact.feature_names} do not match the database "
+                         f"feature join {FEATURE_COLUMNS}.")
+    watermark = artifact_watermark(artifact)
+    if after_application_id is not None:
+        watermark = {'application_id': after_application_id, 'application_date': None}
+
+    preprocess, classifier = split_model(artifact.model)
+    online = online_classifier(classifier, alpha, eta0)
+    rows = skipped = 0
+    for chunk in iter_feature_chunks(conn, chunksize, after_application_id=watermark['application_id']):
+        # Advance past every row read, including ones skipped for missing features
+        watermark = {'application_id': int(chunk.application_id[-1]),
+                     'application_date': chunk.application_date[-1]}
+        targets, known = label_targets(chunk.loan_status, online.classes_)
+        skipped += int((~known).sum())
+        complete = known & ~np.isnan(chunk.features).any(axis=1)
+        if not complete.any():
+            continue
+        x = chunk.features[complete]
+        if preprocess is not None:
+            x = preprocess.transform(x)
+        online.partial_fit(x, targets[complete], classes=online.classes_)
+        rows += int(complete.sum())
+
+    if rows == 0:
+        return None, watermark, 0, skipped
+    if hasattr(artifact.model, 'steps'):
+        model = Pipeline(artifact.model.steps[:-1] + [(artifact.model.steps[-1][0], online)])
+    else:
+        model = online
+    return model, watermark, rows, skipped
+
+
+def run_update(database: str, model_path: str = DEFAULT_MODEL_PATH, chunksize: int = DEFAULT_CHUNKSIZE,
+               alpha: float = DEFAULT_ALPHA, eta0: float = DEFAULT_ETA0, after_application_id: int = None):
+    """Updates the artifact at model_path in place. Returns the new artifact, or None if nothing changed."""
+    artifact = load_artifact(model_path)
+    conn = sqlite3.connect(database)
+    try:
+        model, watermark, rows, skipped = update_model(conn, artifact, chunksize, alpha, eta0,
+                                                       after_application_id)
+    finally:
+        conn.close()
+    if skipped:
+        print(f"Skipped {skipped} applications with an unknown loan_status", file=sys.stderr)
+    if model is None:
+        print(f"No new applications after id {watermark['application_id']}; model {artifact.version} unchanged")
+        return None
+
+    # Fail before deploying if the running scorers could not fold the updated model
+    LinearScorer.from_model(model, artifact.feature_names)
+
+    # Training metadata (source, params, ...) carries over; the version and update fields are new
+    metadata = {key: value for key, value in artifact.metadata.items()
+                if key not in ('model_version', 'trained_at')}
+    history = list(metadata.get('update_history', []))
+    history.append({'base_version': artifact.version, 'rows': rows, 'skipped': skipped, 'watermark': watermark,
+                    'updated_at': datetime.now(timezone.utc).isoformat()})
+    metadata.update(
+        base_version=artifact.version,
+        watermark=watermark,
+        update_rows=rows,
+        update_history=history,
+        online_params={'alpha': alpha, 'eta0': eta0},
+        sklearn_version=sklearn.__version__,
+    )
+    updated = save_artifact(model, artifact.feature_names, model_path, **metadata)
+    print(f"Updated model {artifact.version} -> {updated.version} on {rows} new applications "
+          f"(watermark: application {watermark['application_id']}, {watermark['application_date']})")
+    return updated
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Incrementally update the loan classifier from new applications.")
+    parser.add_argument('database', help="SQLite database with the loan_applications table.")
+    parser.add_argument('--model', default=DEFAULT_MODEL_PATH, help="Model artifact to update in place.")
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE, help="Applications per partial_fit step.")
+    parser.add_argument('--alpha', type=float, default=DEFAULT_ALPHA, help="L2 regularization strength.")
+    parser.add_argument('--eta0', type=float, default=DEFAULT_ETA0, help="Constant learning rate.")
+    parser.add_argument('--after', type=int, default=None,
+                        help="Ignore the stored watermark and start after this application_id.")
+    args = parser.parse_args(argv)
+
+    try:
+        run_update(args.database, args.model, args.chunksize, args.alpha, args.eta0, args.after)
+    except (OSError, ValueError, sqlite3.Error) as e:
+        print(f"Online update failed: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
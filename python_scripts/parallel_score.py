@@ -0,0 +1,266 @@
+"""
+Multi-core batch scoring for MatchiFi.
+Each input chunk (see batch_score.iter_input_chunks) is copied once into a shared-memory block
+and split into row shards that a process pool scores in place: workers attach to the shared input,
+the shared model weights and a shared output block by name, so neither the data nor the model is
+pickled per task. Shards are collected in submission order, so the output is deterministic.
+Workers also classify performance and loan status, as category codes, so the parent only
+wraps the shared output block: the result frame's columns are views of it, and the block is
+released once the last of them is garbage-collected.
+The shared output block is float64, so with --backend decimal each value is computed exactly
+and rounded to float64 once, when the worker stores it (batch_score.py keeps the Decimals).
+
+Usage: python parallel_score.py applicants.parquet scored.parquet --workers 32
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+from scipy.special import expit
+
+from batch_score import (
+    DEFAULT_CHUNKSIZE, INPUT_COLUMNS, NOT_SCORED, ChunkWriter, input_columns, iter_input_chunks,
+)
+from financial_ratios_calc import (
+    BACKENDS, DEFAULT_BACKEND, DEFAULT_TAX_RATE, PERFORMANCE_UNDEFINED, REASON_OK, FinancialRatios,
+)
+from linear_scorer import LinearScorer
+from model_artifact import DEFAULT_MODEL_PATH, load_artifact
+from ratio_preprocessing import apply_ratio_transform
+from sector_benchmarks import SectorBenchmarkCache
+
+# Numeric input columns copied into shared memory, in row order of the shared input block
+RAW_COLUMNS = ['liabilities', 'equity', 'assets', 'ebit', 'interest', 'revenue']
+
+# The shared input block has one more row: each company's benchmark profit margin
+BENCHMARK_ROW = len(RAW_COLUMNS)
+
+# Rows of the shared output block
+OUTPUT_COLUMNS = [
+    'Debt_to_Equity', 'Profit_Margin', 'Return_on_Assets', 'Return_on_Equity',
+    'Interest_Coverage_Ratio', 'EBT', 'Net_Profit', 'Reason_Code', 'Approval_Probability',
+    'Performance', 'Loan_Status',
+]
+
+# Categories of the Performance codes the workers write
+PERFORMANCE_LABELS = ['Poor', 'Exceptional', PERFORMANCE_UNDEFINED]
+
+# Per-worker state set up once by _init_worker
+_worker = {}
+
+
+def _create_shared(shape) -> tuple:
+    """Allocates a float64 array of the given shape in a new shared-memory block."""
+    size = max(int(np.prod(shape)) * 8, 1)
+    shm = shared_memory.SharedMemory(create=True, size=size)
+    return shm, np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+
+
+def _init_worker(weights_name: str, n_features: int, feature_index, sign: float, tax_rate: float,
+                 backend: str = DEFAULT_BACKEND):
+    """
+    Process-pool initializer: attaches to the shared model weights once per worker.
+    The weights block holds [coef, intercept, clip lower bounds, clip upper bounds, log mask].
+    """
+    shm = shared_memory.SharedMemory(name=weights_name)
+    weights = np.ndarray((4 * n_features + 1,), dtype=np.float64, buffer=shm.buf)
+    k = n_features
+    _worker.update(
+        weights_shm=shm,
+        coef=weights[:k].reshape(1, -1),
+        intercept=weights[k],
+        lower=weights[k + 1:2 * k + 1],
+        upper=weights[2 * k + 1:3 * k + 1],
+        log_mask=weights[3 * k + 1:] != 0,
+        feature_index=list(feature_index),
+        sign=sign,
+        tax_rate=tax_rate,
+        backend=backend,
+    )
+
+
+def _score_shard(input_name: str, output_name: str, n_rows: int, start: int, stop: int) -> int:
+    """
+    Scores rows [start, stop) of the shared input block into the shared output block.
+    Returns the number of rows processed.
+    """
+    in_shm = shared_memory.SharedMemory(name=input_name)
+    out_shm = shared_memory.SharedMemory(name=output_name)
+    try:
+        raw = np.ndarray((len(RAW_COLUMNS) + 1, n_rows), dtype=np.float64, buffer=in_shm.buf)
+        out = np.ndarray((len(OUTPUT_COLUMNS), n_rows), dtype=np.float64, buffer=out_shm.buf)
+
+        ratios = FinancialRatios.calculate_ratio_arrays(
+            *(raw[i, start:stop] for i in range(len(RAW_COLUMNS))), tax_rate=_worker['tax_rate'],
+            backend=_worker['backend'])
+        for i, name in enumerate(OUTPUT_COLUMNS[:8]):
+            out[i, start:stop] = np.asarray(ratios[name], dtype=np.float64)
+
+        ratio_rows = out[:5, start:stop]
+        features = apply_ratio_transform(
+            ratio_rows[_worker['feature_index']].T, _worker['lower'], _worker['upper'], _worker['log_mask'])
+        decision = features @ _worker['coef'].T
+        decision = (decision.ravel() + _worker['intercept']) * _worker['sign']
+        probability = out[8, start:stop]
+        expit(decision, out=probability)
+        probability[ratios['Reason_Code'] != REASON_OK] = np.nan
+
+        # Codes into PERFORMANCE_LABELS, as FinancialRatios.get_company_performance_batch classifies
+        profit_margin, benchmark = out[1, start:stop], raw[BENCHMARK_ROW, start:stop]
+        undefined = ~np.isfinite(profit_margin) | np.isnan(benchmark)
+        out[9, start:stop] = np.where(undefined, 2, np.where(profit_margin < benchmark, 0, 1))
+
+        # Codes into [NOT_SCORED, *classes], as LinearScorer.labels_from_probability labels
+        if _worker['sign'] > 0:
+            positive = probability > 0.5
+        else:
+            positive = ~(probability >= 0.5)
+        out[10, start:stop] = np.where(np.isnan(probability), 0, 1 + positive)
+        del raw, out, ratio_rows, features, probability, profit_margin, benchmark
+    finally:
+        in_shm.close()
+        out_shm.close()
+    return stop - start
+
+
+class ParallelScorer:
+    """
+    Process pool that scores chunks of raw financials with shared-memory inputs and weights.
+    Use as a context manager so the pool and the shared weights are released.
+    """
+
+    def __init__(self, artifact, workers: int = None, tax_rate=DEFAULT_TAX_RATE,
+                 backend: str = DEFAULT_BACKEND):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown ratio backend {backend!r}; expected one of {BACKENDS}.")
+        self.scorer = LinearScorer.from_artifact(artifact)
+        self.workers = workers or os.cpu_count() or 1
+
+        missing = [name for name in artifact.feature_names if name not in OUTPUT_COLUMNS[:5]]
+        if missing:
+            raise ValueError(f"Model features {missing} are not produced by FinancialRatios.")
+        feature_index = [OUTPUT_COLUMNS.index(name) for name in artifact.feature_names]
+
+        scorer = self.scorer
+        k = scorer.n_features
+        weights = np.concatenate([
+            scorer.coef.ravel(), [scorer.intercept],
+            scorer.lower if scorer.has_transform else np.full(k, -np.inf),
+            scorer.upper if scorer.has_transform else np.full(k, np.inf),
+            scorer.log_mask if scorer.has_transform else np.zeros(k),
+        ]).astype(np.float64)
+        self._weights_shm, shared_weights = _create_shared(weights.shape)
+        shared_weights[:] = weights
+        del shared_weights
+
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_worker,
+            initargs=(self._weights_shm.name, k, feature_index,
+                      1.0 if self.scorer.approve_index == 1 else -1.0, float(tax_rate), backend),
+        )
+
+    def score_chunk(self, chunk: pd.DataFrame, benchmarks: SectorBenchmarkCache = None) -> pd.DataFrame:
+        """
+        Scores one chunk across the pool; the result rows keep the chunk's order.
+        Performance and Loan_Status are categorical; the other result columns are views of the
+        shared output block, which stays mapped until the result (or its last view) is released.
+        """
+        n_rows = len(chunk)
+        in_shm, raw = _create_shared((len(RAW_COLUMNS) + 1, n_rows))
+        out_shm, out = _create_shared((len(OUTPUT_COLUMNS), n_rows))
+        try:
+            for i, name in enumerate(RAW_COLUMNS):
+                raw[i] = chunk[name].to_numpy(dtype=np.float64)
+            if benchmarks is None:
+                raw[BENCHMARK_ROW] = chunk['benchmark'].to_numpy(dtype=np.float64)
+            else:
+                raw[BENCHMARK_ROW] = benchmarks.gather(chunk['sector_id'], 'net_pm')
+
+            bounds = np.linspace(0, n_rows, min(self.workers, n_rows) + 1, dtype=int)
+            futures = [
+                self._pool.submit(_score_shard, in_shm.name, out_shm.name, n_rows, int(start), int(stop))
+                for start, stop in zip(bounds[:-1], bounds[1:]) if stop > start
+            ]
+            for future in futures:
+                future.result()
+        except BaseException:
+            del out
+            out_shm.close()
+            raise
+        finally:
+            del raw
+            in_shm.close()
+            in_shm.unlink()
+            out_shm.unlink()
+
+        # The mapping outlives the name; close it once no column views it any more
+        weakref.finalize(out, out_shm.close)
+        columns = {name: out[i] for i, name in enumerate(OUTPUT_COLUMNS[:-2])}
+        columns['Reason_Code'] = out[7].astype(np.uint8)
+        columns['Performance'] = pd.Categorical.from_codes(out[9].astype(np.int8), PERFORMANCE_LABELS)
+        columns['Loan_Status'] = pd.Categorical.from_codes(
+            out[10].astype(np.int8), [NOT_SCORED, *self.scorer.classes])
+        scored = pd.DataFrame(columns, copy=False)
+        kept = chunk.reset_index(drop=True).drop(columns=[name for name in OUTPUT_COLUMNS if name in chunk])
+        return pd.concat([kept, scored], axis=1)
+
+    def close(self):
+        self._pool.shutdown()
+        self._weights_shm.close()
+        self._weights_shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def score_file_parallel(input_path: str, output_path: str, artifact, workers: int = None,
+                        chunksize: int = DEFAULT_CHUNKSIZE, tax_rate=DEFAULT_TAX_RATE,
+                        extra_columns=(), benchmarks: SectorBenchmarkCache = None,
+                        backend: str = DEFAULT_BACKEND) -> int:
+    """Parallel counterpart of batch_score.score_file. Returns the number of rows scored."""
+    columns = list(dict.fromkeys(list(extra_columns) + input_columns(benchmarks)))
+    with ParallelScorer(artifact, workers, tax_rate, backend) as scorer, ChunkWriter(output_path) as writer:
+        for chunk in iter_input_chunks(input_path, chunksize, columns):
+            writer.write(scorer.score_chunk(chunk, benchmarks))
+        return writer.rows_written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score a file of company financials on all cores.")
+    parser.add_argument('input', help="CSV or Parquet file with columns: " + ", ".join(INPUT_COLUMNS))
+    parser.add_argument('output', help="CSV or Parquet file to write the results to.")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: all cores).")
+    parser.add_argument('--model', default=DEFAULT_MODEL_PATH, help="Model artifact path.")
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE * 10,
+                        help="Rows per chunk; each chunk is split into one shard per worker.")
+    parser.add_argument('--tax-rate', default=str(DEFAULT_TAX_RATE), help="Tax rate applied to EBT.")
+    parser.add_argument('--keep', nargs='*', default=[], help="Extra input columns to copy to the output.")
+    parser.add_argument('--db', default=None, help="SQLite database whose sectors table supplies the benchmarks.")
+    parser.add_argument('--backend', choices=BACKENDS, default=DEFAULT_BACKEND,
+                        help="Numeric backend for the ratios (results are stored as float64, see above).")
+    args = parser.parse_args(argv)
+
+    try:
+        benchmarks = SectorBenchmarkCache(sqlite3.connect(args.db)) if args.db else None
+        rows = score_file_parallel(args.input, args.output, load_artifact(args.model), args.workers,
+                                   args.chunksize, float(args.tax_rate), args.keep, benchmarks, args.backend)
+    except (OSError, KeyError, ValueError, sqlite3.Error) as e:
+        print(f"Parallel scoring failed: {e}", file=sys.stderr)
+        return 1
+    print(f"Scored {rows} rows into {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,436 @@
+"""
+Streaming portfolio statistics for MatchiFi dashboards.
+Approval rates, ratio means/variances and ratio quantiles are aggregated per sector_id and per
+loan product (and over the whole portfolio) in one pass over the loan_applications feature
+join, chunk by chunk, with memory bounded by the number of groups rather than the number of
+applications:
+
+    - moments use Welford's update generalised to batches (Chan et al.), so each chunk is
+      folded in with a few vectorized sums and two aggregates combine with the same formula
+    - quantiles use a DDSketch-style log-bucketed sketch with relative accuracy guarantees,
+      whose bucket counts simply add up when two sketches are merged
+
+Aggregates from parallel shards (disjoint application_id ranges) or from daily increments
+merge into the same result as a single pass (counts and sketches exactly, moments up to
+floating-point rounding). The state is saved as JSON with the last application_id it covers,
+so a nightly run only reads the new applications.
+
+Usage: python portfolio_stats.py matchifi.db [--state portfolio.json] [--workers 4] [--out summary.csv]
+"""
+
+import argparse
+import json
+import math
+import os
+import sqlite3
+import sys
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from matchifi_db import DEFAULT_CHUNKSIZE, iter_feature_chunks
+from model_artifact import FEATURE_COLUMNS
+
+DEFAULT_RELATIVE_ACCURACY = 0.01
+
+# Per-store bucket limit; at 1% accuracy 2048 buckets span about 17 orders of magnitude, so
+# collapsing (which gives up accuracy on the smallest magnitudes) practically never happens
+DEFAULT_MAX_BUCKETS = 2048
+
+# Magnitudes below this are counted as zero by the quantile sketch
+MIN_INDEXABLE = 1e-12
+
+SUMMARY_QUANTILES = (0.5, 0.9)
+
+
+def is_approved(loan_status) -> np.ndarray:
+    """True where a loan_status label means approved ('Approved', 'Approve', ...)."""
+    labels = np.char.lower(np.asarray(loan_status, dtype=str))
+    return np.char.startswith(labels, 'approv')
+
+
+class RunningMoments:
+    """
+    Count, mean, sum of squared deviations (M2), min and max of k columns; NaNs are skipped
+    per column.
+    """
+
+    def __init__(self, n_columns: int):
+        self.count = np.zeros(n_columns, dtype=np.int64)
+        self.mean = np.zeros(n_columns, dtype=np.float64)
+        self.m2 = np.zeros(n_columns, dtype=np.float64)
+        self.min = np.full(n_columns, np.inf)
+        self.max = np.full(n_columns, -np.inf)
+
+    def _combine(self, count, mean, m2, low, high):
+        total = self.count + count
+        has = count > 0
+        safe_total = np.where(total > 0, total, 1)
+        delta = np.where(has, mean - self.mean, 0.0)
+        self.mean = np.where(has, self.mean + delta * count / safe_total, self.mean)
+        self.m2 = np.where(has, self.m2 + m2 + delta ** 2 * self.count * count / safe_total, self.m2)
+        self.min = np.fmin(self.min, low)
+        self.max = np.fmax(self.max, high)
+        self.count = total
+
+    def update(self, values):
+        """Folds in a 2-D array of rows (one column per statistic)."""
+        values = np.asarray(values, dtype=np.float64).reshape(-1, len(self.count))
+        valid = ~np.isnan(values)
+        count = valid.sum(axis=0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.where(valid, values, 0.0).sum(axis=0) / count
+        m2 = (np.where(valid, values - mean, 0.0) ** 2).sum(axis=0)
+        low = np.where(valid, values, np.inf).min(axis=0, initial=np.inf)
+        high = np.where(valid, values, -np.inf).max(axis=0, initial=-np.inf)
+        self._combine(count, mean, m2, low, high)
+
+    def merge(self, other: "RunningMoments"):
+        self._combine(other.count, other.mean, other.m2, other.min, other.max)
+        return self
+
+    def variance(self, ddof: int = 1) -> np.ndarray:
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(self.count > ddof, self.m2 / (self.count - ddof), np.nan)
+
+    def to_dict(self) -> dict:
+        return {name: getattr(self, name).tolist() for name in ('count', 'mean', 'm2', 'min', 'max')}
+
+    @classmethod
+    def from_dict(cls, state: dict) -> "RunningMoments":
+        moments = cls(len(state['count']))
+        moments.count = np.array(state['count'], dtype=np.int64)
+        for name in ('mean', 'm2', 'min', 'max'):
+            setattr(moments, name, np.array(state[name], dtype=np.float64))
+        return moments
+
+
+class QuantileSketch:
+    """
+    Mergeable quantile sketch with relative accuracy: every quantile estimate is within
+    relative_accuracy of a value of the right rank. Values fall into logarithmic buckets
+    (bucket i holds magnitudes in (gamma^(i-1), gamma^i]); negatives use a mirrored store.
+    """
+
+    def __init__(self, relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY,
+                 max_buckets: int = DEFAULT_MAX_BUCKETS):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy must be between 0 and 1.")
+        self.relative_accuracy = relative_accuracy
+        self.max_buckets = max_buckets
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.positive = {}
+        self.negative = {}
+        self.zero_count = 0
+        self.count = 0
+
+    def _add(self, store: dict, magnitudes: np.ndarray):
+        if magnitudes.size == 0:
+            return
+        keys, counts = np.unique(np.ceil(np.log(magnitudes) / self._log_gamma).astype(np.int64),
+                                 return_counts=True)
+        for key, count in zip(keys.tolist(), counts.tolist()):
+            store[key] = store.get(key, 0) + count
+        self._collapse(store)
+
+    def _collapse(self, store: dict):
+        """Folds the smallest-magnitude buckets together once a store exceeds max_buckets."""
+        if len(store) <= self.max_buckets:
+            return
+        keys = sorted(store)
+        excess = keys[:len(keys) - self.max_buckets + 1]
+        store[excess[-1]] = sum(store.pop(key) for key in excess)
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[np.isfinite(values)]
+        self.count += values.size
+        self._add(self.positive, values[values >= MIN_INDEXABLE])
+        self._add(self.negative, -values[values <= -MIN_INDEXABLE])
+        self.zero_count += int(np.count_nonzero(np.abs(values) < MIN_INDEXABLE))
+
+    def merge(self, other: "QuantileSketch"):
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Only sketches with the same relative accuracy can be merged.")
+        for mine, theirs in ((self.positive, other.positive), (self.negative, other.negative)):
+            for key, count in theirs.items():
+                mine[key] = mine.get(key, 0) + count
+            self._collapse(mine)
+        self.zero_count += other.zero_count
+        self.count += other.count
+        return self
+
+    def _bucket_value(self, key: int) -> float:
+        return 2.0 * self.gamma ** key / (self.gamma + 1)
+
+    def quantile(self, q: float) -> float:
+        """Estimated q-quantile (0 <= q <= 1); NaN for an empty sketch."""
+        if self.count == 0:
+            return float('nan')
+        rank = q * (self.count - 1)
+        seen = 0
+        for key in sorted(self.negative, reverse=True):
+            seen += self.negative[key]
+            if seen > rank:
+                return -self._bucket_value(key)
+        seen += self.zero_count
+        if seen > rank:
+            return 0.0
+        for key in sorted(self.positive):
+            seen += self.positive[key]
+            if seen > rank:
+                return self._bucket_value(key)
+        return self._bucket_value(max(self.positive))
+
+    def to_dict(self) -> dict:
+        return {
+            'relative_accuracy': self.relative_accuracy,
+            'max_buckets': self.max_buckets,
+            'positive': {str(key): count for key, count in self.positive.items()},
+            'negative': {str(key): count for key, count in self.negative.items()},
+            'zero_count': self.zero_count,
+            'count': self.count,
+        }
+
+    @classmethod
+    def from_dict(cls, state: dict) -> "QuantileSketch":
+        sketch = cls(state['relative_accuracy'], state['max_buckets'])
+        sketch.positive = {int(key): count for key, count in state['positive'].items()}
+        sketch.negative = {int(key): count for key, count in state['negative'].items()}
+        sketch.zero_count = state['zero_count']
+        sketch.count = state['count']
+        return sketch
+
+
+class GroupStats:
+    """
+    Applications, approvals, moments and quantile sketches of the ratio columns for one group.
+    """
+
+    def __init__(self, columns=FEATURE_COLUMNS, relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY):
+        self.columns = list(columns)
+        self.applications = 0
+        self.approved = 0
+        self.moments = RunningMoments(len(self.columns))
+        self.sketches = [QuantileSketch(relative_accuracy) for _ in self.columns]
+
+    def update(self, features: np.ndarray, approved: np.ndarray):
+        self.applications += len(features)
+        self.approved += int(np.count_nonzero(approved))
+        self.moments.update(features)
+        for j, sketch in enumerate(self.sketches):
+            sketch.update(features[:, j])
+
+    def merge(self, other: "GroupStats"):
+        self.applications += other.applications
+        self.approved += other.approved
+        self.moments.merge(other.moments)
+        for mine, theirs in zip(self.sketches, other.sketches):
+            mine.merge(theirs)
+        return self
+
+    @property
+    def approval_rate(self) -> float:
+        return self.approved / self.applications if self.applications else float('nan')
+
+    def summary(self, quantiles=SUMMARY_QUANTILES) -> dict:
+        row = {'applications': self.applications, 'approval_rate': self.approval_rate}
+        std = np.sqrt(self.moments.variance())
+        for j, column in enumerate(self.columns):
+            row[f"{column}_mean"] = float(self.moments.mean[j]) if self.moments.count[j] else float('nan')
+            row[f"{column}_std"] = float(std[j])
+            for q in quantiles:
+                row[f"{column}_p{round(q * 100)}"] = self.sketches[j].quantile(q)
+        return row
+
+    def to_dict(self) -> dict:
+        return {
+            'columns': self.columns,
+            'applications': self.applications,
+            'approved': self.approved,
+            'moments': self.moments.to_dict(),
+            'sketches': [sketch.to_dict() for sketch in self.sketches],
+        }
+
+    @classmethod
+    def from_dict(cls, state: dict) -> "GroupStats":
+        group = cls(state['columns'])
+        group.applications = state['applications']
+        group.approved = state['approved']
+        group.moments = RunningMoments.from_dict(state['moments'])
+        group.sketches = [QuantileSketch.from_dict(sketch) for sketch in state['sketches']]
+        return group
+
+
+class PortfolioStats:
+    """
+    Portfolio-wide, per-sector and per-product GroupStats, plus the last application_id covered.
+    """
+
+    def __init__(self, relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY):
+        self.relative_accuracy = relative_accuracy
+        self.overall = GroupStats(relative_accuracy=relative_accuracy)
+        self.by_sector = {}
+        self.by_product = {}
+        self.last_application_id = 0
+
+    def _group(self, groups: dict, key: int) -> GroupStats:
+        group = groups.get(key)
+        if group is None:
+            group = groups[key] = GroupStats(relative_accuracy=self.relative_accuracy)
+        return group
+
+    def update_chunk(self, chunk):
+        """Folds in one matchifi_db.FeatureChunk."""
+        if len(chunk) == 0:
+            return
+        approved = is_approved(chunk.loan_status)
+        self.overall.update(chunk.features, approved)
+        for groups, keys in ((self.by_sector, chunk.sector_id), (self.by_product, chunk.product_id)):
+            order = np.argsort(keys, kind='stable')
+            unique, starts = np.unique(keys[order], return_index=True)
+            for key, rows in zip(unique.tolist(), np.split(order, starts[1:])):
+                self._group(groups, key).update(chunk.features[rows], approved[rows])
+        self.last_application_id = max(self.last_application_id, int(chunk.application_id[-1]))
+
+    def update_from_connection(self, conn: sqlite3.Connection, chunksize: int = DEFAULT_CHUNKSIZE,
+                               up_to_application_id: int = None):
+        """Reads every application after last_application_id (up to the given id) in one pass."""
+        for chunk in iter_feature_chunks(conn, chunksize, self.last_application_id, up_to_application_id):
+            self.update_chunk(chunk)
+        if up_to_application_id is not None:
+            self.last_application_id = max(self.last_application_id, up_to_application_id)
+        return self
+
+    def merge(self, other: "PortfolioStats"):
+        self.overall.merge(other.overall)
+        for mine, theirs in ((self.by_sector, other.by_sector), (self.by_product, other.by_product)):
+            for key, group in theirs.items():
+                if key in mine:
+                    mine[key].merge(group)
+                else:
+                    mine[key] = group
+        self.last_application_id = max(self.last_application_id, other.last_application_id)
+        return self
+
+    def summary(self) -> pd.DataFrame:
+        """One row per group: portfolio, then sectors, then products."""
+        rows = [{'group': 'portfolio', 'key': None, **self.overall.summary()}]
+        for name, groups in (('sector', self.by_sector), ('product', self.by_product)):
+            rows.extend({'group': name, 'key': key, **groups[key].summary()} for key in sorted(groups))
+        frame = pd.DataFrame(rows)
+        frame['key'] = frame['key'].astype('Int64')
+        return frame
+
+    def to_dict(self) -> dict:
+        return {
+            'relative_accuracy': self.relative_accuracy,
+            'last_application_id': self.last_application_id,
+            'overall': self.overall.to_dict(),
+            'by_sector': {str(key): group.to_dict() for key, group in self.by_sector.items()},
+            'by_product': {str(key): group.to_dict() for key, group in self.by_product.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, state: dict) -> "PortfolioStats":
+        stats = cls(state['relative_accuracy'])
+        stats.last_application_id = state['last_application_id']
+        stats.overall = GroupStats.from_dict(state['overall'])
+        stats.by_sector = {int(key): GroupStats.from_dict(group) for key, group in state['by_sector'].items()}
+        stats.by_product = {int(key): GroupStats.from_dict(group) for key, group in state['by_product'].items()}
+        return stats
+
+    def save(self, path: str):
+        """Writes the state as JSON, atomically (temporary file, then rename)."""
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.to_dict(), f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "PortfolioStats":
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+
+def _aggregate_shard(database: str, after_application_id: int, up_to_application_id: int,
+                     chunksize: int, relative_accuracy: float) -> PortfolioStats:
+    conn = sqlite3.connect(database)
+    try:
+        stats = PortfolioStats(relative_accuracy)
+        stats.last_application_id = after_application_id
+        return stats.update_from_connection(conn, chunksize, up_to_application_id)
+    finally:
+        conn.close()
+
+
+def aggregate(database: str, after_application_id: int = 0, workers: int = 1,
+              chunksize: int = DEFAULT_CHUNKSIZE,
+              relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY) -> PortfolioStats:
+    """
+    Aggregates the applications after after_application_id, split into one application_id
+    range per worker process; the shard results are merged in order.
+    """
+    conn = sqlite3.connect(database)
+    try:
+        last = conn.execute("SELECT MAX(application_id) FROM loan_applications").fetchone()[0]
+    finally:
+        conn.close()
+    last = after_application_id if last is None else max(last, after_application_id)
+    bounds = np.linspace(after_application_id, last, max(workers, 1) + 1).round().astype(np.int64).tolist()
+    shards = [(low, high) for low, high in zip(bounds[:-1], bounds[1:]) if high > low]
+    if len(shards) <= 1:
+        return _aggregate_shard(database, after_application_id, last, chunksize, relative_accuracy)
+
+    with ProcessPoolExecutor(max_workers=len(shards)) as pool:
+        futures = [pool.submit(_aggregate_shard, database, low, high, chunksize, relative_accuracy)
+                   for low, high in shards]
+        stats = futures[0].result()
+        for future in futures[1:]:
+            stats.merge(future.result())
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Streaming portfolio statistics per sector and loan product.")
+    parser.add_argument('database', help="SQLite database with the MatchiFi schema.")
+    parser.add_argument('--state', default=None,
+                        help="JSON state file; only applications after its watermark are read, then it is updated.")
+    parser.add_argument('--workers', type=int, default=1, help="Worker processes, one application_id range each.")
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE)
+    parser.add_argument('--relative-accuracy', type=float, default=DEFAULT_RELATIVE_ACCURACY,
+                        help="Relative accuracy of the quantile estimates.")
+    parser.add_argument('--out', default=None, help="CSV file to write the per-group summary to.")
+    args = parser.parse_args(argv)
+
+    try:
+        previous = None
+        if args.state and os.path.exists(args.state):
+            previous = PortfolioStats.load(args.state)
+        after = previous.last_application_id if previous is not None else 0
+        accuracy = previous.relative_accuracy if previous is not None else args.relative_accuracy
+        increment = aggregate(args.database, after, args.workers, args.chunksize, accuracy)
+        stats = previous.merge(increment) if previous is not None else increment
+        if args.state:
+            stats.save(args.state)
+    except (OSError, ValueError, KeyError, sqlite3.Error) as e:
+        print(f"Portfolio aggregation failed: {e}", file=sys.stderr)
+        return 1
+
+    summary = stats.summary()
+    print(f"Added {increment.overall.applications:,} applications; portfolio covers "
+          f"{stats.overall.applications:,} up to application {stats.last_application_id}")
+    columns = ['group', 'key', 'applications', 'approval_rate'] + [
+        f"{name}_{stat}" for name in FEATURE_COLUMNS[:2] for stat in ('mean', 'p50')]
+    print(summary[summary['group'] != 'product'][columns].to_string(index=False))
+    if args.out:
+        summary.to_csv(args.out, index=False)
+        print(f"Wrote {len(summary)} groups to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
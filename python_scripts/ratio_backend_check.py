@@ -0,0 +1,175 @@
+"""
+Agreement and speed check for the FinancialRatios numeric backends.
+Generates synthetic currency amounts (whole cents, with zero denominators and nearly cancelling
+EBIT/interest pairs mixed in), computes the reference values with the scalar Decimal methods and
+reports, for each backend and ratio, how often the value shown to users (the display precision
+of the analysis apps) matches the reference, along with the largest relative error. It then
+times each backend on the same inputs.
+
+Usage: python ratio_backend_check.py [--rows 20000] [--bench-rows 200000] [--seed 0]
+"""
+
+import argparse
+import sys
+import time
+from decimal import Decimal
+
+import numpy as np
+
+from financial_ratios_calc import BACKENDS, DEFAULT_TAX_RATE, RATIO_CONTEXT, FinancialRatios
+
+# Input order of FinancialRatios.calculate_ratio_arrays
+AMOUNT_COLUMNS = ['liabilities', 'equity', 'assets', 'ebit', 'interest', 'revenue']
+
+# (scale, decimal places) each value is displayed with, as in matchifi_analysis_app.py
+DISPLAY_PRECISION = {
+    'Debt_to_Equity': (1, 4),
+    'Profit_Margin': (1, 2),
+    'Return_on_Assets': (100, 2),
+    'Return_on_Equity': (100, 2),
+    'Interest_Coverage_Ratio': (1, 2),
+    'EBT': (1, 2),
+    'Net_Profit': (1, 2),
+}
+
+
+def generate_amounts(n_rows: int, seed: int = 0) -> dict:
+    """Returns {column: int64 array of cents} for AMOUNT_COLUMNS."""
+    rng = np.random.default_rng(seed)
+    amounts = {
+        'liabilities': rng.integers(0, 10 ** 11, n_rows),
+        'equity': rng.integers(-10 ** 9, 10 ** 10, n_rows),
+        'assets': rng.integers(0, 10 ** 11, n_rows),
+        'ebit': rng.integers(-10 ** 9, 10 ** 10, n_rows),
+        'interest': rng.integers(0, 10 ** 9, n_rows),
+        'revenue': rng.integers(0, 10 ** 11, n_rows),
+    }
+    # EBIT within a few cents of the interest expense: EBT cancels almost completely
+    near = rng.random(n_rows) < 0.1
+    amounts['ebit'][near] = amounts['interest'][near] + rng.integers(-5, 6, int(near.sum()))
+    for name in ('equity', 'assets', 'interest', 'revenue'):
+        amounts[name][rng.random(n_rows) < 0.02] = 0
+    return amounts
+
+
+def reference_values(amounts: dict, tax_rate=DEFAULT_TAX_RATE) -> dict:
+    """Per-row Decimal results of the scalar FinancialRatios methods (None where undefined)."""
+    ratios = FinancialRatios
+    columns = {name: [Decimal(int(c)).scaleb(-2) for c in amounts[name]] for name in AMOUNT_COLUMNS}
+    keep = RATIO_CONTEXT.subtract(Decimal(1), Decimal(tax_rate))
+    calculations = {
+        'Debt_to_Equity': lambda l, e, a, b, t, r, net: ratios.calculate_debt_to_equity_ratio(l, e),
+        'Profit_Margin': lambda l, e, a, b, t, r, net: ratios.calculate_profit_margin(net, r),
+        'Return_on_Assets': lambda l, e, a, b, t, r, net: ratios.calculate_return_on_assets(net, a),
+        'Return_on_Equity': lambda l, e, a, b, t, r, net: ratios.calculate_return_on_equity(net, e),
+        'Interest_Coverage_Ratio': lambda l, e, a, b, t, r, net: ratios.calculate_interest_coverage_ratio(b, t),
+        'EBT': lambda l, e, a, b, t, r, net: RATIO_CONTEXT.subtract(b, t),
+        'Net_Profit': lambda l, e, a, b, t, r, net: net,
+    }
+    reference = {name: [] for name in calculations}
+    for row in zip(*(columns[name] for name in AMOUNT_COLUMNS)):
+        net = RATIO_CONTEXT.multiply(RATIO_CONTEXT.subtract(row[3], row[4]), keep)
+        for name, calculate in calculations.items():
+            try:
+                reference[name].append(calculate(*row, net))
+            except ValueError:
+                reference[name].append(None)
+    return reference
+
+
+def _undefined(value) -> bool:
+    # float NaN from the float and fixed backends, None from the decimal backend
+    return value is None or value != value
+
+
+def _displayed(value, scale: int, places: int) -> str:
+    return format(value * scale, f".{places}f")
+
+
+def agreement(amounts: dict, reference: dict, tax_rate=DEFAULT_TAX_RATE) -> list:
+    """
+    Compares every backend with the Decimal reference at display precision.
+    Returns one record per (backend, column) with the agreement rate and largest relative error.
+    """
+    inputs = [amounts[name] / 100.0 for name in AMOUNT_COLUMNS]
+    records = []
+    for backend in BACKENDS:
+        results = FinancialRatios.calculate_ratio_arrays(*inputs, tax_rate=tax_rate, backend=backend)
+        for name, (scale, places) in DISPLAY_PRECISION.items():
+            compared = mismatches = 0
+            max_rel_error = 0.0
+            for value, expected in zip(results[name].tolist(), reference[name]):
+                if expected is None:
+                    if not _undefined(value):
+                        mismatches += 1
+                    continue
+                compared += 1
+                if _undefined(value):
+                    mismatches += 1
+                    continue
+                if _displayed(value, scale, places) != _displayed(expected, Decimal(scale), places):
+                    mismatches += 1
+                if expected:
+                    error = abs((Decimal(value) - expected) / expected)
+                    max_rel_error = max(max_rel_error, float(error))
+            records.append({
+                'backend': backend,
+                'column': name,
+                'compared': compared,
+                'mismatches': mismatches,
+                'agreement': 1.0 - mismatches / max(len(reference[name]), 1),
+                'max_rel_error': max_rel_error,
+            })
+    return records
+
+
+def benchmark(amounts: dict, tax_rate=DEFAULT_TAX_RATE, repeat: int = 3) -> list:
+    """Best-of-repeat wall-clock time of each backend (and of the scalar methods) over all rows."""
+    inputs = [amounts[name] / 100.0 for name in AMOUNT_COLUMNS]
+    n_rows = len(inputs[0])
+    timings = {}
+    for backend in BACKENDS:
+        best = float('inf')
+        for _ in range(repeat):
+            started = time.perf_counter()
+            FinancialRatios.calculate_ratio_arrays(*inputs, tax_rate=tax_rate, backend=backend)
+            best = min(best, time.perf_counter() - started)
+        timings[backend] = best
+
+    # The per-row loop the GUI and CLI apps used before the batch API
+    started = time.perf_counter()
+    reference_values(amounts, tax_rate)
+    timings['scalar methods'] = time.perf_counter() - started
+
+    baseline = timings['decimal']
+    return [{'backend': name, 'rows': n_rows, 'seconds': seconds, 'rows_per_second': n_rows / seconds,
+             'speedup_vs_decimal': baseline / seconds}
+            for name, seconds in timings.items()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check the FinancialRatios backends against Decimal.")
+    parser.add_argument('--rows', type=int, default=20_000, help="Rows for the agreement check.")
+    parser.add_argument('--bench-rows', type=int, default=200_000, help="Rows for the timing run.")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--tax-rate', default=str(DEFAULT_TAX_RATE), help="Tax rate applied to EBT.")
+    args = parser.parse_args(argv)
+
+    tax_rate = Decimal(args.tax_rate)
+    amounts = generate_amounts(args.rows, args.seed)
+    print(f"Agreement with the scalar Decimal methods at display precision ({args.rows:,} rows)")
+    print(f"{'backend':<8} {'column':<24} {'agree':>9} {'mismatches':>11} {'max rel err':>12}")
+    for r in agreement(amounts, reference_values(amounts, tax_rate), tax_rate):
+        print(f"{r['backend']:<8} {r['column']:<24} {r['agreement']:>9.4%} {r['mismatches']:>11} "
+              f"{r['max_rel_error']:>12.2e}")
+
+    print(f"\nTiming ({args.bench_rows:,} rows)")
+    print(f"{'backend':<15} {'seconds':>9} {'rows/s':>14} {'vs decimal':>11}")
+    for r in benchmark(generate_amounts(args.bench_rows, args.seed + 1), tax_rate):
+        print(f"{r['backend']:<15} {r['seconds']:>9.3f} {r['rows_per_second']:>14,.0f} "
+              f"{r['speedup_vs_decimal']:>10.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,151 @@
+"""
+Declarative dependency graph of the MatchiFi financial ratios.
+Each RatioNode names the values it is computed from, so the EBT -> net profit -> ROA / ROE /
+profit margin chain is described once for every front end. Evaluation is lazy: asking for a
+node computes exactly the nodes it depends on, each at most once per evaluation, and nothing
+else. Values can also be supplied directly for any node (the classifier form enters ratios by
+hand), in which case the node is not computed at all.
+
+    graph = RatioGraph(tax_rate=Decimal('0.25'))
+    values = graph.evaluate(ebit=Decimal('500'), interest=Decimal('50'), revenue=Decimal('2000'))
+    values['profit_margin']    # computes ebt, net_profit and profit_margin only
+
+The arithmetic is Decimal throughout (the scalar FinancialRatios methods in RATIO_CONTEXT).
+A node whose calculation is undefined (e.g. a zero denominator) raises ValueError when it or
+anything depending on it is requested; the error is remembered, not recomputed.
+"""
+
+from collections import namedtuple
+from decimal import Decimal
+
+import instrumentation
+from financial_ratios_calc import DEFAULT_TAX_RATE, RATIO_CONTEXT, FinancialRatios
+
+# Raw values a caller provides; tax_rate defaults to the graph's configured rate
+INPUT_NAMES = ('revenue', 'ebit', 'interest', 'liabilities', 'equity', 'assets', 'benchmark', 'tax_rate')
+
+# column is the name the batch API and the classifier use for the value, if any
+RatioNode = namedtuple('RatioNode', ['name', 'inputs', 'compute', 'label', 'column'])
+
+RATIO_NODES = (
+    RatioNode('ebt', ('ebit', 'interest'), RATIO_CONTEXT.subtract,
+              "EBT (Earnings Before Tax)", 'EBT'),
+    RatioNode('tax', ('ebt', 'tax_rate'), RATIO_CONTEXT.multiply,
+              "Tax Value", None),
+    RatioNode('net_profit', ('ebt', 'tax_rate'),
+              lambda ebt, tax_rate: RATIO_CONTEXT.multiply(ebt, RATIO_CONTEXT.subtract(Decimal(1), tax_rate)),
+              "Net Profit (after tax)", 'Net_Profit'),
+    RatioNode('debt_to_equity', ('liabilities', 'equity'), FinancialRatios.calculate_debt_to_equity_ratio,
+              "Debt-to-Equity Ratio", 'Debt_to_Equity'),
+    RatioNode('roa', ('net_profit', 'assets'), FinancialRatios.calculate_return_on_assets,
+              "Return on Assets (ROA)", 'Return_on_Assets'),
+    RatioNode('roe', ('net_profit', 'equity'), FinancialRatios.calculate_return_on_equity,
+              "Return on Equity (ROE)", 'Return_on_Equity'),
+    RatioNode('icr', ('ebit', 'interest'), FinancialRatios.calculate_interest_coverage_ratio,
+              "Interest Coverage Ratio (ICR)", 'Interest_Coverage_Ratio'),
+    RatioNode('profit_margin', ('net_profit', 'revenue'), FinancialRatios.calculate_profit_margin,
+              "Profit Margin", 'Profit_Margin'),
+    RatioNode('performance', ('profit_margin', 'benchmark'), FinancialRatios.get_company_performance,
+              "Company Performance", None),
+)
+
+
+class RatioEvaluation:
+    """
+    Lazily evaluated values of one company. Look values up by node or input name.
+    """
+
+    def __init__(self, graph: "RatioGraph", values: dict):
+        self.graph = graph
+        self._values = dict(values)
+        self._errors = {}
+        self.computed = []
+
+    def __contains__(self, name) -> bool:
+        return name in self._values
+
+    def __getitem__(self, name):
+        if name in self._values:
+            return self._values[name]
+        if name in self._errors:
+            raise self._errors[name]
+        node = self.graph.nodes.get(name)
+        if node is None:
+            if name in INPUT_NAMES:
+                raise KeyError(f"Input {name!r} was not provided.")
+            raise KeyError(f"Unknown ratio {name!r}.")
+        try:
+            value = node.compute(*(self[dependency] for dependency in node.inputs))
+        except ValueError as e:
+            self._errors[name] = e
+            instrumentation.count('ratio_errors', ratio=name)
+            raise
+        self._values[name] = value
+        self.computed.append(name)
+        return value
+
+    def get(self, name, default=None):
+        """The value of name, or default if it is undefined (ValueError)."""
+        try:
+            return self[name]
+        except ValueError:
+            return default
+
+    def materialize(self, names) -> dict:
+        """{name: value or the ValueError explaining why it is undefined} for the requested names."""
+        results = {}
+        with instrumentation.stage('ratios.graph'):
+            for name in names:
+                try:
+                    results[name] = self[name]
+                except ValueError as e:
+                    results[name] = e
+        return results
+
+    def features(self, columns) -> dict:
+        """Values keyed by their column names (e.g. a model's feature_names), as floats."""
+        return {column: float(self[self.graph.by_column[column]]) for column in columns}
+
+
+class RatioGraph:
+    """
+    A set of RatioNodes with a configurable tax rate. Node names must be unique and every
+    node input must be either an input name or another node.
+    """
+
+    def __init__(self, nodes=RATIO_NODES, tax_rate=DEFAULT_TAX_RATE):
+        self.nodes = {node.name: node for node in nodes}
+        if len(self.nodes) != len(nodes):
+            raise ValueError("Ratio node names must be unique.")
+        unknown = {dep for node in nodes for dep in node.inputs} - set(self.nodes) - set(INPUT_NAMES)
+        if unknown:
+            raise ValueError(f"Ratio nodes depend on unknown values {sorted(unknown)}.")
+        self.by_column = {node.column: node.name for node in nodes if node.column}
+        self.tax_rate = Decimal(str(tax_rate))
+
+    def dependencies(self, name) -> list:
+        """Every node name needs, in evaluation order (name last)."""
+        order = []
+
+        def visit(current):
+            node = self.nodes.get(current)
+            if node is None or current in order:
+                return
+            for dependency in node.inputs:
+                visit(dependency)
+            order.append(current)
+
+        visit(name)
+        return order
+
+    def evaluate(self, **values) -> RatioEvaluation:
+        """
+        Starts a lazy evaluation from the given inputs (and any node values supplied directly).
+        Nothing is computed until a value is requested.
+        """
+        values.setdefault('tax_rate', self.tax_rate)
+        return RatioEvaluation(self, values)
+
+    def compute(self, outputs, **values) -> dict:
+        """Evaluates only the requested outputs; see RatioEvaluation.materialize."""
+        return self.evaluate(**values).materialize(outputs)
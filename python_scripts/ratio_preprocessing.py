@@ -0,0 +1,115 @@
+"""
+Preprocessing for the MatchiFi loan classifier.
+The raw ratios differ wildly in scale (Interest_Coverage_Ratio can run into the hundreds while
+Return_on_Assets is a small fraction), which is why saga needed max_iter=10000. The pipeline built
+here clips each ratio to training quantiles, applies a signed log transform to heavy-tailed
+ratios and standardizes everything before the classifier. The fitted parameters are pickled with
+the model, and LinearScorer folds the scaler into the coefficients so inference costs the same.
+"""
+
+import numpy as np
+from sklearn.base import BaseEstimator, TransformerMixin
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+from model_artifact import FEATURE_COLUMNS
+
+# Ratios whose distributions are heavy-tailed enough to benefit from a log transform
+DEFAULT_LOG_COLUMNS = ('Debt_to_Equity', 'Interest_Coverage_Ratio')
+
+DEFAULT_CLIP_QUANTILES = (0.005, 0.995)
+
+# scikit-learn 1.8 deprecated LogisticRegression(penalty=...) in favour of l1_ratio alone;
+# older releases still need the penalty spelled out for l1_ratio to take effect
+_PENALTY_DEPRECATED = LogisticRegression().get_params()['penalty'] == 'deprecated'
+
+
+def apply_ratio_transform(X: np.ndarray, lower, upper, log_mask, out: np.ndarray = None) -> np.ndarray:
+    """
+    Clips each column of X to [lower, upper] and replaces the log_mask columns with
+    sign(x) * log1p(|x|). Works on a 2-D array; writes into out if given.
+    """
+    out = np.clip(X, lower, upper, out=out)
+    if log_mask.any():
+        logged = out[:, log_mask]
+        out[:, log_mask] = np.sign(logged) * np.log1p(np.abs(logged))
+    return out
+
+
+class RatioTransformer(BaseEstimator, TransformerMixin):
+    """
+    Clips ratios to the [low, high] training quantiles (clip_quantiles=None disables clipping)
+    and log-transforms the log_columns, given by name from feature_names.
+    """
+
+    def __init__(self, clip_quantiles=DEFAULT_CLIP_QUANTILES, log_columns=DEFAULT_LOG_COLUMNS,
+                 feature_names=tuple(FEATURE_COLUMNS)):
+        self.clip_quantiles = clip_quantiles
+        self.log_columns = log_columns
+        self.feature_names = feature_names
+
+    def fit(self, X, y=None):
+        X = np.asarray(X, dtype=np.float64)
+        unknown = [name for name in self.log_columns or () if name not in self.feature_names]
+        if unknown:
+            raise ValueError(f"Log columns {unknown} are not among the feature names.")
+        if len(self.feature_names) != X.shape[1]:
+            raise ValueError("Number of feature names does not match the number of columns.")
+
+        if self.clip_quantiles is None:
+            self.lower_ = np.full(X.shape[1], -np.inf)
+            self.upper_ = np.full(X.shape[1], np.inf)
+        else:
+            low, high = self.clip_quantiles
+            self.lower_, self.upper_ = np.quantile(X, [low, high], axis=0)
+        self.log_mask_ = np.array([name in (self.log_columns or ()) for name in self.feature_names])
+        self.n_features_in_ = X.shape[1]
+        return self
+
+    def transform(self, X):
+        return apply_ratio_transform(np.asarray(X, dtype=np.float64), self.lower_, self.upper_, self.log_mask_)
+
+
+def _logistic_regression(C: float = 10, l1_ratio: float = 0.0, **params) -> LogisticRegression:
+    """
+    LogisticRegression with the regularization given as C and l1_ratio (0 for L2, 1 for L1,
+    in between for elastic net), on any supported scikit-learn version.
+    """
+    if _PENALTY_DEPRECATED:
+        return LogisticRegression(C=C, l1_ratio=l1_ratio, **params)
+    if l1_ratio in (0, 1):
+        return LogisticRegression(C=C, penalty='l1' if l1_ratio else 'l2', **params)
+    return LogisticRegression(C=C, penalty='elasticnet', l1_ratio=l1_ratio, **params)
+
+
+# The older penalty names build_pipeline still accepts, as l1_ratio values
+PENALTY_L1_RATIOS = {'l2': 0.0, 'l1': 1.0}
+
+
+def build_pipeline(C: float = 10, l1_ratio: float = 0.0, solver: str = 'saga', max_iter: int = 10000,
+                   preprocess: bool = True, warm_start: bool = False, penalty: str = None,
+                   **transformer_params):
+    """
+    The classifier used by the training scripts: LogisticRegression behind a RatioTransformer
+    and a StandardScaler, or the bare LogisticRegression when preprocess is False.
+    penalty ('l1' or 'l2') is the older spelling of l1_ratio and takes precedence when given.
+    """
+    if penalty is not None:
+        if penalty not in PENALTY_L1_RATIOS:
+            raise ValueError(f"Unsupported penalty {penalty!r}; pass l1_ratio instead.")
+        l1_ratio = PENALTY_L1_RATIOS[penalty]
+    classifier = _logistic_regression(C=C, l1_ratio=l1_ratio, solver=solver, max_iter=max_iter,
+                                      warm_start=warm_start)
+    if not preprocess:
+        return classifier
+    return Pipeline([
+        ('ratios', RatioTransformer(**transformer_params)),
+        ('scale', StandardScaler()),
+        ('clf', classifier),
+    ])
+
+
+def final_estimator(model):
+    """The classifier at the end of a pipeline, or the model itself."""
+    return model.steps[-1][1] if hasattr(model, 'steps') else model
@@ -0,0 +1,317 @@
+"""
+Content-addressed result cache for repeated MatchiFi analyses.
+Lenders resubmit the same company financials many times, so ratio analyses and loan-status
+predictions are cached under a SHA-256 of the normalized inputs (numbers compared by value, so
+'1000', '1000.00' and 1e3 hit the same entry), the kind of result and, for predictions, the
+model version. A bounded in-process LRU sits in front of an optional on-disk SQLite store.
+The process-wide get_result_cache() keeps its store at DEFAULT_RESULT_CACHE_PATH; a ResultCache
+built without a path is memory only. Writes to the store are batched and committed by a
+background thread, so put() never waits for the disk, and lookups never hold the LRU lock
+while they read it. The store is pruned by size when a running row count passes the limit,
+and by age every prune_interval seconds.
+
+Deploying a new model artifact changes the version in every prediction key, so stale
+predictions are never served. Rows of other versions stay in the store, because another
+process (e.g. one still on the previous artifact during a hot-swap) may be using them; they
+age out like any other row.
+"""
+
+import atexit
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from decimal import Decimal
+
+from financial_ratios_calc import RATIO_CONTEXT
+
+# On-disk store of get_result_cache: results.sqlite in MATCHIFI_CACHE_DIR, or in ~/.matchifi_cache
+DEFAULT_RESULT_CACHE_PATH = os.path.join(
+    os.environ.get('MATCHIFI_CACHE_DIR') or os.path.join(os.path.expanduser('~'), '.matchifi_cache'),
+    'results.sqlite')
+
+DEFAULT_MAX_ENTRIES = 4096
+
+# Store limits: rows older than DEFAULT_MAX_AGE seconds, and the oldest rows beyond
+# DEFAULT_MAX_DISK_ENTRIES, are deleted
+DEFAULT_MAX_AGE = 7 * 24 * 3600
+DEFAULT_MAX_DISK_ENTRIES = 1_000_000
+
+# Seconds between background commits of pending writes
+DEFAULT_FLUSH_INTERVAL = 1.0
+
+# Seconds between deletions of expired rows (which also recount the store's rows)
+DEFAULT_PRUNE_INTERVAL = 300.0
+
+RESULT_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    model_version TEXT,
+    value TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_results_created_at ON results (created_at);
+"""
+
+# Returned by ResultCache.get when a key is not cached (None is a valid cached value)
+MISSING = object()
+
+
+def _normalize(value) -> str:
+    if isinstance(value, str):
+        value = value.strip()
+    number = Decimal(str(value))
+    # plus() turns -0 into 0 after normalize() has stripped trailing zeros
+    return str(RATIO_CONTEXT.plus(RATIO_CONTEXT.normalize(number)))
+
+
+def canonical_key(kind: str, inputs: dict, model_version: str = None) -> str:
+    """SHA-256 of the kind, the model version and the inputs normalized by numeric value."""
+    document = json.dumps({
+        'kind': kind,
+        'model_version': model_version,
+        'inputs': {name: _normalize(value) for name, value in inputs.items()},
+    }, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(document.encode()).hexdigest()
+
+
+class ResultCache:
+    """
+    Thread-safe LRU of at most max_entries JSON-serialisable results, backed by a SQLite
+    store when path is given. Counts memory hits, disk hits, misses and LRU evictions.
+    Store writes are queued and committed in batches every flush_interval seconds by a
+    background thread; close() commits whatever is still pending.
+    """
+
+    def __init__(self, path: str = None, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 max_age: float = DEFAULT_MAX_AGE, max_disk_entries: int = DEFAULT_MAX_DISK_ENTRIES,
+                 flush_interval: float = DEFAULT_FLUSH_INTERVAL, prune_interval: float = DEFAULT_PRUNE_INTERVAL):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.max_disk_entries = max_disk_entries
+        self.flush_interval = flush_interval
+        self.prune_interval = prune_interval
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._model_version = None
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._conn = None
+        # key -> row awaiting the store, and the rows flush() is writing; _db_lock serialises
+        # use of the connection and is never taken while _lock is held
+        self._pending = {}
+        self._in_flight = {}
+        self._db_lock = threading.Lock()
+        # Store rows at the last count plus the rows written since (replacements count again)
+        self._disk_rows = 0
+        self._pruned_at = time.monotonic()
+        self._closing = threading.Event()
+        self._writer = None
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.executescript(RESULT_SCHEMA)
+            self._disk_rows = self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+            self._writer = threading.Thread(target=self._write_behind, name='result-cache-writer', daemon=True)
+            self._writer.start()
+
+    def _remember(self, key: str, value, model_version: str = None):
+        self._entries[key] = (value, model_version)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def peek(self, key: str):
+        """The value for key if it is in memory (counted as a memory hit), otherwise MISSING."""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.memory_hits += 1
+                return self._entries[key][0]
+            return MISSING
+
+    def get(self, key: str):
+        """The cached value for key, or MISSING."""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.memory_hits += 1
+                return self._entries[key][0]
+            row = self._pending.get(key) or self._in_flight.get(key)
+            if row is not None:
+                row = (row[3], row[2])
+            elif self._conn is None:
+                self.misses += 1
+                return MISSING
+
+        if row is None:
+            with self._db_lock:
+                if self._conn is not None:
+                    row = self._conn.execute("SELECT value, model_version FROM results WHERE key = ?",
+                                             (key,)).fetchone()
+        with self._lock:
+            if row is None:
+                self.misses += 1
+                return MISSING
+            value = json.loads(row[0])
+            self._remember(key, value, row[1])
+            self.disk_hits += 1
+            return value
+
+    def put(self, key: str, value, kind: str, model_version: str = None):
+        with self._lock:
+            self._remember(key, value, model_version)
+            if self._conn is not None:
+                self._pending[key] = (key, kind, model_version, json.dumps(value), time.time())
+
+    def _write_behind(self):
+        while not self._closing.wait(self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        """
+        Commits the pending writes in one transaction. The oldest rows are deleted once the
+        store may hold more than max_disk_entries, and expired rows every prune_interval seconds.
+        """
+        with self._lock:
+            self._in_flight, self._pending = self._pending, {}
+            rows = list(self._in_flight.values())
+        try:
+            with self._db_lock:
+                if self._conn is None or not rows:
+                    return
+                self._conn.executemany("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)", rows)
+                self._disk_rows += len(rows)
+                if time.monotonic() - self._pruned_at >= self.prune_interval:
+                    self._conn.execute("DELETE FROM results WHERE created_at < ?", (time.time() - self.max_age,))
+                    self._disk_rows = self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+                    self._pruned_at = time.monotonic()
+                if self._disk_rows > self.max_disk_entries:
+                    self._disk_rows = self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+                    excess = self._disk_rows - self.max_disk_entries
+                    if excess > 0:
+                        self._conn.execute("DELETE FROM results WHERE key IN "
+                                           "(SELECT key FROM results ORDER BY created_at LIMIT ?)", (excess,))
+                        self._disk_rows = self.max_disk_entries
+                self._conn.commit()
+        finally:
+            with self._lock:
+                self._in_flight = {}
+
+    def use_model_version(self, model_version: str):
+        """
+        Records the deployed model version. On a change, predictions made by any other
+        version are dropped from memory (ratio analyses are kept); the store is left alone.
+        """
+        with self._lock:
+            if model_version == self._model_version:
+                return
+            if self._model_version is not None:
+                self.invalidations += 1
+            self._model_version = model_version
+            stale = [key for key, (_, version) in self._entries.items()
+                     if version is not None and version != model_version]
+            for key in stale:
+                del self._entries[key]
+
+    def get_or_compute(self, kind: str, inputs: dict, compute, model_version: str = None):
+        """Returns the cached result for (kind, inputs, model_version), computing and storing it on a miss."""
+        if model_version is not None:
+            self.use_model_version(model_version)
+        key = canonical_key(kind, inputs, model_version)
+        value = self.get(key)
+        if value is MISSING:
+            value = compute()
+            self.put(key, value, kind, model_version)
+        return value
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'hits': self.memory_hits + self.disk_hits,
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'entries': len(self._entries),
+                'pending_writes': len(self._pending),
+            }
+
+    def close(self):
+        if self._writer is not None:
+            self._closing.set()
+            self._writer.join()
+            self._writer = None
+        self.flush()
+        with self._db_lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+def cached_ratio_analysis(cache: ResultCache, graph, names, **inputs) -> dict:
+    """
+    Materializes the named ratio graph values through the cache.
+    Returns {name: value, or ValueError if undefined} like RatioEvaluation.materialize.
+    """
+    def compute():
+        stored = {}
+        for name, value in graph.compute(names, **inputs).items():
+            if isinstance(value, ValueError):
+                stored[name] = {'error': str(value)}
+            elif isinstance(value, Decimal):
+                stored[name] = {'decimal': str(value)}
+            else:
+                stored[name] = {'text': value}
+        return stored
+
+    keyed = dict(inputs, tax_rate=inputs.get('tax_rate', graph.tax_rate))
+    results = {}
+    for name, entry in cache.get_or_compute('ratios:' + ','.join(names), keyed, compute).items():
+        if 'error' in entry:
+            results[name] = ValueError(entry['error'])
+        else:
+            results[name] = Decimal(entry['decimal']) if 'decimal' in entry else entry['text']
+    return results
+
+
+def cached_prediction(cache: ResultCache, scorer, model_version: str, features: dict) -> tuple:
+    """(approval probability, label) from scorer.score_mapping, cached per model version."""
+    def compute():
+        probability, label = scorer.score_mapping(features)
+        return [float(probability), label.item() if hasattr(label, 'item') else label]
+
+    probability, label = cache.get_or_compute('prediction', features, compute, model_version)
+    return probability, label
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_result_cache() -> ResultCache:
+    """
+    The process-wide cache, opened on first use with its store at DEFAULT_RESULT_CACHE_PATH.
+    It falls back to memory only if the store cannot be opened.
+    """
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            try:
+                _default_cache = ResultCache(DEFAULT_RESULT_CACHE_PATH)
+            except (OSError, sqlite3.Error):
+                _default_cache = ResultCache()
+            atexit.register(_default_cache.close)
+        return _default_cache
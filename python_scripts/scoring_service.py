@@ -0,0 +1,445 @@
+"""
+Local HTTP/JSON scoring service for the MatchiFi loan classifier, built on asyncio.
+The model artifact is loaded once at startup and hot-swapped when the file is replaced on disk
+(e.g. by online_update.py), checked every --reload-interval seconds. Concurrent requests are queued and coalesced
+into micro-batches (bounded by a maximum batch size and a maximum wait) that are scored with
+one vectorized call, and request latency percentiles are exposed for monitoring. Repeated
+requests for the same features are answered from the result cache (result_cache.py) without
+waiting for a batch; a new model version invalidates it. With --result-cache-path the cache
+also persists across restarts, and its store is read off the event loop.
+
+Endpoints:
+    POST /score    body: the five ratios by feature name, or raw financials
+                   (revenue, ebit, interest, liabilities, equity, assets)
+                   reply: {"probability": <approval probability>, "status": ..., "model_version": ...}
+    GET  /metrics  request counts, batch sizes, result cache counters and p50/p99 latency in milliseconds,
+                   plus per-stage timings when instrumented (--metrics-dir, see instrumentation.py)
+    GET  /health   liveness check
+
+Usage: python scoring_service.py [--port 8085] [--max-batch-size 256] [--max-wait-ms 2]
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import sqlite3
+import sys
+import time
+from collections import deque
+
+import numpy as np
+
+import instrumentation
+from financial_ratios_calc import DEFAULT_TAX_RATE, REASON_OK, FinancialRatios
+from linear_scorer import LinearScorer
+from model_artifact import DEFAULT_MODEL_PATH, ArtifactLoader
+from result_cache import DEFAULT_MAX_ENTRIES, MISSING, ResultCache, canonical_key
+
+RAW_FIELDS = ['revenue', 'ebit', 'interest', 'liabilities', 'equity', 'assets']
+
+MAX_BODY_BYTES = 64 * 1024
+
+
+class RequestError(Exception):
+    """A client error reported back as an HTTP 4xx response."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class LatencyTracker:
+    """Keeps the most recent latencies in a ring buffer and reports percentiles over them."""
+
+    def __init__(self, window: int = 10_000):
+        self._samples = deque(maxlen=window)
+        self.count = 0
+
+    def record(self, seconds: float):
+        self._samples.append(seconds)
+        self.count += 1
+
+    def percentile_ms(self, q: float) -> float:
+        if not self._samples:
+            return 0.0
+        return float(np.percentile(np.fromiter(self._samples, dtype=np.float64), q)) * 1000.0
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent scoring requests into batches.
+    A batch is flushed as soon as it holds max_batch_size rows or max_wait seconds have passed
+    since its first row arrived, and is scored with a single LinearScorer.score_batch call.
+    A malformed row fails only its own request (with ValueError), not the rest of its batch.
+    """
+
+    def __init__(self, scorer: LinearScorer, max_batch_size: int = 256, max_wait: float = 0.002,
+                 model_version: str = None):
+        self.scorer = scorer
+        self.model_version = model_version
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.batches = 0
+        self.rows = 0
+        self._queue = asyncio.Queue()
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def swap(self, scorer: LinearScorer, model_version: str = None):
+        """Scores every batch flushed from now on with scorer; batches in flight are unaffected."""
+        self.scorer = scorer
+        self.model_version = model_version
+
+    async def score(self, features) -> tuple:
+        """
+        Queues one applicant (a sequence in feature order) and waits for
+        (probability, label, version of the model that scored it).
+        """
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((features, future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        buffer = np.empty((self.max_batch_size, self.scorer.n_features), dtype=np.float64)
+        probabilities = np.empty(self.max_batch_size, dtype=np.float64)
+        while True:
+            pending = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(pending) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    pending.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            # Drain anything that queued up while this batch was being collected
+            while len(pending) < self.max_batch_size and not self._queue.empty():
+                pending.append(self._queue.get_nowait())
+
+            scorer, version = self.scorer, self.model_version
+            if buffer.shape[1] != scorer.n_features:
+                buffer = np.empty((self.max_batch_size, scorer.n_features), dtype=np.float64)
+            try:
+                with instrumentation.stage('service.predict'):
+                    futures = self._fill(pending, buffer)
+                    n = len(futures)
+                    if n:
+                        batch_prob, labels = scorer.score_batch(buffer[:n], out=probabilities[:n])
+            except Exception as e:
+                for _, future in pending:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            if not n:
+                continue
+            self.batches += 1
+            self.rows += n
+            for i, future in enumerate(futures):
+                if not future.done():
+                    future.set_result((float(batch_prob[i]), labels[i].item(), version))
+
+    @staticmethod
+    def _fill(pending, buffer: np.ndarray) -> list:
+        """
+        Copies the pending requests' features into consecutive rows of buffer and returns the
+        futures of the rows written, in order. A request whose features are not a sequence of
+        buffer.shape[1] finite numbers fails its own future and is left out of the batch;
+        requests whose callers have gone away are skipped.
+        """
+        n_features = buffer.shape[1]
+        futures = []
+        for features, future in pending:
+            if future.done():
+                continue
+            try:
+                if len(features) != n_features:
+                    raise ValueError(f"expected {n_features} features, got {len(features)}")
+                buffer[len(futures)] = features
+            except (TypeError, ValueError) as e:
+                future.set_exception(ValueError(f"Invalid applicant features: {e}"))
+                continue
+            futures.append(future)
+
+        finite = np.isfinite(buffer[:len(futures)]).all(axis=1)
+        if finite.all():
+            return futures
+        for future in itertools.compress(futures, ~finite):
+            future.set_exception(ValueError("Invalid applicant features: not all values are finite."))
+        buffer[:int(finite.sum())] = buffer[:len(futures)][finite]
+        return list(itertools.compress(futures, finite))
+
+
+class ScoringService:
+    """Request handling for the HTTP endpoints; see the module docstring."""
+
+    def __init__(self, artifact, max_batch_size: int = 256, max_wait: float = 0.002,
+                 tax_rate=DEFAULT_TAX_RATE, result_cache: ResultCache = None):
+        self.artifact = artifact
+        self.result_cache = result_cache
+        self.scorer = LinearScorer.from_artifact(artifact)
+        self.batcher = MicroBatcher(self.scorer, max_batch_size, max_wait, artifact.version)
+        self.latency = LatencyTracker()
+        self.tax_rate = tax_rate
+        self.errors = 0
+        self.reloads = 0
+
+    def swap_artifact(self, artifact):
+        """Atomically switches scoring to a new artifact (the event loop is single-threaded)."""
+        scorer = LinearScorer.from_artifact(artifact)
+        self.artifact, self.scorer = artifact, scorer
+        self.batcher.swap(scorer, artifact.version)
+        self.reloads += 1
+
+    async def watch_artifact(self, loader: ArtifactLoader, interval: float):
+        """Polls the artifact file and swaps in a replaced model without dropping requests."""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                if await loop.run_in_executor(None, loader.reload_if_changed):
+                    self.swap_artifact(loader.get())
+                    print(f"Swapped in model {self.artifact.version}")
+            except (OSError, ValueError) as e:
+                print(f"Keeping model {self.artifact.version}; reload failed: {e}", file=sys.stderr)
+
+    def _features_from_payload(self, payload) -> list:
+        """Builds the feature vector from ratios or, failing that, from raw financials."""
+        if not isinstance(payload, dict):
+            raise RequestError(400, "Request body must be a JSON object.")
+        try:
+            if all(name in payload for name in self.scorer.feature_names):
+                features = [float(payload[name]) for name in self.scorer.feature_names]
+                if not all(math.isfinite(value) for value in features):
+                    raise RequestError(422, "Feature values must be finite numbers.")
+                return features
+            if all(name in payload for name in RAW_FIELDS):
+                ratios = FinancialRatios.calculate_ratio_arrays(
+                    payload['liabilities'], payload['equity'], payload['assets'],
+                    payload['ebit'], payload['interest'], payload['revenue'], tax_rate=self.tax_rate,
+                )
+                reason = int(ratios['Reason_Code'][0])
+                if reason != REASON_OK:
+                    raise RequestError(422, f"Ratios undefined for these financials (reason code {reason}).")
+                features = [float(ratios[name][0]) for name in self.scorer.feature_names]
+                if not all(math.isfinite(value) for value in features):
+                    raise RequestError(422, "Ratios are not finite for these financials.")
+                return features
+        except (TypeError, ValueError) as e:
+            raise RequestError(400, f"Invalid numeric value: {e}")
+        raise RequestError(
+            400, "Expected either the fields " + ", ".join(self.scorer.feature_names)
+            + " or the fields " + ", ".join(RAW_FIELDS) + ".")
+
+    async def score(self, body: bytes) -> dict:
+        with instrumentation.stage('service.parse'):
+            try:
+                payload = json.loads(body)
+            except ValueError:
+                raise RequestError(400, "Request body is not valid JSON.")
+            features = self._features_from_payload(payload)
+        if self.result_cache is None:
+            probability, status, version = await self.batcher.score(features)
+            return {'probability': probability, 'status': status, 'model_version': version}
+
+        version = self.batcher.model_version
+        self.result_cache.use_model_version(version)
+        inputs = dict(zip(self.scorer.feature_names, features))
+        key = canonical_key('prediction', inputs, version)
+        cached = self.result_cache.peek(key)
+        if cached is MISSING:
+            if self.result_cache.path:
+                cached = await asyncio.get_running_loop().run_in_executor(None, self.result_cache.get, key)
+            else:
+                cached = self.result_cache.get(key)
+        if cached is not MISSING:
+            probability, status = cached
+        else:
+            probability, status, version = await self.batcher.score(features)
+            # Stored under the version that actually scored it (a swap may have happened meanwhile)
+            self.result_cache.put(canonical_key('prediction', inputs, version), [probability, status],
+                                  'prediction', version)
+        return {'probability': probability, 'status': status, 'model_version': version}
+
+    def metrics(self) -> dict:
+        batches = self.batcher.batches
+        cache_stats = self.result_cache.stats() if self.result_cache is not None else None
+        return {
+            'model_version': self.artifact.version,
+            'model_reloads': self.reloads,
+            'requests': self.latency.count,
+            'errors': self.errors,
+            'batches': batches,
+            'mean_batch_size': self.batcher.rows / batches if batches else 0.0,
+            'latency_p50_ms': self.latency.percentile_ms(50),
+            'latency_p99_ms': self.latency.percentile_ms(99),
+            'result_cache': cache_stats,
+            'instrumentation': instrumentation.snapshot() if instrumentation.enabled() else None,
+        }
+
+    async def dispatch(self, method: str, path: str, body: bytes) -> tuple:
+        """Routes one request; returns (HTTP status, JSON-serialisable reply)."""
+        if path == '/score':
+            if method != 'POST':
+                raise RequestError(405, "Use POST for /score.")
+            started = time.perf_counter()
+            reply = await self.score(body)
+            self.latency.record(time.perf_counter() - started)
+            return 200, reply
+        if path == '/metrics' and method == 'GET':
+            return 200, self.metrics()
+        if path == '/health' and method == 'GET':
+            return 200, {'status': 'ok'}
+        raise RequestError(404, f"No route for {method} {path}.")
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Serves HTTP/1.1 requests on one connection until the client closes it."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, path, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                try:
+                    try:
+                        length = int(headers.get('content-length', 0))
+                    except ValueError:
+                        raise RequestError(400, "Invalid Content-Length header.")
+                    if length < 0:
+                        raise RequestError(400, "Invalid Content-Length header.")
+                    if length > MAX_BODY_BYTES:
+                        raise RequestError(413, "Request body too large.")
+                    body = await reader.readexactly(length) if length else b''
+                    status, reply = await self.dispatch(method, path, body)
+                except RequestError as e:
+                    self.errors += 1
+                    status, reply = e.status, {'error': str(e)}
+                except ValueError as e:
+                    # Scoring failures that validation did not anticipate
+                    self.errors += 1
+                    status, reply = 422, {'error': f"Could not score the request: {e}"}
+
+                keep_alive = (headers.get('connection', '').lower() != 'close'
+                              and version == 'HTTP/1.1')
+                data = json.dumps(reply).encode()
+                writer.write(
+                    f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\n"
+                    f"Content-Type: application/json\r\n"
+                    f"Content-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + data
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+async def export_metrics(directory: str, interval: float):
+    """Rewrites the instrumentation exports in directory every interval seconds."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            instrumentation.write_metrics_dir(directory)
+        except OSError as e:
+            print(f"Could not write metrics to {directory}: {e}", file=sys.stderr)
+
+
+async def serve(loader: ArtifactLoader, host: str = '127.0.0.1', port: int = 8085,
+                max_batch_size: int = 256, max_wait: float = 0.002, reload_interval: float = 30.0,
+                result_cache: ResultCache = None, metrics_dir: str = None, metrics_interval: float = 15.0):
+    service = ScoringService(loader.get(), max_batch_size, max_wait, result_cache=result_cache)
+    service.batcher.start()
+    watcher = exporter = None
+    if reload_interval > 0:
+        watcher = asyncio.get_running_loop().create_task(service.watch_artifact(loader, reload_interval))
+    if metrics_dir:
+        exporter = asyncio.get_running_loop().create_task(export_metrics(metrics_dir, metrics_interval))
+    server = await asyncio.start_server(service.handle_connection, host, port)
+    print(f"MatchiFi scoring service (model {service.artifact.version}) listening on http://{host}:{port}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        if watcher is not None:
+            watcher.cancel()
+        if exporter is not None:
+            exporter.cancel()
+            instrumentation.write_metrics_dir(metrics_dir)
+        await service.batcher.stop()
+        if result_cache is not None:
+            result_cache.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the MatchiFi scoring service.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8085)
+    parser.add_argument('--model', default=DEFAULT_MODEL_PATH, help="Model artifact path.")
+    parser.add_argument('--max-batch-size', type=int, default=256)
+    parser.add_argument('--max-wait-ms', type=float, default=2.0,
+                        help="Longest a request waits for its micro-batch to fill.")
+    parser.add_argument('--reload-interval', type=float, default=30.0,
+                        help="Seconds between checks for a replaced model artifact (0 disables).")
+    parser.add_argument('--result-cache-size', type=int, default=DEFAULT_MAX_ENTRIES,
+                        help="Results kept in memory for repeated requests (0 disables the cache).")
+    parser.add_argument('--result-cache-path', default=None,
+                        help="SQLite store that keeps the result cache across restarts (default: memory only).")
+    parser.add_argument('--metrics-dir', default=None,
+                        help="Instrument the service and write matchifi.prom / matchifi.json here.")
+    parser.add_argument('--metrics-interval', type=float, default=15.0,
+                        help="Seconds between metrics exports.")
+    args = parser.parse_args(argv)
+
+    loader = ArtifactLoader(args.model)
+    try:
+        loader.get()
+    except (OSError, ValueError) as e:
+        print(f"Could not load the model artifact: {e}", file=sys.stderr)
+        return 1
+    try:
+        result_cache = (ResultCache(args.result_cache_path, args.result_cache_size)
+                        if args.result_cache_size > 0 else None)
+    except (OSError, sqlite3.Error) as e:
+        print(f"Could not open the result cache: {e}", file=sys.stderr)
+        return 1
+    if args.metrics_dir:
+        instrumentation.enable()
+    try:
+        asyncio.run(serve(loader, args.host, args.port, args.max_batch_size,
+                          args.max_wait_ms / 1000.0, args.reload_interval, result_cache,
+                          args.metrics_dir, args.metrics_interval))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
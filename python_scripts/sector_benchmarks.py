@@ -0,0 +1,106 @@
+"""
+Sector benchmark cache for MatchiFi performance assessment.
+The sectors table stores each sector's net profit margin (net_pm), asset turnover and
+debt-to-equity benchmarks. The cache reads the table once into dense NumPy arrays indexed by
+sector_id, so a whole batch gathers its benchmarks with one fancy-indexing operation instead
+of one query per company. Entries expire after a TTL or when invalidate() is called, and a
+SQLite data_version change (another connection writing to the database) is detected as well.
+"""
+
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+from financial_ratios_calc import FinancialRatios
+
+BENCHMARK_COLUMNS = ['net_pm', 'asset_turnover', 'debt_to_eq']
+
+DEFAULT_TTL_SECONDS = 300.0
+
+# Largest sector_id the dense arrays index; sectors with a negative, missing or larger id are
+# left out of the arrays, so they gather NaN like any unknown sector
+MAX_SECTOR_ID = 1_000_000
+
+
+class SectorBenchmarkCache:
+    """
+    Dense per-sector benchmark arrays loaded from the sectors table.
+    Unknown sector ids gather NaN, which get_company_performance_batch reports as unassessable.
+    """
+
+    def __init__(self, conn: sqlite3.Connection, ttl: float = DEFAULT_TTL_SECONDS,
+                 max_sector_id: int = MAX_SECTOR_ID):
+        self.conn = conn
+        self.ttl = ttl
+        self.max_sector_id = max_sector_id
+        self.loads = 0
+        # Sectors rows left out of the last load because of their sector_id
+        self.skipped = 0
+        self._arrays = None
+        self._loaded_at = 0.0
+        self._data_version = None
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        """Drops the cached arrays; the next lookup reloads the sectors table."""
+        with self._lock:
+            self._arrays = None
+
+    def _current_data_version(self):
+        try:
+            return self.conn.execute("PRAGMA data_version").fetchone()[0]
+        except sqlite3.Error:
+            return None
+
+    def _is_stale(self) -> bool:
+        if self._arrays is None:
+            return True
+        if self.ttl is not None and time.monotonic() - self._loaded_at > self.ttl:
+            return True
+        return self._current_data_version() != self._data_version
+
+    def _load(self) -> dict:
+        rows = self.conn.execute(
+            "SELECT sector_id, " + ", ".join(BENCHMARK_COLUMNS) + " FROM sectors").fetchall()
+        indexable = [row for row in rows
+                     if isinstance(row[0], int) and 0 <= row[0] <= self.max_sector_id]
+        self.skipped = len(rows) - len(indexable)
+        rows = indexable
+        ids = np.array([row[0] for row in rows], dtype=np.int64)
+        size = int(ids.max()) + 1 if len(ids) else 0
+        arrays = {}
+        for j, name in enumerate(BENCHMARK_COLUMNS, 1):
+            column = np.full(size, np.nan, dtype=np.float64)
+            column[ids] = [np.nan if row[j] is None else row[j] for row in rows]
+            arrays[name] = column
+        return arrays
+
+    def arrays(self) -> dict:
+        """Returns {benchmark column: array indexed by sector_id}, reloading if stale."""
+        with self._lock:
+            if self._is_stale():
+                self._data_version = self._current_data_version()
+                self._arrays = self._load()
+                self._loaded_at = time.monotonic()
+                self.loads += 1
+            return self._arrays
+
+    def gather(self, sector_ids, column: str = 'net_pm') -> np.ndarray:
+        """
+        Returns the benchmark for each row's sector (NaN for unknown, missing, negative or
+        fractional sector ids).
+        """
+        table = self.arrays()[column]
+        sector_ids = np.asarray(sector_ids, dtype=np.float64)
+        known = (sector_ids >= 0) & (sector_ids < len(table)) & (sector_ids == np.floor(sector_ids))
+        out = np.full(sector_ids.shape, np.nan, dtype=np.float64)
+        out[known] = table[sector_ids[known].astype(np.intp)]
+        return out
+
+    def company_performance(self, profit_margin, sector_ids) -> np.ndarray:
+        """
+        Vectorized performance classification against each row's sector net profit margin.
+        """
+        return FinancialRatios.get_company_performance_batch(profit_margin, self.gather(sector_ids, 'net_pm'))
@@ -0,0 +1,33 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# The scripts import each other by bare module name
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from model_artifact import FEATURE_COLUMNS, ModelArtifact  # noqa: E402
+from ratio_preprocessing import build_pipeline  # noqa: E402
+
+
+def synthetic_features(n_rows: int, seed: int = 0) -> np.ndarray:
+    """Ratios in FEATURE_COLUMNS order and units (ROA/ROE as fractions, margin in percent)."""
+    rng = np.random.default_rng(seed)
+    return np.column_stack([
+        rng.gamma(2.0, 0.6, n_rows),
+        rng.normal(10, 8, n_rows),
+        rng.normal(0.06, 0.05, n_rows),
+        rng.normal(0.12, 0.09, n_rows),
+        rng.lognormal(1.5, 1.0, n_rows),
+    ])
+
+
+@pytest.fixture(scope='session')
+def artifact():
+    """A small fitted classifier with 'Approved'/'Rejected' labels."""
+    rng = np.random.default_rng(1)
+    x = synthetic_features(2000)
+    y = np.where(0.2 * x[:, 1] - 1.5 * x[:, 0] + rng.logistic(size=len(x)) > 0, 'Approved', 'Rejected')
+    model = build_pipeline(max_iter=2000).fit(x, y)
+    return ModelArtifact(model, FEATURE_COLUMNS, {'model_version': 'test-model'})
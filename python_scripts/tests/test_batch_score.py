@@ -0,0 +1,117 @@
+import sqlite3
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from batch_score import INPUT_COLUMNS, NOT_SCORED, score_chunk, score_file
+from financial_ratios_calc import REASON_MISSING_INPUT, REASON_OK, REASON_ZERO_INTEREST
+from linear_scorer import LinearScorer
+from parallel_score import ParallelScorer
+from sector_benchmarks import SectorBenchmarkCache
+
+
+def applicants() -> pd.DataFrame:
+    rows = [
+        # revenue, ebit, interest, liabilities, equity, assets, benchmark
+        (1_000_000, 300_000, 50_000, 400_000, 500_000, 2_000_000, 10),
+        (1_000_000, 300_000, 50_000, np.nan, 500_000, 2_000_000, 10),
+        (np.nan, 300_000, 50_000, 400_000, 500_000, 2_000_000, 10),
+        (1_000_000, 300_000, 0, 400_000, 500_000, 2_000_000, 10),
+        (1_000_000, np.inf, 50_000, 400_000, 500_000, 2_000_000, 10),
+        (2_000_000, 100_000, 90_000, 4_000_000, 100_000, 5_000_000, 10),
+    ]
+    return pd.DataFrame(rows, columns=INPUT_COLUMNS)
+
+
+def test_rows_with_missing_inputs_are_not_scored(artifact):
+    result = score_chunk(applicants(), LinearScorer.from_artifact(artifact))
+
+    assert list(result['Loan_Status'][1:5]) == [NOT_SCORED] * 4
+    assert result['Approval_Probability'][1:5].isna().all()
+    for i in (1, 2, 4):
+        assert result['Reason_Code'][i] & REASON_MISSING_INPUT
+    assert result['Reason_Code'][3] == REASON_ZERO_INTEREST
+    assert (result['Reason_Code'][[0, 5]] == REASON_OK).all()
+    assert result['Loan_Status'][[0, 5]].isin(['Approved', 'Rejected']).all()
+    assert result['Approval_Probability'][[0, 5]].between(0, 1).all()
+
+
+@pytest.mark.parametrize('backend', ['decimal', 'float'])
+def test_batch_and_parallel_scoring_agree(artifact, backend):
+    chunk = applicants()
+    expected = score_chunk(chunk, LinearScorer.from_artifact(artifact), backend=backend)
+    with ParallelScorer(artifact, workers=2, backend=backend) as scorer:
+        result = scorer.score_chunk(chunk)
+
+    assert list(result['Loan_Status']) == list(expected['Loan_Status'])
+    assert list(result['Performance']) == list(expected['Performance'])
+    np.testing.assert_allclose(result['Approval_Probability'], expected['Approval_Probability'],
+                               rtol=1e-12, equal_nan=True)
+    np.testing.assert_array_equal(result['Reason_Code'], expected['Reason_Code'])
+
+
+def test_parallel_performance_uses_sector_benchmarks(artifact):
+    conn = sqlite3.connect(':memory:')
+    conn.execute("CREATE TABLE sectors (sector_id INTEGER, net_pm REAL, asset_turnover REAL, debt_to_eq REAL)")
+    conn.executemany("INSERT INTO sectors VALUES (?, ?, 1, 1)", [(0, 5.0), (1, 50.0)])
+    benchmarks = SectorBenchmarkCache(conn)
+    chunk = applicants().drop(columns='benchmark').assign(sector_id=[0, 1, 0, 1, 0, 7])
+
+    expected = score_chunk(chunk, LinearScorer.from_artifact(artifact), benchmarks=benchmarks)
+    with ParallelScorer(artifact, workers=3) as scorer:
+        result = scorer.score_chunk(chunk, benchmarks)
+
+    assert list(result['Performance']) == list(expected['Performance'])
+    assert list(result['sector_id']) == [0, 1, 0, 1, 0, 7]
+
+
+def test_score_file_marks_blank_cells(artifact, tmp_path):
+    source = tmp_path / 'applicants.csv'
+    applicants().iloc[[0, 1]].to_csv(source, index=False, na_rep='')
+    output = tmp_path / 'scored.csv'
+
+    rows = score_file(str(source), str(output), LinearScorer.from_artifact(artifact))
+
+    scored = pd.read_csv(output)
+    assert rows == 2
+    assert scored['Loan_Status'][1] == NOT_SCORED
+    assert np.isnan(scored['Approval_Probability'][1])
+
+
+@pytest.mark.parametrize('backend', ['decimal', 'fixed', 'float'])
+def test_missing_input_flag_on_every_backend(artifact, backend):
+    result = score_chunk(applicants(), LinearScorer.from_artifact(artifact), backend=backend)
+    assert result['Loan_Status'][1] == NOT_SCORED
+    assert result['Reason_Code'][1] & REASON_MISSING_INPUT
+
+
+def test_decimal_results_written_to_parquet_exactly(artifact, tmp_path):
+    source = tmp_path / 'applicants.csv'
+    applicants().iloc[[0, 3, 5]].to_csv(source, index=False)
+    output = tmp_path / 'scored.parquet'
+
+    # One row per chunk: the zero-interest row has no Interest_Coverage_Ratio at all
+    score_file(str(source), str(output), LinearScorer.from_artifact(artifact), chunksize=1, backend='decimal')
+
+    scored = pd.read_parquet(output)
+    assert list(scored['Net_Profit']) == ['187500.000', '225000.000', '7500.000']
+    assert pd.isna(scored['Interest_Coverage_Ratio'][1])
+
+
+def test_parquet_output_with_a_blank_cell_in_a_later_chunk(artifact, tmp_path):
+    source = tmp_path / 'applicants.csv'
+    frame = applicants().iloc[[0, 1, 5]].astype({'revenue': 'Int64', 'liabilities': 'Int64'})
+    frame['company_id'] = pd.array([7, None, 9], dtype='Int64')
+    frame.to_csv(source, index=False, na_rep='')
+    output = tmp_path / 'scored.parquet'
+
+    # One row per chunk: the first is complete, the second has blank liabilities and company_id
+    rows = score_file(str(source), str(output), LinearScorer.from_artifact(artifact), chunksize=1,
+                      extra_columns=['company_id'])
+
+    scored = pd.read_parquet(output)
+    assert rows == 3
+    assert scored['liabilities'].dtype == np.float64
+    assert list(scored['Loan_Status'] == NOT_SCORED) == [False, True, False]
+    assert scored['company_id'].isna().tolist() == [False, True, False]
@@ -0,0 +1,31 @@
+import pytest
+
+from benchmark_suite import compare, main
+
+
+def document(quick=False, rows=1000, value=100.0):
+    return {'quick': quick, 'metrics': {'ratios.batch_float': {
+        'name': 'ratios.batch_float', 'value': value, 'unit': 'rows/s', 'higher_is_better': True,
+        'params': {'rows': rows}}}}
+
+
+def test_compare_flags_regressions():
+    [record] = compare(document(value=100.0), document(value=50.0), threshold=0.25)
+    assert record['regressed'] and record['change'] == pytest.approx(-0.5)
+
+
+def test_compare_refuses_quick_against_full():
+    with pytest.raises(ValueError, match='quick'):
+        compare(document(quick=False), document(quick=True))
+
+
+def test_compare_refuses_different_params():
+    with pytest.raises(ValueError, match='ratios.batch_float'):
+        compare(document(rows=1000), document(rows=2000))
+
+
+def test_main_rejects_mismatched_baseline_before_running(tmp_path, capsys):
+    baseline = tmp_path / 'bench.json'
+    baseline.write_text('{"quick": false, "metrics": {}}')
+    assert main(['--quick', '--compare', str(baseline)]) == 1
+    assert 'full run' in capsys.readouterr().err
@@ -0,0 +1,131 @@
+import json
+
+import pytest
+
+import instrumentation
+
+
+@pytest.fixture(autouse=True)
+def clean_metrics():
+    was_enabled = instrumentation.enabled()
+    instrumentation.reset()
+    yield
+    instrumentation.reset()
+    if was_enabled:
+        instrumentation.enable()
+    else:
+        instrumentation.disable()
+
+
+def test_disabled_instrumentation_records_nothing():
+    instrumentation.disable()
+    with instrumentation.stage('batch.ratios'):
+        pass
+    assert instrumentation.stage('other') is instrumentation.stage('batch.ratios')
+    instrumentation.count('ratio_undefined', 3, reason='zero_equity')
+    with pytest.raises(KeyError):
+        with instrumentation.stage('failing'):
+            raise KeyError('revenue')
+
+    @instrumentation.timed('decorated')
+    def double(x):
+        return 2 * x
+
+    assert double(2) == 4
+    assert list(instrumentation.timed_iter('reader', [1, 2])) == [1, 2]
+    state = instrumentation.snapshot()
+    assert state['enabled'] is False
+    assert state['stages'] == {} and state['counters'] == []
+
+
+def test_stages_record_calls_times_and_errors():
+    instrumentation.enable()
+    for _ in range(3):
+        with instrumentation.stage('batch.ratios'):
+            pass
+    for error in (KeyError('revenue'), ValueError('bad'), ValueError('worse')):
+        with pytest.raises(type(error)):
+            with instrumentation.stage('batch.predict'):
+                raise error
+
+    @instrumentation.timed('decorated')
+    def double(x):
+        return 2 * x
+
+    assert double(4) == 8
+    assert list(instrumentation.timed_iter('reader', 'ab')) == ['a', 'b']
+
+    state = instrumentation.snapshot()
+    assert {name: record['calls'] for name, record in state['stages'].items()} == {
+        'batch.predict': 3, 'batch.ratios': 3, 'decorated': 1, 'reader': 3}
+    ratios = state['stages']['batch.ratios']
+    assert 0 <= ratios['max_seconds'] <= ratios['seconds']
+    assert ratios['mean_seconds'] == pytest.approx(ratios['seconds'] / 3)
+    assert state['counters'] == [
+        {'name': 'stage_errors', 'labels': {'stage': 'batch.predict', 'type': 'KeyError'}, 'value': 1},
+        {'name': 'stage_errors', 'labels': {'stage': 'batch.predict', 'type': 'ValueError'}, 'value': 2},
+    ]
+
+
+def test_counters_add_up_per_label_set():
+    instrumentation.enable()
+    instrumentation.count('ratio_undefined', 2, reason='zero_equity')
+    instrumentation.count('ratio_undefined', 3, reason='zero_equity')
+    instrumentation.count('ratio_undefined', reason='zero_assets')
+    instrumentation.count('rows')
+    assert instrumentation.snapshot()['counters'] == [
+        {'name': 'ratio_undefined', 'labels': {'reason': 'zero_assets'}, 'value': 1},
+        {'name': 'ratio_undefined', 'labels': {'reason': 'zero_equity'}, 'value': 5},
+        {'name': 'rows', 'labels': {}, 'value': 1},
+    ]
+
+
+STATE = {
+    'created_at': '2026-01-01T00:00:00+00:00',
+    'enabled': True,
+    'stages': {
+        'batch.ratios': {'calls': 4, 'seconds': 0.5, 'max_seconds': 0.25, 'mean_seconds': 0.125},
+    },
+    'counters': [
+        {'name': 'ratio_undefined', 'labels': {'reason': 'zero_equity'}, 'value': 12},
+        {'name': 'stage_errors', 'labels': {'stage': 'batch.ratios', 'type': 'ValueError'}, 'value': 1},
+        {'name': 'rows', 'labels': {'file': 'a "b"\\c\nd'}, 'value': 3},
+    ],
+}
+
+
+def test_prometheus_text_format():
+    assert instrumentation.prometheus_text(STATE) == (
+        '# HELP matchifi_stage_seconds Wall-clock time spent in each pipeline stage.\n'
+        '# TYPE matchifi_stage_seconds summary\n'
+        'matchifi_stage_seconds_count{stage="batch.ratios"} 4\n'
+        'matchifi_stage_seconds_sum{stage="batch.ratios"} 0.5\n'
+        '# HELP matchifi_stage_seconds_max Longest single call of each pipeline stage.\n'
+        '# TYPE matchifi_stage_seconds_max gauge\n'
+        'matchifi_stage_seconds_max{stage="batch.ratios"} 0.25\n'
+        '# TYPE matchifi_ratio_undefined_total counter\n'
+        'matchifi_ratio_undefined_total{reason="zero_equity"} 12\n'
+        '# TYPE matchifi_stage_errors_total counter\n'
+        'matchifi_stage_errors_total{stage="batch.ratios",type="ValueError"} 1\n'
+        '# TYPE matchifi_rows_total counter\n'
+        'matchifi_rows_total{file="a \\"b\\"\\\\c\\nd"} 3\n'
+    )
+
+
+def test_metrics_dir_exports(tmp_path):
+    instrumentation.enable()
+    with instrumentation.stage('service.predict'):
+        pass
+    instrumentation.count('requests', 2, endpoint='/score')
+    instrumentation.write_metrics_dir(str(tmp_path))
+
+    exported = json.loads((tmp_path / 'matchifi.json').read_text())
+    assert sorted(exported) == ['counters', 'created_at', 'enabled', 'stages']
+    assert exported['enabled'] is True
+    assert sorted(exported['stages']['service.predict']) == ['calls', 'max_seconds', 'mean_seconds', 'seconds']
+    assert exported['counters'] == [{'name': 'requests', 'labels': {'endpoint': '/score'}, 'value': 2}]
+
+    text = (tmp_path / 'matchifi.prom').read_text()
+    assert text == instrumentation.prometheus_text(exported)
+    assert 'matchifi_requests_total{endpoint="/score"} 2\n' in text
+    assert sorted(path.name for path in tmp_path.iterdir()) == ['matchifi.json', 'matchifi.prom']
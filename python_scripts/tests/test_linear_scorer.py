@@ -0,0 +1,84 @@
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from conftest import synthetic_features
+from linear_scorer import LinearScorer
+from model_artifact import FEATURE_COLUMNS
+from ratio_preprocessing import build_pipeline
+
+SCRIPTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_import_does_not_load_sklearn_or_scipy():
+    code = ("import sys, linear_scorer; "
+            "print(sorted(m for m in ('scipy', 'sklearn', 'pandas') if m in sys.modules))")
+    output = subprocess.run([sys.executable, '-c', code], cwd=SCRIPTS_DIR, capture_output=True, text=True,
+                            check=True).stdout
+    assert output.strip() == '[]'
+
+
+def test_unknown_pipeline_step_is_rejected(artifact):
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import MinMaxScaler
+
+    classifier = artifact.model.steps[-1][1]
+    model = Pipeline([('scale', MinMaxScaler()), ('model', classifier)])
+    with pytest.raises(ValueError, match='MinMaxScaler'):
+        LinearScorer.from_model(model, artifact.feature_names)
+
+
+# (labels for rejected, approved): sklearn sorts classes_, so 'Approved' comes first and 1 last
+CLASS_ORDERS = {'approve_first': ('Rejected', 'Approved'), 'approve_last': (0, 1)}
+
+
+def fitted_model(labels, preprocess: bool):
+    rng = np.random.default_rng(5)
+    x = synthetic_features(1500, seed=2)
+    approved = 0.2 * x[:, 1] - 1.5 * x[:, 0] + rng.logistic(size=len(x)) > 0
+    y = np.where(approved, labels[1], labels[0])
+    return build_pipeline(C=1.0, max_iter=5000, preprocess=preprocess).fit(x, y), x
+
+
+@pytest.mark.parametrize('preprocess', [True, False], ids=['pipeline', 'bare'])
+@pytest.mark.parametrize('order', CLASS_ORDERS)
+def test_check_agreement_with_sklearn(order, preprocess):
+    labels = CLASS_ORDERS[order]
+    model, x = fitted_model(labels, preprocess)
+    scorer = LinearScorer.from_model(model, FEATURE_COLUMNS)
+
+    assert scorer.approve_label == labels[1]
+    assert scorer.approve_index == (0 if order == 'approve_first' else 1)
+    assert scorer.has_transform == preprocess
+    assert scorer.check_agreement(model, x) <= 1e-12
+    np.testing.assert_array_equal(scorer.labels_from_probability(scorer.score_batch(x)[0]), model.predict(x))
+
+
+@pytest.mark.parametrize('order', CLASS_ORDERS)
+def test_score_one_and_score_batch_into_a_buffer(order):
+    model, x = fitted_model(CLASS_ORDERS[order], preprocess=True)
+    scorer = LinearScorer.from_model(model, FEATURE_COLUMNS)
+    expected = model.predict_proba(x)[:, scorer.approve_index]
+
+    out = np.full(len(x), np.nan)
+    probabilities, labels = scorer.score_batch(x, out=out)
+    assert probabilities is out
+    np.testing.assert_allclose(out, expected, rtol=0, atol=1e-12)
+    np.testing.assert_array_equal(labels, model.predict(x))
+
+    for row, probability, label in zip(x[:50], expected, labels):
+        one = scorer.score_one(row.tolist())
+        assert one[0] == pytest.approx(probability, abs=1e-12)
+        assert one[1] == label
+        assert scorer.score_mapping(dict(zip(FEATURE_COLUMNS, row))) == one
+
+
+def test_check_agreement_reports_a_mismatch():
+    model, x = fitted_model(CLASS_ORDERS['approve_first'], preprocess=True)
+    scorer = LinearScorer.from_model(model, FEATURE_COLUMNS)
+    scorer.intercept += 0.5
+    with pytest.raises(ValueError, match='disagrees'):
+        scorer.check_agreement(model, x)
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from loan_matching import LoanProduct, LoanProductIndex
+
+
+@pytest.fixture(scope='module')
+def index():
+    rng = np.random.default_rng(4)
+    products = []
+    for i in range(1, 41):
+        low = float(rng.integers(1, 50) * 10_000)
+        term = int(rng.integers(6, 60))
+        products.append(LoanProduct(
+            i, f"product {i}", low, low * float(rng.uniform(2, 10)), term, term + int(rng.integers(6, 120)),
+            float(rng.uniform(5, 25)) if rng.random() < 0.9 else None,
+            int(rng.integers(1, 6)) if rng.random() < 0.6 else None,
+            int(rng.integers(500, 800)) if rng.random() < 0.7 else None,
+        ))
+    return LoanProductIndex(products)
+
+
+def test_scalar_and_batch_matching_agree(index):
+    rng = np.random.default_rng(5)
+    n = 500
+    sectors = rng.integers(1, 7, n).astype(np.float64)
+    amounts = rng.uniform(0, 3_000_000, n)
+    terms = rng.integers(1, 200, n).astype(np.float64)
+    scores = rng.integers(400, 850, n).astype(np.float64)
+    for values in (sectors, amounts, terms, scores):
+        values[rng.random(n) < 0.1] = np.nan
+    amounts[:3] = [np.inf, -np.inf, 250_000]
+    terms[3] = np.inf
+
+    batch = index.match_batch(sectors, amounts, terms, scores)
+    scalar = [index.eligible_mask(*row) for row in zip(sectors, amounts, terms, scores)]
+    assert list(batch) == scalar
+    assert any(scalar)
+
+
+@pytest.mark.parametrize('amount, term', [(np.nan, 24), (None, 24), (np.inf, 24), (250_000, np.nan), (250_000, None)])
+def test_missing_amount_or_term_matches_nothing(index, amount, term):
+    assert index.eligible_mask(None, amount, term) == 0
+    assert index.match(None, amount, term) == []
+
+
+def test_missing_sector_and_score_mean_none_given(index):
+    assert index.eligible_mask(np.nan, 250_000, 24, np.nan) == index.eligible_mask(None, 250_000, 24, None)
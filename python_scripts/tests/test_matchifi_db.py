@@ -0,0 +1,21 @@
+import numpy as np
+
+import matchifi_db
+from model_artifact import FEATURE_COLUMNS
+
+
+def test_features_are_in_model_units():
+    conn = matchifi_db.connect(':memory:')
+    matchifi_db.populate_synthetic(conn, 500, seed=3)
+    stored = np.array(conn.execute(
+        "SELECT cd.return_on_assets, cd.return_on_equity FROM loan_applications AS la "
+        "JOIN client_detail AS cd ON cd.company_id = la.company_id ORDER BY la.application_id"
+    ).fetchall(), dtype=np.float64)
+
+    features = np.concatenate([chunk.features for chunk in matchifi_db.iter_feature_chunks(conn, 128)])
+    roa = features[:, FEATURE_COLUMNS.index('Return_on_Assets')]
+    roe = features[:, FEATURE_COLUMNS.index('Return_on_Equity')]
+    # Stored in percent, read as fractions like FinancialRatios computes them
+    np.testing.assert_allclose(roa, stored[:, 0] / 100)
+    np.testing.assert_allclose(roe, stored[:, 1] / 100)
+    assert np.abs(roa).max() < 1
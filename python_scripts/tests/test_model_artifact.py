@@ -0,0 +1,68 @@
+import joblib
+import numpy as np
+import pytest
+
+from conftest import synthetic_features
+from model_artifact import (
+    ARTIFACT_FORMAT_VERSION, FEATURE_COLUMNS, ArtifactLoader, ModelArtifact, load_artifact, save_artifact,
+)
+
+
+def test_save_and_load_round_trip(artifact, tmp_path):
+    path = str(tmp_path / 'model.joblib')
+    saved = save_artifact(artifact.model, FEATURE_COLUMNS[::-1], path, training_rows=2000)
+    loaded = load_artifact(path)
+
+    assert loaded.version == saved.version and saved.version != 'unknown'
+    assert loaded.feature_names == FEATURE_COLUMNS[::-1]
+    assert loaded.metadata['training_rows'] == 2000 and 'trained_at' in loaded.metadata
+    x = synthetic_features(50, seed=3)
+    np.testing.assert_array_equal(loaded.model.predict_proba(x), artifact.model.predict_proba(x))
+    assert [p.name for p in tmp_path.iterdir()] == ['model.joblib']
+
+
+def test_legacy_bare_model_is_wrapped(artifact, tmp_path):
+    path = str(tmp_path / 'legacy.joblib')
+    joblib.dump(artifact.model, path)
+    loaded = load_artifact(path)
+
+    assert loaded.version == 'legacy'
+    assert loaded.feature_names == FEATURE_COLUMNS
+    assert list(loaded.model.classes_) == list(artifact.model.classes_)
+
+
+@pytest.mark.parametrize('format_version', [ARTIFACT_FORMAT_VERSION + 1, None])
+def test_unknown_format_version_is_rejected(artifact, tmp_path, format_version):
+    path = str(tmp_path / 'future.joblib')
+    joblib.dump({'format_version': format_version, 'model': artifact.model,
+                 'feature_names': FEATURE_COLUMNS, 'metadata': {}}, path)
+    with pytest.raises(ValueError, match='Unsupported model artifact format'):
+        load_artifact(path)
+
+
+def test_loader_is_lazy_and_reloads_a_replaced_file(artifact, tmp_path):
+    path = str(tmp_path / 'model.joblib')
+    loader = ArtifactLoader(path)
+    with pytest.raises(OSError):
+        loader.get()
+
+    first = save_artifact(artifact.model, FEATURE_COLUMNS, path, model_version='v1')
+    held = loader.get()
+    assert held.version == 'v1'
+    assert loader.get() is held
+    assert loader.reload_if_changed() is False
+
+    save_artifact(artifact.model, FEATURE_COLUMNS, path, model_version='v2')
+    assert loader.reload_if_changed() is True
+    assert loader.get().version == 'v2'
+    assert held.version == first.version == 'v1'
+    assert loader.reload_if_changed() is False
+
+
+def test_swap_replaces_the_held_artifact(artifact, tmp_path):
+    path = str(tmp_path / 'model.joblib')
+    save_artifact(artifact.model, FEATURE_COLUMNS, path, model_version='v1')
+    loader = ArtifactLoader(path)
+    loader.get()
+    loader.swap(ModelArtifact(artifact.model, FEATURE_COLUMNS, {'model_version': 'swapped'}))
+    assert loader.get().version == 'swapped'
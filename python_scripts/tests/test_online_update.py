@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+from sklearn.linear_model import LogisticRegression
+
+import matchifi_db
+from conftest import synthetic_features
+from model_artifact import FEATURE_COLUMNS, ModelArtifact
+from online_update import label_targets, update_model
+
+
+@pytest.mark.parametrize('classes, approved, rejected', [
+    (['Approved', 'Rejected'], 'Approved', 'Rejected'),
+    (['Rejected', 'Approved'], 'Approved', 'Rejected'),
+    ([0, 1], 1, 0),
+])
+def test_label_targets(classes, approved, rejected):
+    targets, known = label_targets(np.array(['Approved', ' rejected', 'Pending', None], dtype=object),
+                                   np.array(classes))
+    assert known.tolist() == [True, True, False, False]
+    assert targets[0] == approved and targets[1] == rejected
+
+
+def test_update_maps_database_labels_onto_numeric_classes():
+    x = synthetic_features(500)
+    y = (x[:, 1] > 10).astype(int)  # 1 means approved
+    artifact = ModelArtifact(LogisticRegression().fit(x, y), FEATURE_COLUMNS, {'model_version': 'numeric'})
+    conn = matchifi_db.connect(':memory:')
+    matchifi_db.populate_synthetic(conn, 300, seed=2)
+
+    model, watermark, rows, skipped = update_model(conn, artifact, chunksize=100)
+    assert rows == 300 and skipped == 0
+    assert watermark['application_id'] == 300
+    assert model.classes_.tolist() == [0, 1]
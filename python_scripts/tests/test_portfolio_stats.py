@@ -0,0 +1,133 @@
+import shutil
+
+import numpy as np
+import pytest
+
+import matchifi_db
+from portfolio_stats import (
+    DEFAULT_RELATIVE_ACCURACY, PortfolioStats, QuantileSketch, RunningMoments, aggregate, main,
+)
+
+
+@pytest.fixture(scope='module')
+def database(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp('portfolio') / 'matchifi.db')
+    conn = matchifi_db.connect(path)
+    matchifi_db.populate_synthetic(conn, 3000, n_sectors=5, n_products=7, seed=4)
+    conn.close()
+    return path
+
+
+def read_features(database, after=0):
+    conn = matchifi_db.connect(database)
+    try:
+        chunks = list(matchifi_db.iter_feature_chunks(conn, after_application_id=after))
+    finally:
+        conn.close()
+    return (np.concatenate([chunk.features for chunk in chunks]),
+            np.concatenate([chunk.sector_id for chunk in chunks]),
+            np.concatenate([chunk.loan_status for chunk in chunks]))
+
+
+def assert_same_stats(actual: PortfolioStats, expected: PortfolioStats):
+    assert actual.last_application_id == expected.last_application_id
+    assert sorted(actual.by_sector) == sorted(expected.by_sector)
+    assert sorted(actual.by_product) == sorted(expected.by_product)
+    pairs = [(actual.overall, expected.overall)]
+    pairs += [(actual.by_sector[key], expected.by_sector[key]) for key in expected.by_sector]
+    pairs += [(actual.by_product[key], expected.by_product[key]) for key in expected.by_product]
+    for mine, theirs in pairs:
+        assert (mine.applications, mine.approved) == (theirs.applications, theirs.approved)
+        np.testing.assert_array_equal(mine.moments.count, theirs.moments.count)
+        np.testing.assert_allclose(mine.moments.mean, theirs.moments.mean, rtol=1e-12)
+        np.testing.assert_allclose(mine.moments.m2, theirs.moments.m2, rtol=1e-9)
+        np.testing.assert_array_equal(mine.moments.min, theirs.moments.min)
+        np.testing.assert_array_equal(mine.moments.max, theirs.moments.max)
+        for sketch, other in zip(mine.sketches, theirs.sketches):
+            assert sketch.to_dict() == other.to_dict()
+
+
+def test_parallel_shards_match_a_single_pass(database):
+    single = aggregate(database, workers=1, chunksize=256)
+    assert_same_stats(aggregate(database, workers=3, chunksize=256), single)
+    assert single.overall.applications == 3000
+    assert single.last_application_id == 3000
+
+
+def test_incremental_state_update_matches_a_full_pass(database, tmp_path):
+    # The first run sees the first 1200 applications, the second run the whole table
+    partial = str(tmp_path / 'partial.db')
+    shutil.copy(database, partial)
+    conn = matchifi_db.connect(partial)
+    conn.execute("DELETE FROM loan_applications WHERE application_id > 1200")
+    conn.commit()
+    conn.close()
+    state = str(tmp_path / 'portfolio.json')
+
+    assert main([partial, '--state', state]) == 0
+    assert PortfolioStats.load(state).last_application_id == 1200
+    assert main([database, '--state', state, '--workers', '2']) == 0
+
+    assert_same_stats(PortfolioStats.load(state), aggregate(database))
+
+
+def test_group_counts_and_moments_match_numpy(database):
+    stats = aggregate(database, chunksize=500)
+    features, sector_id, loan_status = read_features(database)
+
+    assert stats.overall.approved == int(np.count_nonzero(loan_status == 'Approved'))
+    for key, group in stats.by_sector.items():
+        rows = features[sector_id == key]
+        assert group.applications == len(rows)
+        np.testing.assert_allclose(group.moments.mean, rows.mean(axis=0), rtol=1e-10)
+        np.testing.assert_allclose(group.moments.variance(), rows.var(axis=0, ddof=1), rtol=1e-9)
+        np.testing.assert_array_equal(group.moments.min, rows.min(axis=0))
+        np.testing.assert_array_equal(group.moments.max, rows.max(axis=0))
+    assert sum(group.applications for group in stats.by_sector.values()) == len(features)
+
+
+def test_running_moments_merge_skips_nans():
+    rng = np.random.default_rng(0)
+    values = rng.normal(3, 2, (1000, 2))
+    values[rng.random(values.shape) < 0.1] = np.nan
+    moments = RunningMoments(2)
+    moments.update(values[:10])
+    other = RunningMoments(2)
+    for part in np.array_split(values[10:], 7):
+        other.update(part)
+    moments.merge(other)
+
+    np.testing.assert_array_equal(moments.count, (~np.isnan(values)).sum(axis=0))
+    np.testing.assert_allclose(moments.mean, np.nanmean(values, axis=0), rtol=1e-12)
+    np.testing.assert_allclose(moments.variance(), np.nanvar(values, axis=0, ddof=1), rtol=1e-10)
+    np.testing.assert_array_equal(moments.min, np.nanmin(values, axis=0))
+
+
+def test_sketch_buckets_hold_every_value_once():
+    values = np.array([-3.0, -3.0, 0.0, 1e-15, 1.0, 2.5, 2.5, np.nan, np.inf])
+    sketch = QuantileSketch()
+    sketch.update(values)
+
+    assert sketch.count == 7
+    assert sketch.zero_count == 2
+    assert sum(sketch.negative.values()) == 2
+    assert sum(sketch.positive.values()) == 3
+    key = int(np.ceil(np.log(2.5) / np.log(sketch.gamma)))
+    assert sketch.positive[key] == 2
+    assert sketch.gamma ** (key - 1) < 2.5 <= sketch.gamma ** key
+    assert QuantileSketch.from_dict(sketch.to_dict()).to_dict() == sketch.to_dict()
+
+
+def test_quantiles_are_within_the_relative_accuracy(database):
+    stats = aggregate(database, chunksize=700)
+    features, _, _ = read_features(database)
+    for j, sketch in enumerate(stats.overall.sketches):
+        ordered = np.sort(features[:, j])
+        for q in (0.0, 0.1, 0.5, 0.9, 0.99, 1.0):
+            exact = ordered[int(q * (len(ordered) - 1))]
+            assert abs(sketch.quantile(q) - exact) <= DEFAULT_RELATIVE_ACCURACY * abs(exact) + 1e-12
+
+
+def test_sketches_of_different_accuracy_do_not_merge():
+    with pytest.raises(ValueError, match='relative accuracy'):
+        QuantileSketch(0.01).merge(QuantileSketch(0.02))
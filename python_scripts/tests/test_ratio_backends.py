@@ -0,0 +1,61 @@
+from decimal import Decimal
+
+import numpy as np
+import pytest
+
+from financial_ratios_calc import BACKENDS, REASON_MISSING_INPUT, REASON_ZERO_EQUITY, FinancialRatios
+from ratio_backend_check import AMOUNT_COLUMNS, agreement, generate_amounts, reference_values
+
+
+@pytest.fixture(scope='module')
+def records():
+    amounts = generate_amounts(3000, seed=5)
+    return agreement(amounts, reference_values(amounts))
+
+
+def test_decimal_backend_matches_the_scalar_methods(records):
+    for record in records:
+        if record['backend'] == 'decimal':
+            assert record['mismatches'] == 0, record
+            assert record['max_rel_error'] == 0, record
+
+
+def test_fixed_backend_agrees_at_display_precision(records):
+    for record in records:
+        if record['backend'] == 'fixed':
+            assert record['agreement'] == 1.0, record
+
+
+def test_every_backend_and_column_is_checked(records):
+    assert {(r['backend'], r['column']) for r in records} == {
+        (backend, column) for backend in BACKENDS
+        for column in ('Debt_to_Equity', 'Profit_Margin', 'Return_on_Assets', 'Return_on_Equity',
+                       'Interest_Coverage_Ratio', 'EBT', 'Net_Profit')}
+
+
+def test_decimal_backend_keeps_decimals():
+    amounts = generate_amounts(200, seed=6)
+    reference = reference_values(amounts)
+    results = FinancialRatios.calculate_ratio_arrays(*(amounts[name] / 100.0 for name in AMOUNT_COLUMNS),
+                                                     backend='decimal')
+    assert results['Net_Profit'].dtype == object
+    assert list(results['Net_Profit']) == reference['Net_Profit']
+    assert list(results['EBT']) == reference['EBT']
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_infinite_inputs_are_flagged(backend):
+    inf = float('inf')
+    results = FinancialRatios.calculate_ratio_arrays(
+        [inf, 100], [inf, 0], [1000, 1000], [inf, 50], [inf, 10], [500, 500], backend=backend)
+    assert results['Reason_Code'].tolist() == [REASON_MISSING_INPUT, REASON_ZERO_EQUITY]
+    ebt = np.asarray(results['EBT'], dtype=np.float64)
+    assert np.isnan(ebt[0]) and ebt[1] == 40
+
+
+def test_decimal_backend_reads_none_as_missing():
+    results = FinancialRatios.calculate_ratio_arrays(
+        [None, 1], [2, 2], [3, 3], [Decimal('10'), Decimal('10')], [1, 1], [100, 100], backend='decimal')
+    assert results['Reason_Code'].tolist() == [REASON_MISSING_INPUT, 0]
+    assert results['Debt_to_Equity'][0] is None
+    assert results['Debt_to_Equity'][1] == Decimal('0.5')
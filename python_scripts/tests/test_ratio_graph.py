@@ -0,0 +1,92 @@
+from decimal import Decimal
+
+import numpy as np
+import pytest
+
+from financial_ratios_calc import BACKENDS, FinancialRatios
+from ratio_backend_check import AMOUNT_COLUMNS, DISPLAY_PRECISION, generate_amounts
+from ratio_graph import RATIO_NODES, RatioGraph, RatioNode
+
+COMPANY = dict(revenue=Decimal('2000'), ebit=Decimal('500'), interest=Decimal('50'),
+               liabilities=Decimal('800'), equity=Decimal('1000'), assets=Decimal('4000'), benchmark=Decimal('10'))
+
+
+def counting_graph(calls: dict) -> RatioGraph:
+    """RATIO_NODES with every compute wrapped to count its calls in calls[name]."""
+    def counted(node):
+        def compute(*args):
+            calls[node.name] = calls.get(node.name, 0) + 1
+            return node.compute(*args)
+        return compute
+    return RatioGraph([RatioNode(node.name, node.inputs, counted(node), node.label, node.column)
+                       for node in RATIO_NODES])
+
+
+def test_evaluation_is_lazy():
+    calls = {}
+    values = counting_graph(calls).evaluate(**COMPANY)
+    assert calls == {} and values.computed == []
+
+    assert values['profit_margin'] == Decimal('16.875')
+    assert values.computed == ['ebt', 'net_profit', 'profit_margin']
+    assert 'roa' not in values and 'debt_to_equity' not in values
+
+
+def test_each_node_is_computed_once():
+    calls = {}
+    values = counting_graph(calls).evaluate(**COMPANY)
+    values.materialize(['roa', 'roe', 'profit_margin', 'performance', 'roa'])
+    values.features(['Return_on_Assets', 'Net_Profit'])
+    assert calls == {'ebt': 1, 'net_profit': 1, 'roa': 1, 'roe': 1, 'profit_margin': 1, 'performance': 1}
+    assert len(values.computed) == len(set(values.computed))
+
+
+def test_errors_are_remembered_not_recomputed():
+    calls = {}
+    values = counting_graph(calls).evaluate(**dict(COMPANY, equity=Decimal('0')))
+    results = values.materialize(['roe', 'debt_to_equity', 'roe'])
+    assert all(isinstance(error, ValueError) for error in results.values())
+    with pytest.raises(ValueError):
+        values['roe']
+    assert calls['roe'] == 1 and calls['debt_to_equity'] == 1
+    assert values.get('roe', 'n/a') == 'n/a'
+
+
+def test_supplied_values_are_not_computed():
+    calls = {}
+    values = counting_graph(calls).evaluate(net_profit=Decimal('300'), revenue=Decimal('1500'))
+    assert values['profit_margin'] == Decimal('20')
+    assert calls == {'profit_margin': 1}
+    with pytest.raises(KeyError, match='ebit'):
+        values['ebt']
+
+
+def test_dependencies_are_in_evaluation_order():
+    assert RatioGraph().dependencies('performance') == ['ebt', 'net_profit', 'profit_margin', 'performance']
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_graph_matches_the_batch_api(backend):
+    amounts = generate_amounts(300, seed=8)
+    graph = RatioGraph()
+    inputs = [amounts[name] / 100.0 for name in AMOUNT_COLUMNS]
+    batch = FinancialRatios.calculate_ratio_arrays(*inputs, tax_rate=graph.tax_rate, backend=backend)
+
+    for i in range(300):
+        values = graph.evaluate(**{name: Decimal(int(amounts[name][i])).scaleb(-2) for name in AMOUNT_COLUMNS})
+        # Where EBIT - interest cancels, float keeps only its absolute error in EBT and what follows
+        cancelled = abs(values['ebt']) < Decimal('1e-6') * max(abs(values['ebit']), abs(values['interest']))
+        for column, (scale, places) in DISPLAY_PRECISION.items():
+            expected = values.get(graph.by_column[column])
+            actual = batch[column][i]
+            if backend == 'float' and cancelled and 'ebt' in graph.dependencies(graph.by_column[column]):
+                continue
+            if expected is None:
+                assert actual is None or np.isnan(actual), (column, i)
+            elif backend == 'decimal':
+                assert actual == expected, (column, i)
+            elif backend == 'fixed':
+                # Rounded to cents, so it agrees at display precision
+                assert format(actual * scale, f'.{places}f') == format(expected * scale, f'.{places}f'), (column, i)
+            else:
+                assert actual == pytest.approx(float(expected), rel=1e-9, abs=1e-9), (column, i)
@@ -0,0 +1,19 @@
+import warnings
+
+from ratio_preprocessing import build_pipeline, final_estimator
+
+
+def test_build_pipeline_sets_l1_ratio_without_deprecated_penalty():
+    with warnings.catch_warnings():
+        warnings.simplefilter('error', FutureWarning)
+        classifier = final_estimator(build_pipeline(C=1.0, l1_ratio=1.0, solver='liblinear'))
+    assert classifier.get_params()['l1_ratio'] == 1.0 or classifier.get_params()['penalty'] == 'l1'
+
+
+def test_build_pipeline_maps_penalty_names_onto_l1_ratio():
+    with warnings.catch_warnings():
+        warnings.simplefilter('error', FutureWarning)
+        l1 = final_estimator(build_pipeline(penalty='l1', solver='liblinear', preprocess=False))
+        l2 = final_estimator(build_pipeline(penalty='l2', preprocess=False))
+    assert l1.get_params()['l1_ratio'] == 1.0 or l1.get_params()['penalty'] == 'l1'
+    assert l2.get_params()['l1_ratio'] == 0.0 or l2.get_params()['penalty'] == 'l2'
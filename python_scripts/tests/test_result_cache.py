@@ -0,0 +1,145 @@
+import threading
+import time
+
+import result_cache
+from result_cache import MISSING, ResultCache, canonical_key
+
+
+def test_keys_normalize_numbers():
+    assert canonical_key('ratios', {'revenue': '1000.00'}) == canonical_key('ratios', {'revenue': 1e3})
+    assert canonical_key('prediction', {'x': 1}, 'v1') != canonical_key('prediction', {'x': 1}, 'v2')
+
+
+def test_writes_are_batched_and_persisted(tmp_path):
+    path = str(tmp_path / 'results.sqlite')
+    cache = ResultCache(path, flush_interval=3600)
+    cache.put('a', {'value': 1}, 'ratios')
+    assert cache.stats()['pending_writes'] == 1
+    cache.close()
+
+    reopened = ResultCache(path)
+    assert reopened.get('a') == {'value': 1}
+    assert reopened.stats()['disk_hits'] == 1
+    reopened.close()
+
+
+def test_other_model_versions_survive_in_the_store(tmp_path):
+    path = str(tmp_path / 'results.sqlite')
+    old, new = ResultCache(path), ResultCache(path)
+    old.get_or_compute('prediction', {'x': 1}, lambda: [0.9, 'Approved'], 'v1')
+    old.flush()
+    new.get_or_compute('prediction', {'x': 2}, lambda: [0.1, 'Rejected'], 'v2')
+    new.flush()
+
+    # The process still on v1 keeps its cached predictions
+    assert old.get_or_compute('prediction', {'x': 1}, lambda: None, 'v1') == [0.9, 'Approved']
+    fresh = ResultCache(path)
+    assert fresh.get(canonical_key('prediction', {'x': 1}, 'v1')) == [0.9, 'Approved']
+    for cache in (old, new, fresh):
+        cache.close()
+
+
+def test_store_is_pruned_by_age_and_size(tmp_path):
+    cache = ResultCache(str(tmp_path / 'results.sqlite'), max_entries=1, max_disk_entries=2, prune_interval=0)
+    for key in 'abc':
+        cache.put(key, key, 'ratios')
+        cache.flush()
+        time.sleep(0.01)
+    assert cache.get('a') is MISSING
+    assert cache.get('c') == 'c'
+
+    cache.max_age = 0
+    cache.put('d', 'd', 'ratios')
+    cache.flush()
+    cache._entries.clear()
+    assert cache.get('b') is MISSING
+    cache.close()
+
+
+def test_memory_only_by_default():
+    cache = ResultCache()
+    cache.put('a', 1, 'ratios')
+    assert cache.get('a') == 1 and cache.stats()['pending_writes'] == 0
+    cache.close()
+
+
+def test_expired_rows_are_pruned_on_the_prune_interval(tmp_path):
+    cache = ResultCache(str(tmp_path / 'results.sqlite'), max_entries=1, max_age=0, prune_interval=3600)
+    cache.put('a', 'a', 'ratios')
+    cache.put('b', 'b', 'ratios')
+    cache.flush()
+    cache._entries.clear()
+    assert cache.get('a') == 'a'
+
+    cache.prune_interval = 0
+    cache.put('c', 'c', 'ratios')
+    cache.flush()
+    cache._entries.clear()
+    assert cache.get('a') is MISSING
+    cache.close()
+
+
+def test_running_row_count_bounds_the_store(tmp_path):
+    path = str(tmp_path / 'results.sqlite')
+    cache = ResultCache(path, max_disk_entries=3, flush_interval=3600)
+    for i in range(5):
+        cache.put(str(i), i, 'ratios')
+        cache.flush()
+        time.sleep(0.01)
+    # Rewriting a key counts it again until the next recount
+    cache.put('4', 4, 'ratios')
+    cache.flush()
+    cache.close()
+
+    reopened = ResultCache(path, max_entries=1)
+    assert reopened._disk_rows == 3
+    assert [reopened.get(str(i)) for i in range(5)] == [MISSING, MISSING, 2, 3, 4]
+    reopened.close()
+
+
+def test_disk_lookups_do_not_block_memory_hits(tmp_path):
+    cache = ResultCache(str(tmp_path / 'results.sqlite'), max_entries=1)
+    cache.put('disk', 1, 'ratios')
+    cache.flush()
+    cache.put('memory', 2, 'ratios')
+
+    results = []
+    with cache._db_lock:
+        # A lookup that has to read the store waits for the connection ...
+        reader = threading.Thread(target=lambda: results.append(cache.get('disk')))
+        reader.start()
+        reader.join(0.1)
+        assert reader.is_alive()
+        # ... without holding up lookups and writes that stay in memory
+        assert cache.get('memory') == 2
+        cache.put('other', 3, 'ratios')
+    reader.join()
+    assert results == [1]
+    cache.close()
+
+
+def test_rows_being_flushed_are_still_found(tmp_path):
+    cache = ResultCache(str(tmp_path / 'results.sqlite'), max_entries=1, flush_interval=3600)
+    cache.put('a', 1, 'ratios')
+    with cache._db_lock:
+        flusher = threading.Thread(target=cache.flush)
+        flusher.start()
+        while not cache._in_flight:
+            time.sleep(0.001)
+        cache.put('b', 2, 'ratios')
+        assert cache.get('a') == 1
+    flusher.join()
+    cache.close()
+
+
+def test_default_cache_persists(tmp_path, monkeypatch):
+    path = str(tmp_path / 'cache' / 'results.sqlite')
+    monkeypatch.setattr(result_cache, 'DEFAULT_RESULT_CACHE_PATH', path)
+    monkeypatch.setattr(result_cache, '_default_cache', None)
+    cache = result_cache.get_result_cache()
+    assert cache.path == path
+    cache.put('a', 1, 'ratios')
+    cache.close()
+    reopened = ResultCache(path)
+    assert reopened.get('a') == 1
+    reopened.close()
@@ -0,0 +1,168 @@
+import asyncio
+import json
+import math
+
+import pytest
+
+from linear_scorer import LinearScorer
+from model_artifact import FEATURE_COLUMNS
+from result_cache import ResultCache
+from scoring_service import MicroBatcher, RequestError, ScoringService
+
+RAW = {'revenue': 1_000_000, 'ebit': 300_000, 'interest': 50_000,
+       'liabilities': 400_000, 'equity': 500_000, 'assets': 2_000_000}
+
+
+def run(service, coroutine_function):
+    async def main():
+        service.batcher.start()
+        try:
+            return await coroutine_function()
+        finally:
+            await service.batcher.stop()
+    return asyncio.run(main())
+
+
+def post(service, payload):
+    # One event loop per service: its batcher queue is bound to the loop that first uses it
+    return run(service, lambda: service.dispatch('POST', '/score', json.dumps(payload).encode()))
+
+
+def test_scores_ratios_and_raw_financials(artifact):
+    status, reply = post(ScoringService(artifact), dict(zip(FEATURE_COLUMNS, [1.0, 12.0, 0.05, 0.1, 6.0])))
+    assert status == 200 and 0 <= reply['probability'] <= 1
+    assert reply['status'] in ('Approved', 'Rejected')
+    assert reply['model_version'] == 'test-model'
+
+    status, reply = post(ScoringService(artifact), RAW)
+    assert status == 200 and math.isfinite(reply['probability'])
+
+
+@pytest.mark.parametrize('payload', [
+    dict(zip(FEATURE_COLUMNS, [float('nan'), 12.0, 0.05, 0.1, 6.0])),
+    dict(zip(FEATURE_COLUMNS, [1.0, float('inf'), 0.05, 0.1, 6.0])),
+    dict(RAW, liabilities=None),
+    dict(RAW, revenue=float('nan')),
+])
+def test_non_finite_inputs_are_rejected(artifact, payload):
+    service = ScoringService(artifact, result_cache=ResultCache())
+    with pytest.raises(RequestError) as error:
+        post(service, payload)
+    assert error.value.status == 422
+    assert service.result_cache.stats()['entries'] == 0
+
+
+def test_persistent_result_cache_survives_a_restart(artifact, tmp_path):
+    path = str(tmp_path / 'results.sqlite')
+    payload = dict(zip(FEATURE_COLUMNS, [1.0, 12.0, 0.05, 0.1, 6.0]))
+    first = ScoringService(artifact, result_cache=ResultCache(path))
+    _, expected = post(first, payload)
+    first.result_cache.close()
+
+    restarted = ScoringService(artifact, result_cache=ResultCache(path))
+    assert post(restarted, payload) == (200, expected)
+    assert restarted.result_cache.stats()['disk_hits'] == 1
+    assert restarted.batcher.batches == 0
+    restarted.result_cache.close()
+
+
+def test_zero_denominator_is_rejected(artifact):
+    with pytest.raises(RequestError) as error:
+        post(ScoringService(artifact), dict(RAW, interest=0))
+    assert error.value.status == 422
+
+
+def http_exchange(service, request: bytes) -> tuple:
+    async def exchange():
+        server = await asyncio.start_server(service.handle_connection, '127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(request)
+            await writer.drain()
+            response = await reader.read()
+            writer.close()
+        head, _, body = response.partition(b'\r\n\r\n')
+        return int(head.split()[1]), json.loads(body)
+    return run(service, exchange)
+
+
+def test_http_errors_have_specific_messages(artifact):
+    status, reply = http_exchange(
+        ScoringService(artifact), b"POST /score HTTP/1.1\r\nContent-Length: abc\r\nConnection: close\r\n\r\n")
+    assert status == 400 and reply['error'] == "Invalid Content-Length header."
+
+    body = json.dumps(dict(zip(FEATURE_COLUMNS, [float('nan')] * 5))).encode()
+    status, reply = http_exchange(
+        ScoringService(artifact), b"POST /score HTTP/1.1\r\nContent-Length: %d\r\nConnection: close\r\n\r\n%s" % (len(body), body))
+    assert status == 422 and 'finite' in reply['error']
+
+
+def run_batcher(batcher, coroutine_function):
+    async def main():
+        batcher.start()
+        try:
+            return await coroutine_function()
+        finally:
+            await batcher.stop()
+    return asyncio.run(main())
+
+
+def recording_scorer(artifact, batch_sizes: list) -> LinearScorer:
+    scorer = LinearScorer.from_artifact(artifact)
+    score_batch = scorer.score_batch
+
+    def record(X, out=None):
+        batch_sizes.append(len(X))
+        return score_batch(X, out=out)
+    scorer.score_batch = record
+    return scorer
+
+
+ROW = [1.0, 12.0, 0.05, 0.1, 6.0]
+
+
+def test_malformed_rows_fail_only_their_own_request(artifact):
+    batch_sizes = []
+    batcher = MicroBatcher(recording_scorer(artifact, batch_sizes), max_batch_size=16, max_wait=0.05)
+    rows = [ROW, ROW[:4], [1.0, float('nan'), 0.05, 0.1, 6.0], None, ['a', 'b', 'c', 'd', 'e'], ROW]
+
+    results = run_batcher(batcher, lambda: asyncio.gather(*(batcher.score(row) for row in rows),
+                                                          return_exceptions=True))
+
+    assert batch_sizes == [2]
+    assert results[0] == results[5] and 0 <= results[0][0] <= 1
+    for error in results[1:5]:
+        assert isinstance(error, ValueError) and 'Invalid applicant features' in str(error)
+    assert (batcher.batches, batcher.rows) == (1, 2)
+
+
+def test_concurrent_requests_are_coalesced_up_to_max_batch_size(artifact):
+    batch_sizes = []
+    batcher = MicroBatcher(recording_scorer(artifact, batch_sizes), max_batch_size=4, max_wait=0.05)
+    rows = [[1.0 + i, 12.0, 0.05, 0.1, 6.0] for i in range(10)]
+
+    results = run_batcher(batcher, lambda: asyncio.gather(*(batcher.score(row) for row in rows)))
+
+    assert batch_sizes == [4, 4, 2]
+    scorer = LinearScorer.from_artifact(artifact)
+    for row, (probability, label, _) in zip(rows, results):
+        assert (probability, label) == pytest.approx(scorer.score_one(row), abs=1e-12)
+
+
+def test_batches_wait_at_most_max_wait(artifact):
+    async def timed(batcher, n_rows):
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        await asyncio.gather(*(batcher.score(ROW) for _ in range(n_rows)))
+        return loop.time() - started
+
+    # A lone request is held for max_wait in case others arrive
+    batcher = MicroBatcher(LinearScorer.from_artifact(artifact), max_batch_size=8, max_wait=0.1)
+    elapsed = run_batcher(batcher, lambda: timed(batcher, 1))
+    assert 0.09 <= elapsed < 1.0
+
+    # A full batch is flushed at once rather than after max_wait
+    batcher = MicroBatcher(LinearScorer.from_artifact(artifact), max_batch_size=3, max_wait=30.0)
+    elapsed = run_batcher(batcher, lambda: timed(batcher, 3))
+    assert elapsed < 1.0 and batcher.batches == 1
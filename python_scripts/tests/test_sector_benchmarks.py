@@ -0,0 +1,68 @@
+import sqlite3
+import time
+
+import numpy as np
+import pytest
+
+from sector_benchmarks import SectorBenchmarkCache
+
+SECTORS = [(0, 5.0), (1, 12.5), (3, None)]
+
+
+def sectors_db(path=':memory:', rows=SECTORS) -> sqlite3.Connection:
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE sectors (sector_id INTEGER, net_pm REAL, asset_turnover REAL, debt_to_eq REAL)")
+    conn.executemany("INSERT INTO sectors VALUES (?, ?, 1.0, 1.0)", rows)
+    conn.commit()
+    return conn
+
+
+def test_unknown_sectors_gather_nan():
+    cache = SectorBenchmarkCache(sectors_db())
+    values = cache.gather([0, 1, 2, 3, 4, 99, np.nan, -1, -4, 1.5, np.inf])
+    np.testing.assert_array_equal(values[:2], [5.0, 12.5])
+    assert np.isnan(values[2:]).all()
+
+
+@pytest.mark.parametrize('bad_id', [-1, -3, 10 ** 12])
+def test_out_of_range_sector_ids_are_left_out(bad_id):
+    cache = SectorBenchmarkCache(sectors_db(rows=SECTORS + [(bad_id, 99.0)]), max_sector_id=1000)
+    table = cache.arrays()['net_pm']
+    assert cache.skipped == 1
+    assert len(table) == 4
+    # A negative id must not wrap around onto the last sector
+    assert np.isnan(cache.gather([3, bad_id])).all()
+
+
+def test_entries_expire_after_the_ttl():
+    conn = sectors_db()
+    cache = SectorBenchmarkCache(conn, ttl=0.05)
+    assert cache.gather([0])[0] == 5.0
+    conn.execute("UPDATE sectors SET net_pm = 7.0 WHERE sector_id = 0")
+    # Same connection: data_version does not change, only the TTL triggers the reload
+    assert cache.gather([0])[0] == 5.0 and cache.loads == 1
+    time.sleep(0.06)
+    assert cache.gather([0])[0] == 7.0 and cache.loads == 2
+
+
+def test_writes_by_another_connection_invalidate(tmp_path):
+    path = str(tmp_path / 'sectors.db')
+    sectors_db(path).close()
+    cache = SectorBenchmarkCache(sqlite3.connect(path), ttl=None)
+    assert cache.gather([1])[0] == 12.5
+    assert cache.gather([1])[0] == 12.5 and cache.loads == 1
+
+    writer = sqlite3.connect(path)
+    writer.execute("UPDATE sectors SET net_pm = 20.0 WHERE sector_id = 1")
+    writer.commit()
+    writer.close()
+    assert cache.gather([1])[0] == 20.0 and cache.loads == 2
+
+
+def test_invalidate_forces_a_reload():
+    conn = sectors_db()
+    cache = SectorBenchmarkCache(conn, ttl=None)
+    cache.arrays()
+    conn.execute("DELETE FROM sectors WHERE sector_id = 0")
+    cache.invalidate()
+    assert np.isnan(cache.gather([0])[0]) and cache.loads == 2
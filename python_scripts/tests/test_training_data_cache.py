@@ -0,0 +1,91 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+import training_data_cache
+from benchmark_suite import synthetic_loan_frame, write_loan_workbook
+from model_artifact import FEATURE_COLUMNS, TARGET_COLUMN
+from training_data_cache import CACHE_FORMAT_VERSION, MANIFEST_FILE, ensure_cache, file_sha256, load_columns
+
+
+@pytest.fixture
+def workbook(tmp_path):
+    path = str(tmp_path / 'Loan.xlsx')
+    write_loan_workbook(synthetic_loan_frame(40, seed=1), path)
+    return path
+
+
+@pytest.fixture
+def builds(monkeypatch):
+    """Counts the workbook parses (cache builds)."""
+    calls = []
+    build_cache = training_data_cache.build_cache
+
+    def counting(*args, **kwargs):
+        calls.append(args[1])
+        return build_cache(*args, **kwargs)
+    monkeypatch.setattr(training_data_cache, 'build_cache', counting)
+    return calls
+
+
+def test_cache_hit_memory_maps_read_only_columns(workbook, tmp_path, builds):
+    cache_dir = str(tmp_path / 'cache')
+    first = load_columns(workbook, cache_dir=cache_dir)
+    second = load_columns(workbook, [TARGET_COLUMN, 'Profit_Margin'], cache_dir)
+
+    assert len(builds) == 1
+    assert list(second) == [TARGET_COLUMN, 'Profit_Margin']
+    for array in second.values():
+        assert isinstance(array, np.memmap) and array.mode == 'r' and not array.flags.writeable
+    expected = synthetic_loan_frame(40, seed=1)
+    np.testing.assert_allclose(second['Profit_Margin'], expected['Profit_Margin'])
+    assert list(first[TARGET_COLUMN]) == list(expected[TARGET_COLUMN])
+    assert os.path.basename(ensure_cache(workbook, cache_dir)).startswith(file_sha256(workbook))
+
+
+def test_changed_workbook_content_rebuilds(workbook, tmp_path, builds):
+    cache_dir = str(tmp_path / 'cache')
+    before = ensure_cache(workbook, cache_dir)
+    write_loan_workbook(synthetic_loan_frame(60, seed=2), workbook)
+    after = ensure_cache(workbook, cache_dir)
+
+    assert before != after and len(builds) == 2
+    assert os.path.basename(after).startswith(file_sha256(workbook))
+    assert len(load_columns(workbook, ['Debt_to_Equity'], cache_dir)['Debt_to_Equity']) == 60
+
+
+def test_stale_format_version_rebuilds(workbook, tmp_path, builds):
+    cache_dir = str(tmp_path / 'cache')
+    cache_path = ensure_cache(workbook, cache_dir)
+    manifest_path = os.path.join(cache_path, MANIFEST_FILE)
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    with open(manifest_path, 'w') as f:
+        json.dump(dict(manifest, format_version=CACHE_FORMAT_VERSION - 1), f)
+
+    assert ensure_cache(workbook, cache_dir) == cache_path and len(builds) == 2
+    with open(manifest_path) as f:
+        assert json.load(f)['format_version'] == CACHE_FORMAT_VERSION
+
+
+@pytest.mark.parametrize('damage', ['truncate', 'delete'])
+def test_corrupt_column_file_rebuilds(workbook, tmp_path, builds, damage):
+    cache_dir = str(tmp_path / 'cache')
+    cache_path = ensure_cache(workbook, cache_dir)
+    column_path = os.path.join(cache_path, 'Return_on_Assets.npy')
+    if damage == 'truncate':
+        with open(column_path, 'r+b') as f:
+            f.truncate(os.path.getsize(column_path) // 2)
+    else:
+        os.remove(column_path)
+
+    columns = load_columns(workbook, FEATURE_COLUMNS, cache_dir)
+    assert len(builds) == 2
+    np.testing.assert_allclose(columns['Return_on_Assets'], synthetic_loan_frame(40, seed=1)['Return_on_Assets'])
+
+
+def test_unknown_column_is_rejected(workbook, tmp_path):
+    with pytest.raises(KeyError, match='Loan_Amount'):
+        load_columns(workbook, ['Loan_Amount'], str(tmp_path / 'cache'))
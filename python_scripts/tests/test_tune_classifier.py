@@ -0,0 +1,8 @@
+from tune_classifier import configurations
+
+
+def test_configurations_follow_solver_support():
+    valid, skipped = configurations(['lbfgs', 'liblinear', 'saga', 'newton'], [0.0, 0.5, 1.0])
+    assert valid == [('lbfgs', 0.0), ('liblinear', 0.0), ('liblinear', 1.0),
+                     ('saga', 0.0), ('saga', 0.5), ('saga', 1.0)]
+    assert ('lbfgs', 1.0) in skipped and ('liblinear', 0.5) in skipped and ('newton', 0.0) in skipped
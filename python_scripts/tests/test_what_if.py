@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from linear_scorer import LinearScorer
+from what_if import Range, axis_values, evaluate_grid
+
+BASE = {'liabilities': 400_000, 'equity': 500_000, 'assets': 2_000_000,
+        'ebit': 300_000, 'interest': 50_000, 'revenue': 1_000_000}
+
+
+def test_range_is_linspace():
+    np.testing.assert_allclose(axis_values(Range(0, 1, 5)), [0, 0.25, 0.5, 0.75, 1])
+    np.testing.assert_allclose(axis_values(Range(2, 2, 1)), [2])
+
+
+@pytest.mark.parametrize('num', [0, -3])
+def test_range_needs_a_point(num):
+    with pytest.raises(ValueError):
+        axis_values(Range(0, 1, num))
+
+
+def test_plain_tuples_are_values():
+    # Three tax rates, not linspace(0.2, 0.25, 0)
+    np.testing.assert_allclose(axis_values((0.2, 0.25, 0.3)), [0.2, 0.25, 0.3])
+    np.testing.assert_allclose(axis_values((1, 2)), [1, 2])
+    np.testing.assert_allclose(axis_values([5]), [5])
+
+
+@pytest.mark.parametrize('spec', [(), [], [[1, 2], [3, 4]]])
+def test_invalid_values(spec):
+    with pytest.raises(ValueError):
+        axis_values(spec)
+
+
+def test_grid_uses_tuple_as_values(artifact):
+    scorer = LinearScorer.from_artifact(artifact)
+    grid = evaluate_grid(scorer, BASE, {'tax_rate': (0.2, 0.25, 0.3),
+                                        'interest': Range(10_000, 100_000, 4)})
+    assert grid.shape == (3, 4)
+    np.testing.assert_allclose(grid.axes['tax_rate'], [0.2, 0.25, 0.3])
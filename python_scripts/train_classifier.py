@@ -0,0 +1,115 @@
+"""
+Training entry point for the MatchiFi loan classifier.
+Reads the loan dataset through the columnar cache (training_data_cache.py), fits the logistic
+regression model and writes a versioned artifact (model, feature order and training metadata)
+for the apps to load lazily.
+
+Usage: python train_classifier.py path/to/Loan.xlsx [--out logistic_model.joblib] [--cache-dir DIR]
+"""
+
+import argparse
+import sys
+import warnings
+
+import numpy as np
+import sklearn
+from sklearn.exceptions import ConvergenceWarning
+from sklearn.model_selection import train_test_split
+from sklearn.metrics import accuracy_score
+
+from linear_scorer import LinearScorer
+from model_artifact import DEFAULT_MODEL_PATH, FEATURE_COLUMNS, TARGET_COLUMN, save_artifact
+from ratio_preprocessing import build_pipeline, final_estimator
+from training_data_cache import default_cache_dir, load_columns, source_digest
+
+
+def load_training_data(data_path: str, header: int = 2, cache_dir: str = None):
+    """
+    Loads the predictor matrix (FEATURE_COLUMNS order) and the target array from the
+    columnar cache of the loan workbook, building the cache on first use.
+    """
+    columns = load_columns(data_path, FEATURE_COLUMNS + [TARGET_COLUMN], cache_dir, header=header)
+    x = np.column_stack([columns[name] for name in FEATURE_COLUMNS])
+    y = columns[TARGET_COLUMN]
+    return x, y
+
+
+def train(data_path: str, out_path: str = DEFAULT_MODEL_PATH, test_size: float = 0.3,
+          random_state: int = 50, header: int = 2, cache_dir: str = None,
+          preprocess: bool = True, max_iter: int = 10000):
+    """
+    Fits the classifier on a shuffled train/test split and saves it as a versioned artifact.
+    With preprocess=True the ratios are clipped, log-transformed and standardized first
+    (see ratio_preprocessing.py). Returns the saved ModelArtifact.
+    """
+    x, y = load_training_data(data_path, header=header, cache_dir=cache_dir)
+    print(f"Loaded {len(x)} rows with features {FEATURE_COLUMNS}")
+
+    # splits train data
+    x_train, x_test, y_train, y_test = train_test_split(
+        x, y, test_size=test_size, shuffle=True, random_state=random_state)
+
+    # fits ml model, recording whether saga converged and how many iterations it took
+    model = build_pipeline(C=10, l1_ratio=0.0, solver='saga', max_iter=max_iter, preprocess=preprocess)
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter('always', ConvergenceWarning)
+        pred_model = model.fit(x_train, y_train)
+    n_iter = int(np.max(final_estimator(pred_model).n_iter_))
+    converged = not any(issubclass(w.category, ConvergenceWarning) for w in caught)
+    for w in caught:
+        if issubclass(w.category, ConvergenceWarning):
+            print(f"ConvergenceWarning: {w.message}", file=sys.stderr)
+    print(f"Solver {'converged' if converged else 'did NOT converge'} after {n_iter} of {max_iter} iterations")
+    y_pred = pred_model.predict(x_test)
+
+    accuracy = accuracy_score(y_test, y_pred)
+    print(f"Test accuracy: {accuracy:.4f}")
+
+    # the apps score with the extracted coefficients, so they must reproduce sklearn's output
+    max_diff = LinearScorer.from_model(pred_model, FEATURE_COLUMNS).check_agreement(pred_model, x_test)
+    print(f"LinearScorer agreement: max probability difference {max_diff:.1e}")
+
+    #saves the trained model for reuse
+    artifact = save_artifact(
+        pred_model, FEATURE_COLUMNS, out_path,
+        source_path=data_path,
+        source_sha256=source_digest(data_path, cache_dir or default_cache_dir(data_path)),
+        n_train=len(x_train),
+        n_test=len(x_test),
+        test_accuracy=float(accuracy),
+        preprocess=preprocess,
+        n_iter=n_iter,
+        converged=converged,
+        random_state=random_state,
+        params=pred_model.get_params(),
+        sklearn_version=sklearn.__version__,
+    )
+    print(f"Saved model {artifact.version} to {out_path}")
+    return artifact
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train the MatchiFi loan classifier.")
+    parser.add_argument('data', help="Path to the loan workbook (Loan.xlsx).")
+    parser.add_argument('--out', default=DEFAULT_MODEL_PATH, help="Artifact output path.")
+    parser.add_argument('--header', type=int, default=2, help="Header row of the workbook.")
+    parser.add_argument('--cache-dir', default=None, help="Training data cache directory.")
+    parser.add_argument('--test-size', type=float, default=0.3)
+    parser.add_argument('--random-state', type=int, default=50)
+    parser.add_argument('--max-iter', type=int, default=10000)
+    parser.add_argument('--no-preprocess', action='store_true',
+                        help="Fit on the raw ratios, without clipping, log transform or scaling.")
+    args = parser.parse_args(argv)
+
+    try:
+        train(args.data, args.out, test_size=args.test_size,
+              random_state=args.random_state, header=args.header, cache_dir=args.cache_dir,
+              preprocess=not args.no_preprocess, max_iter=args.max_iter)
+    except (OSError, KeyError, ValueError) as e:
+        print(f"Training failed: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,190 @@
+"""
+Columnar cache for the MatchiFi loan training data.
+Parsing Loan.xlsx with openpyxl dominates training time, so the workbook is converted once into
+one .npy file per column, stored under a directory named after the SHA-256 of the workbook.
+The cache is rebuilt only when the workbook's content changes (or a cached file turns out to be
+missing or damaged), and columns are loaded with np.load(mmap_mode='r') so training reads only
+the columns it needs, without copying them.
+
+Usage: python training_data_cache.py path/to/Loan.xlsx [--cache-dir DIR]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+import uuid
+
+import numpy as np
+
+from model_artifact import FEATURE_COLUMNS, TARGET_COLUMN
+
+CACHE_FORMAT_VERSION = 1
+
+# Columns cached from the workbook
+CACHED_COLUMNS = FEATURE_COLUMNS + [TARGET_COLUMN]
+
+# Small index of {source path: size, mtime and digest} so unchanged sources are not re-hashed
+INDEX_FILE = 'source_index.json'
+MANIFEST_FILE = 'manifest.json'
+
+
+def file_sha256(path: str) -> str:
+    """Returns the hex SHA-256 digest of a file, read in 1 MiB blocks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for block in iter(lambda: fh.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def default_cache_dir(source: str) -> str:
+    """MATCHIFI_CACHE_DIR if set, otherwise a .matchifi_cache directory next to the source."""
+    return os.environ.get('MATCHIFI_CACHE_DIR') or os.path.join(
+        os.path.dirname(os.path.abspath(source)), '.matchifi_cache')
+
+
+def _read_json(path: str, default=None):
+    try:
+        with open(path) as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return default
+
+
+def _write_json(path: str, payload):
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, 'w') as fh:
+        json.dump(payload, fh, indent=2)
+    os.replace(tmp_path, path)
+
+
+def source_digest(source: str, cache_dir: str) -> str:
+    """
+    Content hash of source. The digest is remembered together with the file's size and
+    modification time, so the file is only re-hashed when either of those changes.
+    """
+    stat = os.stat(source)
+    index_path = os.path.join(cache_dir, INDEX_FILE)
+    index = _read_json(index_path, {})
+    key = os.path.abspath(source)
+    entry = index.get(key)
+    if entry and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+        return entry['sha256']
+
+    digest = file_sha256(source)
+    index[key] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': digest}
+    _write_json(index_path, index)
+    return digest
+
+
+def _column_array(values) -> np.ndarray:
+    """Converts a pandas column to a contiguous array that np.load can memory-map."""
+    if values.dtype == object or str(values.dtype).startswith('str'):
+        return np.asarray(values.astype(str).to_numpy(), dtype=str)
+    return np.ascontiguousarray(values.to_numpy())
+
+
+def build_cache(source: str, cache_path: str, header: int = 2) -> dict:
+    """
+    Parses the workbook once and writes one .npy file per cached column plus a manifest.
+    The cache directory is assembled under a temporary name and renamed into place.
+    """
+    import pandas as pd
+
+    data_df = pd.read_excel(source, header=header, usecols=CACHED_COLUMNS)
+    tmp_path = f"{cache_path}.{uuid.uuid4().hex}.tmp"
+    os.makedirs(tmp_path)
+    try:
+        columns = {}
+        for name in CACHED_COLUMNS:
+            array = _column_array(data_df[name])
+            np.save(os.path.join(tmp_path, f"{name}.npy"), array)
+            columns[name] = array.dtype.str
+        manifest = {
+            'format_version': CACHE_FORMAT_VERSION,
+            'source': os.path.abspath(source),
+            'header': header,
+            'n_rows': len(data_df),
+            'columns': columns,
+        }
+        _write_json(os.path.join(tmp_path, MANIFEST_FILE), manifest)
+        try:
+            os.replace(tmp_path, cache_path)
+        except OSError:
+            # Another process built the same cache first
+            if not os.path.exists(os.path.join(cache_path, MANIFEST_FILE)):
+                raise
+    finally:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+    return manifest
+
+
+def ensure_cache(source: str, cache_dir: str = None, header: int = 2) -> str:
+    """
+    Returns the cache directory for the current contents of source, building it if needed.
+    """
+    cache_dir = cache_dir or default_cache_dir(source)
+    os.makedirs(cache_dir, exist_ok=True)
+    digest = source_digest(source, cache_dir)
+    cache_path = os.path.join(cache_dir, f"{digest}-h{header}")
+
+    manifest = _read_json(os.path.join(cache_path, MANIFEST_FILE))
+    if manifest is None or manifest.get('format_version') != CACHE_FORMAT_VERSION:
+        shutil.rmtree(cache_path, ignore_errors=True)
+        build_cache(source, cache_path, header=header)
+    return cache_path
+
+
+def _map_columns(cache_path: str, columns) -> dict:
+    """Memory-maps the cached columns, checking each against the cache manifest."""
+    manifest = _read_json(os.path.join(cache_path, MANIFEST_FILE), {})
+    arrays = {}
+    for name in columns:
+        array = np.load(os.path.join(cache_path, f"{name}.npy"), mmap_mode='r')
+        if len(array) != manifest.get('n_rows') or array.dtype.str != manifest.get('columns', {}).get(name):
+            raise ValueError(f"Cached column {name} does not match the cache manifest.")
+        arrays[name] = array
+    return arrays
+
+
+def load_columns(source: str, columns=None, cache_dir: str = None, header: int = 2) -> dict:
+    """
+    Returns {column name: read-only memory-mapped array} for the requested columns
+    (default: all cached columns), building or refreshing the cache first if necessary.
+    Raises KeyError for a column that is not cached.
+    """
+    columns = list(columns or CACHED_COLUMNS)
+    unknown = [name for name in columns if name not in CACHED_COLUMNS]
+    if unknown:
+        raise KeyError(f"Columns {unknown} are not in the training data cache.")
+    cache_path = ensure_cache(source, cache_dir, header=header)
+    try:
+        return _map_columns(cache_path, columns)
+    except (OSError, ValueError):
+        # A column file is missing or damaged: rebuild the cache from the source once
+        shutil.rmtree(cache_path, ignore_errors=True)
+        build_cache(source, cache_path, header=header)
+        return _map_columns(cache_path, columns)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the columnar cache for the loan workbook.")
+    parser.add_argument('data', help="Path to the loan workbook (Loan.xlsx).")
+    parser.add_argument('--cache-dir', default=None, help="Cache directory (default: next to the workbook).")
+    parser.add_argument('--header', type=int, default=2, help="Header row of the workbook.")
+    args = parser.parse_args(argv)
+
+    try:
+        cache_path = ensure_cache(args.data, args.cache_dir, header=args.header)
+    except (OSError, KeyError, ValueError) as e:
+        print(f"Could not build the training data cache: {e}", file=sys.stderr)
+        return 1
+    print(f"Training data cache: {cache_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
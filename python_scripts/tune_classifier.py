@@ -0,0 +1,219 @@
+"""
+Hyperparameter search for the MatchiFi loan classifier.
+Searches C, the L1/L2 mix (l1_ratio) and the solver with stratified k-fold cross-validation on a process pool.
+The dataset is loaded once into the columnar cache (training_data_cache.py) and every worker
+memory-maps the same files. Each task fits one (solver, l1_ratio, fold) along the whole C path
+in increasing order with warm_start=True, so each fit starts from the previous solution.
+Per-configuration fit time is reported, and the best configuration is refit on all rows and
+written as the deployable model artifact.
+
+Usage: python tune_classifier.py path/to/Loan.xlsx [--C 0.01 0.1 1 10 100] [--workers 8]
+"""
+
+import argparse
+import os
+import sys
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import sklearn
+from sklearn.exceptions import ConvergenceWarning
+from sklearn.model_selection import StratifiedKFold
+
+from linear_scorer import LinearScorer
+from model_artifact import DEFAULT_MODEL_PATH, FEATURE_COLUMNS, TARGET_COLUMN, save_artifact
+from ratio_preprocessing import build_pipeline, final_estimator
+from training_data_cache import default_cache_dir, ensure_cache, source_digest
+
+# l1_ratio values each solver supports: 0 is L2, 1 is L1 and saga also fits any elastic-net mix
+SOLVER_L1_RATIOS = {
+    'lbfgs': (0.0,),
+    'liblinear': (0.0, 1.0),
+    'saga': None,
+}
+# liblinear ignores warm_start
+WARM_START_SOLVERS = ('lbfgs', 'saga')
+
+DEFAULT_C_GRID = [0.01, 0.1, 1.0, 10.0, 100.0]
+DEFAULT_L1_RATIO_GRID = [0.0, 1.0]
+
+
+def _load_cached(cache_path: str):
+    """Memory-maps the feature columns and the target from a cache directory."""
+    x = np.column_stack([np.load(os.path.join(cache_path, f"{name}.npy"), mmap_mode='r')
+                         for name in FEATURE_COLUMNS])
+    y = np.load(os.path.join(cache_path, f"{TARGET_COLUMN}.npy"), mmap_mode='r')
+    return x, y
+
+
+def _fit_path(cache_path: str, solver: str, l1_ratio: float, c_values, train_idx, test_idx,
+              max_iter: int, preprocess: bool) -> list:
+    """
+    Fits one fold along the C path, warm-starting each fit from the previous one.
+    Returns one record per C value with its test accuracy, fit time and iteration count.
+    """
+    x, y = _load_cached(cache_path)
+    x_train, y_train = x[train_idx], y[train_idx]
+    x_test, y_test = x[test_idx], y[test_idx]
+
+    model = build_pipeline(l1_ratio=l1_ratio, solver=solver, max_iter=max_iter, preprocess=preprocess,
+                           warm_start=solver in WARM_START_SOLVERS)
+    classifier = final_estimator(model)
+    records = []
+    for c in sorted(c_values):
+        classifier.set_params(C=c)
+        started = time.perf_counter()
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always', ConvergenceWarning)
+            model.fit(x_train, y_train)
+        records.append({
+            'solver': solver,
+            'l1_ratio': l1_ratio,
+            'C': c,
+            'accuracy': float(model.score(x_test, y_test)),
+            'fit_seconds': time.perf_counter() - started,
+            'n_iter': int(np.max(classifier.n_iter_)),
+            'converged': not any(issubclass(w.category, ConvergenceWarning) for w in caught),
+        })
+    return records
+
+
+def supports(solver: str, l1_ratio: float) -> bool:
+    if solver not in SOLVER_L1_RATIOS:
+        return False
+    ratios = SOLVER_L1_RATIOS[solver]
+    return 0 <= l1_ratio <= 1 if ratios is None else l1_ratio in ratios
+
+
+def configurations(solvers, l1_ratios):
+    """Valid (solver, l1_ratio) pairs from the requested lists, plus the skipped ones."""
+    valid, skipped = [], []
+    for solver in solvers:
+        for l1_ratio in l1_ratios:
+            (valid if supports(solver, l1_ratio) else skipped).append((solver, l1_ratio))
+    return valid, skipped
+
+
+def search(cache_path: str, c_values, solvers, l1_ratios, folds: int = 5, workers: int = None,
+           max_iter: int = 10000, random_state: int = 50, preprocess: bool = True) -> list:
+    """
+    Runs the cross-validated grid search and returns one summary per (solver, l1_ratio, C),
+    sorted best first by mean accuracy.
+    """
+    _, y = _load_cached(cache_path)
+    splits = list(StratifiedKFold(n_splits=folds, shuffle=True, random_state=random_state)
+                  .split(np.zeros(len(y)), y))
+    valid, skipped = configurations(solvers, l1_ratios)
+    for solver, l1_ratio in skipped:
+        print(f"Skipping unsupported combination solver={solver} l1_ratio={l1_ratio:g}")
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(_fit_path, cache_path, solver, l1_ratio, c_values, train_idx, test_idx,
+                        max_iter, preprocess)
+            for solver, l1_ratio in valid
+            for train_idx, test_idx in splits
+        ]
+        records = [record for future in futures for record in future.result()]
+
+    summaries = {}
+    for record in records:
+        key = (record['solver'], record['l1_ratio'], record['C'])
+        summary = summaries.setdefault(key, {
+            'solver': key[0], 'l1_ratio': key[1], 'C': key[2],
+            'scores': [], 'fit_seconds': 0.0, 'max_iter_used': 0, 'all_converged': True,
+        })
+        summary['scores'].append(record['accuracy'])
+        summary['fit_seconds'] += record['fit_seconds']
+        summary['max_iter_used'] = max(summary['max_iter_used'], record['n_iter'])
+        summary['all_converged'] &= record['converged']
+
+    results = []
+    for summary in summaries.values():
+        scores = summary.pop('scores')
+        summary['mean_accuracy'] = float(np.mean(scores))
+        summary['std_accuracy'] = float(np.std(scores))
+        results.append(summary)
+    results.sort(key=lambda r: (-r['mean_accuracy'], r['fit_seconds']))
+    return results
+
+
+def print_results(results: list):
+    print(f"{'solver':<10} {'l1_ratio':>8} {'C':>9} {'accuracy':>10} {'std':>7} {'fit s':>8} {'iters':>7}")
+    for r in results:
+        flag = '' if r['all_converged'] else '  (not converged)'
+        print(f"{r['solver']:<10} {r['l1_ratio']:>8g} {r['C']:>9g} {r['mean_accuracy']:>10.4f} "
+              f"{r['std_accuracy']:>7.4f} {r['fit_seconds']:>8.3f} {r['max_iter_used']:>7}{flag}")
+
+
+def tune(data_path: str, out_path: str = DEFAULT_MODEL_PATH, c_values=None, solvers=None,
+         l1_ratios=None, folds: int = 5, workers: int = None, max_iter: int = 10000,
+         random_state: int = 50, header: int = 2, cache_dir: str = None, preprocess: bool = True):
+    """Searches the grid, refits the best configuration on all rows and saves it. Returns the artifact."""
+    cache_dir = cache_dir or default_cache_dir(data_path)
+    cache_path = ensure_cache(data_path, cache_dir, header=header)
+
+    started = time.perf_counter()
+    results = search(cache_path, c_values or DEFAULT_C_GRID, solvers or list(SOLVER_L1_RATIOS),
+                     DEFAULT_L1_RATIO_GRID if l1_ratios is None else l1_ratios, folds, workers, max_iter, random_state, preprocess)
+    print_results(results)
+    print(f"Search wall-clock time: {time.perf_counter() - started:.2f}s")
+    if not results:
+        raise ValueError("No valid solver/l1_ratio combination to search.")
+
+    best = results[0]
+    x, y = _load_cached(cache_path)
+    model = build_pipeline(C=best['C'], l1_ratio=best['l1_ratio'], solver=best['solver'],
+                           max_iter=max_iter, preprocess=preprocess).fit(x, y)
+    LinearScorer.from_model(model, FEATURE_COLUMNS).check_agreement(model, x)
+
+    artifact = save_artifact(
+        model, FEATURE_COLUMNS, out_path,
+        source_path=data_path,
+        source_sha256=source_digest(data_path, cache_dir),
+        n_train=len(x),
+        cv_folds=folds,
+        cv_mean_accuracy=best['mean_accuracy'],
+        cv_std_accuracy=best['std_accuracy'],
+        cv_results=results,
+        preprocess=preprocess,
+        random_state=random_state,
+        params=model.get_params(),
+        sklearn_version=sklearn.__version__,
+    )
+    print(f"Best: solver={best['solver']} l1_ratio={best['l1_ratio']:g} C={best['C']:g} "
+          f"(accuracy {best['mean_accuracy']:.4f}); saved model {artifact.version} to {out_path}")
+    return artifact
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cross-validated hyperparameter search for the loan classifier.")
+    parser.add_argument('data', help="Path to the loan workbook (Loan.xlsx).")
+    parser.add_argument('--out', default=DEFAULT_MODEL_PATH, help="Artifact output path for the best model.")
+    parser.add_argument('--C', type=float, nargs='+', default=DEFAULT_C_GRID, help="Inverse regularization strengths.")
+    parser.add_argument('--l1-ratio', type=float, nargs='+', default=DEFAULT_L1_RATIO_GRID,
+                        help="L1 share of the penalty: 0 is L2, 1 is L1, values in between need saga.")
+    parser.add_argument('--solver', nargs='+', default=list(SOLVER_L1_RATIOS))
+    parser.add_argument('--folds', type=int, default=5)
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: all cores).")
+    parser.add_argument('--max-iter', type=int, default=10000)
+    parser.add_argument('--random-state', type=int, default=50)
+    parser.add_argument('--header', type=int, default=2, help="Header row of the workbook.")
+    parser.add_argument('--cache-dir', default=None, help="Training data cache directory.")
+    parser.add_argument('--no-preprocess', action='store_true',
+                        help="Fit on the raw ratios, without clipping, log transform or scaling.")
+    args = parser.parse_args(argv)
+
+    try:
+        tune(args.data, args.out, args.C, args.solver, args.l1_ratio, args.folds, args.workers,
+             args.max_iter, args.random_state, args.header, args.cache_dir, not args.no_preprocess)
+    except (OSError, KeyError, ValueError) as e:
+        print(f"Tuning failed: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,239 @@
+"""
+What-if sensitivity analysis for one MatchiFi applicant.
+Takes a company's raw financials and value ranges for any of them (and for the tax rate),
+builds the Cartesian grid of scenarios and scores every grid point in one broadcasted pass:
+each varied input is an axis of an open mesh, so the ratios are computed by NumPy broadcasting
+and the approval logit by the classifier's linear form (LinearScorer.decision_batch) instead of
+per-point predict calls. Large grids are processed in blocks along the first axis to bound memory.
+
+The result reports the approval probability at every point and the decision boundary: the grid
+points next to a change of outcome, and for any axis the interpolated value at which the outcome
+first flips, for every combination of the other axes.
+
+Usage:
+    python what_if.py --revenue 1000000 --ebit 300000 --interest 50000 --liabilities 400000 \\
+        --equity 500000 --assets 2000000 --vary interest 0 300000 301 --vary equity 1e5 1e6 1000
+"""
+
+import argparse
+import sys
+import time
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+from scipy.special import expit
+
+from financial_ratios_calc import DEFAULT_TAX_RATE, RATIO_COLUMNS, REASON_OK, FinancialRatios
+from linear_scorer import LinearScorer
+from model_artifact import DEFAULT_MODEL_PATH, load_artifact
+
+# Inputs a scenario can vary, in calculate_ratio_arrays order plus the tax rate
+SCENARIO_INPUTS = ['liabilities', 'equity', 'assets', 'ebit', 'interest', 'revenue', 'tax_rate']
+
+DEFAULT_BLOCK_POINTS = 1_000_000
+
+# num evenly spaced values from start to stop (both included), as np.linspace
+Range = namedtuple('Range', ['start', 'stop', 'num'])
+
+
+def axis_values(spec) -> np.ndarray:
+    """
+    Grid values from a Range, or from an array-like of values (a plain tuple is a list of
+    values too).
+    """
+    if isinstance(spec, Range):
+        if int(spec.num) < 1:
+            raise ValueError(f"A scenario range needs at least one point, got num={spec.num}.")
+        return np.linspace(float(spec.start), float(spec.stop), int(spec.num))
+    values = np.atleast_1d(np.asarray(spec, dtype=np.float64))
+    if values.ndim != 1 or values.size == 0:
+        raise ValueError("Each scenario range must be a non-empty 1-D sequence of values.")
+    return values
+
+
+class ScenarioGrid:
+    """
+    Scores over the Cartesian grid of axes (an ordered {input name: values} dict).
+    logit has one entry per grid point (axes order) and is NaN where a ratio is undefined;
+    reason holds the FinancialRatios REASON_* flags per point.
+    """
+
+    def __init__(self, base: dict, axes: dict, logit: np.ndarray, reason: np.ndarray):
+        self.base = base
+        self.axes = axes
+        self.logit = logit
+        self.reason = reason
+
+    @property
+    def shape(self) -> tuple:
+        return self.logit.shape
+
+    @property
+    def probability(self) -> np.ndarray:
+        """Approval probability at every grid point."""
+        return expit(self.logit)
+
+    @property
+    def approved(self) -> np.ndarray:
+        """Whether each grid point is approved (approval probability above 0.5)."""
+        return self.logit > 0
+
+    def _axis_index(self, name: str) -> int:
+        try:
+            return list(self.axes).index(name)
+        except ValueError:
+            raise KeyError(f"{name!r} is not a varied input; axes are {list(self.axes)}.")
+
+    def boundary_mask(self) -> np.ndarray:
+        """Grid points whose outcome differs from a neighbour's along any axis."""
+        approved, defined = self.approved, ~np.isnan(self.logit)
+        mask = np.zeros(self.shape, dtype=bool)
+        for axis in range(len(self.shape)):
+            lead = [slice(None)] * len(self.shape)
+            trail = [slice(None)] * len(self.shape)
+            lead[axis], trail[axis] = slice(None, -1), slice(1, None)
+            lead, trail = tuple(lead), tuple(trail)
+            flips = (approved[lead] != approved[trail]) & defined[lead] & defined[trail]
+            mask[lead] |= flips
+            mask[trail] |= flips
+        return mask
+
+    def crossings(self, name: str) -> np.ndarray:
+        """
+        For every combination of the other axes, the value of input name at which the outcome
+        first flips along its axis, linearly interpolated on the logit between grid points
+        (NaN where it never flips). The result has the grid shape without that axis.
+        """
+        axis = self._axis_index(name)
+        values = self.axes[name]
+        z = np.moveaxis(self.logit, axis, -1)
+        if z.shape[-1] < 2:
+            return np.full(z.shape[:-1], np.nan)
+        left, right = z[..., :-1], z[..., 1:]
+        flips = ((left > 0) != (right > 0)) & ~np.isnan(left) & ~np.isnan(right)
+        first = np.argmax(flips, axis=-1)
+        found = flips.any(axis=-1)
+        z_left = np.take_along_axis(left, first[..., None], axis=-1)[..., 0]
+        z_right = np.take_along_axis(right, first[..., None], axis=-1)[..., 0]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            fraction = z_left / (z_left - z_right)
+        crossing = values[first] + (values[first + 1] - values[first]) * fraction
+        return np.where(found, crossing, np.nan)
+
+    def to_frame(self) -> pd.DataFrame:
+        """One row per grid point with the varied inputs, the approval probability and the reason code."""
+        mesh = np.meshgrid(*self.axes.values(), indexing='ij')
+        frame = pd.DataFrame({name: values.ravel() for name, values in zip(self.axes, mesh)})
+        frame['Approval_Probability'] = self.probability.ravel()
+        frame['Reason_Code'] = self.reason.ravel()
+        return frame
+
+
+def evaluate_grid(scorer: LinearScorer, base: dict, ranges: dict,
+                  block_points: int = DEFAULT_BLOCK_POINTS) -> ScenarioGrid:
+    """
+    Scores the Cartesian grid of ranges (input name -> Range or values, see axis_values) around
+    the base financials. Inputs not in ranges keep their base value; tax_rate defaults to
+    DEFAULT_TAX_RATE.
+    """
+    base = dict(base)
+    base.setdefault('tax_rate', float(DEFAULT_TAX_RATE))
+    unknown = (set(base) | set(ranges)) - set(SCENARIO_INPUTS)
+    if unknown:
+        raise ValueError(f"Unknown scenario inputs {sorted(unknown)}; expected {SCENARIO_INPUTS}.")
+    missing = [name for name in SCENARIO_INPUTS if name not in base and name not in ranges]
+    if missing:
+        raise ValueError(f"Missing base values for {missing}.")
+    if not ranges:
+        ranges = {SCENARIO_INPUTS[0]: [base[SCENARIO_INPUTS[0]]]}
+
+    axes = {name: axis_values(spec) for name, spec in ranges.items()}
+    shape = tuple(len(values) for values in axes.values())
+    logit = np.empty(shape, dtype=np.float64)
+    reason = np.empty(shape, dtype=np.uint8)
+
+    # Blocks of whole rows along the first axis
+    inner_points = int(np.prod(shape[1:], dtype=np.int64))
+    rows_per_block = max(1, block_points // max(inner_points, 1))
+    names = list(axes)
+    unsupported = [name for name in scorer.feature_names if name not in RATIO_COLUMNS]
+    if unsupported:
+        raise ValueError(f"Model features {unsupported} are not produced by FinancialRatios.")
+    # decision > 0 means classes_[1]; flip it so that the logit is always the approval logit
+    sign = 1.0 if scorer.approve_index == 1 else -1.0
+    for start in range(0, shape[0], rows_per_block):
+        stop = min(start + rows_per_block, shape[0])
+        inputs = []
+        for name in SCENARIO_INPUTS:
+            if name in axes:
+                i = names.index(name)
+                values = axes[name][start:stop] if i == 0 else axes[name]
+                inputs.append(values.reshape([-1 if j == i else 1 for j in range(len(shape))]))
+            else:
+                inputs.append(np.full([1] * len(shape), float(base[name])))
+        *amounts, tax_rate = np.broadcast_arrays(*inputs)
+
+        ratios = FinancialRatios.calculate_ratio_arrays(*amounts, tax_rate=tax_rate, backend='float')
+        block = (slice(start, stop),)
+        features = np.stack([ratios[name] for name in scorer.feature_names], axis=-1)
+        decision = scorer.decision_batch(features.reshape(-1, features.shape[-1]))
+        block_logit = (decision * sign).reshape(features.shape[:-1])
+        block_logit[ratios['Reason_Code'] != REASON_OK] = np.nan
+        logit[block] = block_logit
+        reason[block] = ratios['Reason_Code']
+    return ScenarioGrid(base, axes, logit, reason)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="What-if sensitivity grid for one applicant's approval probability.")
+    for name in SCENARIO_INPUTS:
+        default = float(DEFAULT_TAX_RATE) if name == 'tax_rate' else None
+        parser.add_argument('--' + name.replace('_', '-'), dest=name, type=float, default=default,
+                            help=f"Base value of {name}.")
+    parser.add_argument('--vary', nargs=4, action='append', default=[], metavar=('INPUT', 'START', 'STOP', 'NUM'),
+                        help="Vary an input over NUM evenly spaced values; repeat for more axes.")
+    parser.add_argument('--model', default=DEFAULT_MODEL_PATH, help="Model artifact path.")
+    parser.add_argument('--out', default=None, help="CSV or Parquet file to write every grid point to.")
+    args = parser.parse_args(argv)
+
+    ranges = {}
+    try:
+        for name, start, stop, num in args.vary:
+            ranges[name] = Range(float(start), float(stop), int(num))
+        base = {name: getattr(args, name) for name in SCENARIO_INPUTS
+                if getattr(args, name) is not None}
+        scorer = LinearScorer.from_artifact(load_artifact(args.model))
+        started = time.perf_counter()
+        grid = evaluate_grid(scorer, base, ranges)
+        seconds = time.perf_counter() - started
+    except (OSError, ValueError) as e:
+        print(f"What-if analysis failed: {e}", file=sys.stderr)
+        return 1
+
+    points = grid.logit.size
+    print(f"Scored {points:,} scenarios over {', '.join(grid.axes)} in {seconds:.3f}s "
+          f"({points / seconds:,.0f} points/s)")
+    defined = ~np.isnan(grid.logit)
+    print(f"Approved in {np.count_nonzero(grid.approved):,} of {np.count_nonzero(defined):,} "
+          f"scoreable scenarios; {np.count_nonzero(grid.boundary_mask()):,} points lie on the decision boundary")
+    for name in grid.axes:
+        crossing = grid.crossings(name)
+        flipped = crossing[~np.isnan(crossing)]
+        if flipped.size:
+            print(f"  outcome flips along {name} at {flipped.min():,.4g} .. {flipped.max():,.4g} "
+                  f"({flipped.size:,} of {crossing.size:,} slices)")
+        else:
+            print(f"  outcome never flips along {name}")
+
+    if args.out:
+        from batch_score import ChunkWriter
+
+        with ChunkWriter(args.out) as writer:
+            writer.write(grid.to_frame())
+        print(f"Wrote the grid to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
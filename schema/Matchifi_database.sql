@@ -24,6 +24,10 @@ CREATE TABLE client_detail (
     return_on_equity float(5,1),
     interest_coverage INT,
 
+    -- one detail row per client; clusters the feature row on the join key
+    PRIMARY KEY(company_id),
+    INDEX idx_client_detail_sector (sector_id, company_id),
+
     FOREIGN KEY (company_id)
     REFERENCES clients(company_id),
 
@@ -54,6 +58,9 @@ CREATE TABLE loan_applications (
     loan_status ENUM('Approved', 'Rejected') NOT NULL, -- Your target variable
     application_date DATE,
     PRIMARY KEY(application_id),
+    INDEX idx_loan_applications_company (company_id, application_id),
+    INDEX idx_loan_applications_product (product_id),
+    INDEX idx_loan_applications_date (application_date, application_id),
     FOREIGN KEY (company_id) REFERENCES clients(company_id),
     FOREIGN KEY (product_id) REFERENCES loan_products(product_id)
 ) ENGINE=INNODB;